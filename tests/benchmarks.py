@@ -0,0 +1,232 @@
+"""Time the provisioning phases of fixture variants, keep the results, and compare them with a stored baseline.
+
+NOTE: Like pytest-benchmark, every run is appended to a results store, in the directory named by the environment
+variable TEST_BENCHMARK_DIR or .benchmarks, and the median of each benchmark phase is compared with a baseline that is
+only updated when TEST_BENCHMARK_SAVE_BASELINE is set. A phase regresses when its median exceeds the baseline by more
+than the fraction in TEST_BENCHMARK_THRESHOLD. Live provisioning benchmarks only run when TEST_BENCHMARKS is set; the
+harness overhead benchmarks run against a stand-in tofu executable and need no cloud resources.
+"""
+
+import datetime as dt
+import json
+import os
+import pathlib
+import platform
+import statistics
+import time
+from collections.abc import Callable, Iterable
+from dataclasses import dataclass, field
+from typing import Any
+
+from .tofu_harness import run_tofu_in_workspace, skip_destroy_phase
+
+APPLY = "apply"
+READY = "ready"
+DESTROY = "destroy"
+DEFAULT_THRESHOLD = 0.25
+DEFAULT_ROUNDS = 1
+BASELINE_FILE = "baseline.json"
+RESULTS_FILE = "results.jsonl"
+
+
+def benchmarks_enabled() -> bool:
+    """Determine if the live provisioning benchmarks should be run."""
+    return os.getenv("TEST_BENCHMARKS", "False").lower() in ["true", "t", "yes", "y", "1"]
+
+
+def save_baseline() -> bool:
+    """Determine if the results of this run should replace the stored baseline."""
+    return os.getenv("TEST_BENCHMARK_SAVE_BASELINE", "False").lower() in ["true", "t", "yes", "y", "1"]
+
+
+def benchmark_dir() -> pathlib.Path:
+    """Return the directory of the benchmark results store.
+
+    Preference will be given to the environment variable TEST_BENCHMARK_DIR with fallback to .benchmarks in the current
+    directory.
+    """
+    raw = os.getenv("TEST_BENCHMARK_DIR", "").strip()
+    return pathlib.Path(raw or ".benchmarks").resolve()
+
+
+def regression_threshold() -> float:
+    """Return the fraction by which a median can exceed its baseline before it is reported as a regression.
+
+    Preference will be given to the environment variable TEST_BENCHMARK_THRESHOLD with fallback to 0.25.
+    """
+    raw = os.getenv("TEST_BENCHMARK_THRESHOLD", "")
+    if raw.strip():
+        threshold = float(raw.strip())
+        assert threshold >= 0, "TEST_BENCHMARK_THRESHOLD must not be negative"
+        return threshold
+    return DEFAULT_THRESHOLD
+
+
+def benchmark_rounds() -> int:
+    """Return the number of times each benchmark is run.
+
+    Preference will be given to the environment variable TEST_BENCHMARK_ROUNDS with fallback to 1.
+    """
+    raw = os.getenv("TEST_BENCHMARK_ROUNDS", "")
+    if raw.strip():
+        rounds = int(raw.strip())
+        assert rounds > 0, "TEST_BENCHMARK_ROUNDS must be a positive integer"
+        return rounds
+    return DEFAULT_ROUNDS
+
+
+@dataclass
+class PhaseStats:
+    """The durations, in seconds, of one phase of a benchmark over every round."""
+
+    benchmark: str
+    phase: str
+    rounds: list[float] = field(default_factory=list)
+
+    @property
+    def median(self) -> float:
+        """Return the median duration."""
+        return statistics.median(self.rounds)
+
+    @property
+    def minimum(self) -> float:
+        """Return the shortest duration."""
+        return min(self.rounds)
+
+    @property
+    def maximum(self) -> float:
+        """Return the longest duration."""
+        return max(self.rounds)
+
+
+@dataclass(frozen=True)
+class Regression:
+    """A benchmark phase whose median exceeded its baseline by more than the threshold."""
+
+    benchmark: str
+    phase: str
+    baseline: float
+    median: float
+
+    def __str__(self) -> str:
+        """Describe the regression for an assertion message."""
+        return (
+            f"{self.benchmark} {self.phase}: median {self.median:.3f}s is {self.median / self.baseline - 1:.0%} "
+            f"slower than baseline {self.baseline:.3f}s"
+        )
+
+
+@dataclass
+class BenchmarkStore:
+    """Append benchmark results to a JSON Lines file, and keep the baseline medians in a JSON file beside it."""
+
+    directory: pathlib.Path = field(default_factory=benchmark_dir)
+
+    def append(self, stats: Iterable[PhaseStats]) -> None:
+        """Append the stats of a run to the results, with the time and machine they were recorded on."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        recorded_at = dt.datetime.now(tz=dt.UTC).isoformat()
+        with self.directory.joinpath(RESULTS_FILE).open(mode="a", encoding="utf-8") as results:
+            for stat in stats:
+                record = {
+                    "recorded_at": recorded_at,
+                    "machine": platform.node(),
+                    "python": platform.python_version(),
+                    "benchmark": stat.benchmark,
+                    "phase": stat.phase,
+                    "rounds": stat.rounds,
+                    "median": stat.median,
+                }
+                results.write(json.dumps(record) + "\n")
+
+    def results(self) -> list[dict[str, Any]]:
+        """Return every result that has been appended, oldest first."""
+        path = self.directory.joinpath(RESULTS_FILE)
+        if not path.exists():
+            return []
+        return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines() if line.strip()]
+
+    def baseline(self) -> dict[str, dict[str, float]]:
+        """Return the baseline median of every phase, by benchmark."""
+        path = self.directory.joinpath(BASELINE_FILE)
+        if not path.exists():
+            return {}
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    def save_baseline(self, stats: Iterable[PhaseStats]) -> None:
+        """Replace the baseline of each phase in stats with its median, keeping the baseline of other phases."""
+        baseline = self.baseline()
+        for stat in stats:
+            baseline.setdefault(stat.benchmark, {})[stat.phase] = stat.median
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory.joinpath(BASELINE_FILE)
+        path.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+
+    def compare(self, stats: Iterable[PhaseStats], threshold: float) -> list[Regression]:
+        """Return the phases whose median exceeds the baseline by more than threshold, ignoring phases without one."""
+        baseline = self.baseline()
+        regressions: list[Regression] = []
+        for stat in stats:
+            expected = baseline.get(stat.benchmark, {}).get(stat.phase)
+            if expected is not None and stat.median > expected * (1 + threshold):
+                regressions.append(Regression(stat.benchmark, stat.phase, expected, stat.median))
+        return regressions
+
+
+def time_lifecycle(
+    fixture: pathlib.Path,
+    workspace: str | None,
+    tfvars: dict[str, Any] | None,
+    ready: Callable[[dict[str, Any]], None] | None = None,
+) -> dict[str, float]:
+    """Return the seconds taken to apply the fixture, for ready to return with its output, and to destroy it.
+
+    The ready phase is only timed if ready is given, and the destroy phase is not timed if TEST_SKIP_DESTROY_PHASE is
+    set.
+    """
+    durations: dict[str, float] = {}
+    start = time.perf_counter()
+    with run_tofu_in_workspace(fixture=fixture, workspace=workspace, tfvars=tfvars) as output:
+        durations[APPLY] = time.perf_counter() - start
+        if ready is not None:
+            start = time.perf_counter()
+            ready(output)
+            durations[READY] = time.perf_counter() - start
+        start = time.perf_counter()
+    if not skip_destroy_phase():
+        durations[DESTROY] = time.perf_counter() - start
+    return durations
+
+
+def run_benchmark(
+    benchmark: str,
+    fixture: pathlib.Path,
+    workspace: str | None,
+    tfvars: dict[str, Any] | None,
+    ready: Callable[[dict[str, Any]], None] | None = None,
+    rounds: int | None = None,
+) -> list[PhaseStats]:
+    """Time the lifecycle of the fixture for a number of rounds, returning the stats of each phase."""
+    stats: dict[str, PhaseStats] = {}
+    for _ in range(rounds or benchmark_rounds()):
+        for phase, seconds in time_lifecycle(fixture=fixture, workspace=workspace, tfvars=tfvars, ready=ready).items():
+            stats.setdefault(phase, PhaseStats(benchmark=benchmark, phase=phase)).rounds.append(seconds)
+    return list(stats.values())
+
+
+def check_benchmark(
+    stats: list[PhaseStats],
+    store: BenchmarkStore | None = None,
+    threshold: float | None = None,
+) -> list[Regression]:
+    """Record the stats in the store, and return the phases that regressed against its baseline.
+
+    If TEST_BENCHMARK_SAVE_BASELINE is set, the stats then become the baseline.
+    """
+    if store is None:
+        store = BenchmarkStore()
+    store.append(stats)
+    regressions = store.compare(stats, threshold=regression_threshold() if threshold is None else threshold)
+    if save_baseline():
+        store.save_baseline(stats)
+    return regressions
@@ -0,0 +1,269 @@
+"""Record and replay the Google Cloud API calls and tofu fixture outputs of a test session.
+
+NOTE: The mode is chosen by the environment variable TEST_CASSETTE_MODE. In the default live mode nothing is recorded;
+in record mode every successful unary gRPC call made by the clients in conftest.py, and the output of every applied tofu
+fixture, is written to a cassette file in TEST_CASSETTE_DIR; in replay mode the clients are served from the cassettes
+without a network connection, and tofu is never executed. Kubernetes API calls are not recorded, so tests that need a
+Kubernetes API client are skipped when replaying.
+
+NOTE: Recorded fixture outputs can include sensitive values, such as cluster CA certificates; review cassettes before
+committing them.
+"""
+
+import base64
+import functools
+import hashlib
+import json
+import os
+import pathlib
+import tempfile
+import threading
+from collections.abc import Callable
+from typing import Any, cast
+
+import grpc
+import proto
+from google.protobuf import message
+
+LIVE = "live"
+RECORD = "record"
+REPLAY = "replay"
+CASSETTE_MODES = (LIVE, RECORD, REPLAY)
+DEFAULT_CASSETTE_DIR = pathlib.Path(__file__).parent.joinpath("cassettes")
+TOFU_CASSETTE = "tofu"
+TOFU_OUTPUT_METHOD = "output"
+
+
+class CassetteMissError(LookupError):
+    """Raised when a replayed call has no recorded response."""
+
+
+def cassette_mode() -> str:
+    """Return the cassette mode from the environment variable TEST_CASSETTE_MODE, with fallback to live."""
+    mode = os.getenv("TEST_CASSETTE_MODE", LIVE).strip().lower() or LIVE
+    if mode not in CASSETTE_MODES:
+        msg = f"TEST_CASSETTE_MODE must be one of {CASSETTE_MODES}, got {mode!r}"
+        raise ValueError(msg)
+    return mode
+
+
+def cassette_dir() -> pathlib.Path:
+    """Return the directory that holds cassette files.
+
+    Preference will be given to the environment variable TEST_CASSETTE_DIR with fallback to the cassettes directory
+    next to this file.
+    """
+    raw = os.getenv("TEST_CASSETTE_DIR", "").strip()
+    return pathlib.Path(raw).resolve() if raw else DEFAULT_CASSETTE_DIR
+
+
+def serialize(value: message.Message | proto.Message) -> bytes:
+    """Return the deterministic wire encoding of a protobuf or proto-plus message."""
+    if isinstance(value, proto.Message):
+        value = type(value).pb(value)
+    return value.SerializeToString(deterministic=True)
+
+
+def digest(value: bytes | str) -> str:
+    """Return the key of a recorded request."""
+    if isinstance(value, str):
+        value = value.encode("utf-8")
+    return hashlib.sha256(value).hexdigest()
+
+
+class Cassette:
+    """A file of recorded responses, keyed by method and a digest of the request.
+
+    Responses are stored as base64 encoded wire bytes for gRPC methods, or as JSON values for anything else, and the
+    file is rewritten after every recording so that an interrupted session keeps what it has recorded.
+    """
+
+    def __init__(self, path: pathlib.Path) -> None:
+        """Load the cassette at path, if it exists."""
+        self.path = path
+        self._lock = threading.Lock()
+        self.interactions: dict[str, dict[str, Any]] = {}
+        if path.exists():
+            self.interactions = json.loads(path.read_text(encoding="utf-8"))
+
+    def record(self, method: str, key: str, response: Any) -> None:  # noqa: ANN401
+        """Record the response to the request with key, and rewrite the cassette file."""
+        with self._lock:
+            self.interactions.setdefault(method, {})[key] = response
+            content = json.dumps(self.interactions, sort_keys=True, separators=(",", ":"))
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with tempfile.NamedTemporaryFile(mode="w", dir=self.path.parent, delete=False, encoding="utf-8") as tmp:
+                tmp.write(content)
+            pathlib.Path(tmp.name).replace(self.path)
+
+    def play(self, method: str, key: str) -> Any:  # noqa: ANN401
+        """Return the recorded response to the request with key, raising CassetteMissError if there is none."""
+        with self._lock:
+            try:
+                return self.interactions[method][key]
+            except KeyError:
+                msg = f"no response to {method} with request {key[:16]} in {self.path}"
+                raise CassetteMissError(msg) from None
+
+
+@functools.cache
+def cassette(name: str) -> Cassette:
+    """Return the cassette with name in the cassette directory, shared by every caller in the session."""
+    return Cassette(cassette_dir().joinpath(f"{name}.json"))
+
+
+class _RecordingInterceptor(grpc.UnaryUnaryClientInterceptor):
+    """Record the response of every successful unary call to a cassette."""
+
+    def __init__(self, cassette: Cassette) -> None:
+        self.cassette = cassette
+
+    def intercept_unary_unary(
+        self,
+        continuation: Callable[[grpc.ClientCallDetails, Any], Any],
+        client_call_details: grpc.ClientCallDetails,
+        request: Any,  # noqa: ANN401
+    ) -> Any:  # noqa: ANN401
+        outcome = continuation(client_call_details, request)
+        if outcome.exception() is None:
+            self.cassette.record(
+                method=client_call_details.method,
+                key=digest(serialize(request)),
+                response=base64.b64encode(serialize(outcome.result())).decode("ascii"),
+            )
+        return outcome
+
+
+class _ReplayCall(grpc.Call):
+    """A completed call with no metadata."""
+
+    def initial_metadata(self) -> tuple[()]:
+        return ()
+
+    def trailing_metadata(self) -> tuple[()]:
+        return ()
+
+    def code(self) -> grpc.StatusCode:
+        return grpc.StatusCode.OK
+
+    def details(self) -> str:
+        return ""
+
+    def is_active(self) -> bool:
+        return False
+
+    def time_remaining(self) -> None:
+        return None
+
+    def cancel(self) -> bool:
+        return False
+
+    def add_callback(self, callback: Callable[[], None]) -> bool:  # noqa: ARG002
+        return False
+
+
+_RECORDED_CALLS = "only blocking unary calls are recorded"
+
+
+class _UnreplayableCallError(grpc.RpcError, _ReplayCall):
+    """An UNIMPLEMENTED status for a call that cannot be served from a cassette."""
+
+    def __init__(self, details: str) -> None:
+        super().__init__(details)
+        self._details = details
+
+    def code(self) -> grpc.StatusCode:
+        return grpc.StatusCode.UNIMPLEMENTED
+
+    def details(self) -> str:
+        return self._details
+
+
+class _UnreplayableMultiCallable:
+    """Fail every call to a streaming method, which is never recorded, with an UNIMPLEMENTED status."""
+
+    def __init__(self, cassette: Cassette, method: str) -> None:
+        self.cassette = cassette
+        self.method = method
+
+    def __call__(self, *args: Any, **kwargs: Any) -> Any:  # noqa: ANN401, ARG002
+        msg = f"streaming call to {self.method} cannot be replayed from {self.cassette.path}; {_RECORDED_CALLS}"
+        raise _UnreplayableCallError(msg)
+
+    with_call = __call__
+    future = __call__
+
+
+class _ReplayMultiCallable(grpc.UnaryUnaryMultiCallable):
+    """Serve a unary method from a cassette."""
+
+    def __init__(self, cassette: Cassette, method: str, response_deserializer: Callable[[bytes], Any] | None) -> None:
+        self.cassette = cassette
+        self.method = method
+        self.response_deserializer = response_deserializer
+
+    def __call__(self, request: Any, *args: Any, **kwargs: Any) -> Any:  # noqa: ANN401, ARG002
+        response = base64.b64decode(self.cassette.play(method=self.method, key=digest(serialize(request))))
+        return self.response_deserializer(response) if self.response_deserializer else response
+
+    def with_call(self, request: Any, *args: Any, **kwargs: Any) -> tuple[Any, grpc.Call]:  # noqa: ANN401
+        return self(request, *args, **kwargs), _ReplayCall()
+
+    def future(self, request: Any, *args: Any, **kwargs: Any) -> Any:  # noqa: ANN401, ARG002
+        msg = f"asynchronous call to {self.method} cannot be replayed from {self.cassette.path}; {_RECORDED_CALLS}"
+        raise _UnreplayableCallError(msg)
+
+
+class ReplayChannel(grpc.Channel):
+    """A gRPC channel that serves unary calls from a cassette instead of the network."""
+
+    def __init__(self, cassette: Cassette) -> None:
+        """Initialise a channel that replays calls from the cassette."""
+        self.cassette = cassette
+
+    def unary_unary(
+        self,
+        method: str,
+        request_serializer: Callable[[Any], bytes] | None = None,  # noqa: ARG002
+        response_deserializer: Callable[[bytes], Any] | None = None,
+        _registered_method: bool | None = False,  # noqa: FBT001, FBT002
+    ) -> grpc.UnaryUnaryMultiCallable:
+        """Return a callable that replays the unary method."""
+        return _ReplayMultiCallable(self.cassette, method, response_deserializer)
+
+    def unary_stream(self, method: str, *args: Any, **kwargs: Any) -> grpc.UnaryStreamMultiCallable:  # noqa: ANN401, ARG002
+        """Return a callable that fails with UNIMPLEMENTED, since streaming methods are not recorded."""
+        return cast("grpc.UnaryStreamMultiCallable", _UnreplayableMultiCallable(self.cassette, method))
+
+    stream_unary = unary_stream  # pyright: ignore[reportAssignmentType]
+    stream_stream = unary_stream  # pyright: ignore[reportAssignmentType]
+
+    def subscribe(self, callback: Callable[[grpc.ChannelConnectivity], None], try_to_connect: bool = False) -> None:  # noqa: FBT001, FBT002
+        """Ignore connectivity subscriptions; a replay channel is always ready."""
+
+    def unsubscribe(self, callback: Callable[[grpc.ChannelConnectivity], None]) -> None:
+        """Ignore connectivity subscriptions; a replay channel is always ready."""
+
+    def close(self) -> None:
+        """Do nothing; a replay channel holds no resources."""
+
+
+def cassette_client[ClientT](client_class: Callable[..., ClientT], name: str) -> ClientT:
+    """Return a gRPC client of client_class that records to, or replays from, the cassette with name.
+
+    In live mode this is the same as calling client_class with no arguments.
+    """
+    mode = cassette_mode()
+    if mode == LIVE:
+        return client_class()
+    transport_class = cast("Any", client_class).get_transport_class("grpc")
+    if mode == RECORD:
+        channel = grpc.intercept_channel(transport_class.create_channel(), _RecordingInterceptor(cassette(name)))
+    else:
+        channel = ReplayChannel(cassette(name))
+    return client_class(transport=transport_class(channel=channel))
+
+
+def fixture_key(fixture: pathlib.Path, tfvars: dict[str, Any] | None) -> str:
+    """Return the key of the recorded output of a tofu fixture, independent of where the repository is checked out."""
+    return digest(json.dumps({"fixture": fixture.name, "tfvars": tfvars or {}}, sort_keys=True))
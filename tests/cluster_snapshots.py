@@ -0,0 +1,172 @@
+"""Cache snapshots of GKE clusters so that each cluster is fetched from the Cluster Manager API at most once per TTL.
+
+NOTE: Snapshots are held in memory for the session, and are also written to the directory named by the environment
+variable TEST_CLUSTER_SNAPSHOT_DIR when it is set, so that a re-run of the assertions against unchanged fixtures can
+skip the API entirely. Snapshots are kept as serialised Cluster messages, parsed once on first use; use
+ClusterSnapshots.project to get a Cluster that only holds the fields an assertion needs. Every Cluster returned is a
+copy, so callers may modify it without changing the snapshot seen by later tests.
+"""
+
+import hashlib
+import os
+import pathlib
+import tempfile
+import threading
+import time
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+
+from google.cloud import container_v1
+from google.protobuf import field_mask_pb2
+
+DEFAULT_TTL = 300.0
+SNAPSHOT_SUFFIX = ".binpb"
+
+
+def snapshot_ttl() -> float:
+    """Return the number of seconds a cluster snapshot can be used before it is fetched again.
+
+    Preference will be given to the environment variable TEST_CLUSTER_SNAPSHOT_TTL with fallback to 300.
+    """
+    raw = os.getenv("TEST_CLUSTER_SNAPSHOT_TTL", "")
+    if raw.strip():
+        ttl = float(raw.strip())
+        assert ttl >= 0, "TEST_CLUSTER_SNAPSHOT_TTL must not be negative"
+        return ttl
+    return DEFAULT_TTL
+
+
+def snapshot_dir() -> pathlib.Path | None:
+    """Return the directory where cluster snapshots are persisted between runs, if TEST_CLUSTER_SNAPSHOT_DIR is set."""
+    raw = os.getenv("TEST_CLUSTER_SNAPSHOT_DIR", "").strip()
+    if not raw:
+        return None
+    return pathlib.Path(raw).resolve()
+
+
+def _copy(cluster: container_v1.Cluster) -> container_v1.Cluster:
+    """Return a copy of the Cluster that shares no state with it."""
+    copied = container_v1.Cluster.pb()()
+    copied.CopyFrom(container_v1.Cluster.pb(cluster))
+    return container_v1.Cluster.wrap(copied)
+
+
+@dataclass
+class _Snapshot:
+    """A serialised Cluster and the wall-clock time it was fetched, with the parsed message and projections cached."""
+
+    data: bytes
+    fetched_at: float
+    message: container_v1.Cluster | None = None
+    projections: dict[tuple[str, ...], container_v1.Cluster] = field(default_factory=dict)
+
+    def cluster(self) -> container_v1.Cluster:
+        """Return the Cluster, deserialising it on first use."""
+        if self.message is None:
+            self.message = container_v1.Cluster.deserialize(self.data)
+        return self.message
+
+
+@dataclass
+class ClusterSnapshots:
+    """Serve GKE Cluster snapshots keyed by cluster id, fetching from the API when a snapshot is missing or stale."""
+
+    client: container_v1.ClusterManagerClient
+    ttl: float = field(default_factory=snapshot_ttl)
+    directory: pathlib.Path | None = field(default_factory=snapshot_dir)
+    fetches: int = 0
+    hits: int = 0
+    snapshots: dict[str, _Snapshot] = field(default_factory=dict)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def get(self, cluster_id: str, *, refresh: bool = False) -> container_v1.Cluster:
+        """Return a copy of the Cluster for cluster id, fetching a new snapshot if refresh is True or it is stale."""
+        snapshot = self._snapshot(cluster_id, refresh=refresh)
+        with self.lock:
+            return _copy(snapshot.cluster())
+
+    def project(
+        self,
+        cluster_id: str,
+        paths: Iterable[str],
+        *,
+        refresh: bool = False,
+    ) -> container_v1.Cluster:
+        """Return a copy of the Cluster for cluster id that only holds the fields named by paths.
+
+        Paths use field mask syntax, e.g. "release_channel" or "private_cluster_config.master_ipv4_cidr_block". Raise a
+        ValueError if a path does not name a Cluster field. Projections are built from the parsed snapshot, and cached
+        with it by the set of paths.
+        """
+        key = tuple(sorted(set(paths)))
+        mask = field_mask_pb2.FieldMask(paths=list(key))
+        if not mask.IsValidForDescriptor(container_v1.Cluster.pb().DESCRIPTOR):
+            msg = f"invalid Cluster field mask: {mask.paths}"
+            raise ValueError(msg)
+        snapshot = self._snapshot(cluster_id, refresh=refresh)
+        with self.lock:
+            projection = snapshot.projections.get(key)
+            if projection is None:
+                message = container_v1.Cluster.pb()()
+                mask.MergeMessage(container_v1.Cluster.pb(snapshot.cluster()), message)
+                projection = snapshot.projections[key] = container_v1.Cluster.wrap(message)
+            return _copy(projection)
+
+    def invalidate(self, cluster_id: str) -> None:
+        """Discard any in-memory or persisted snapshot for cluster id."""
+        with self.lock:
+            self.snapshots.pop(cluster_id, None)
+            if self.directory is not None:
+                self._path(cluster_id).unlink(missing_ok=True)
+
+    def _snapshot(self, cluster_id: str, *, refresh: bool) -> _Snapshot:
+        """Return a fresh snapshot for cluster id from memory, disk, or the API in that order of preference."""
+        with self.lock:
+            snapshot = None if refresh else (self.snapshots.get(cluster_id) or self._load(cluster_id))
+            if snapshot is not None and self._fresh(snapshot):
+                self.hits += 1
+            else:
+                snapshot = self._fetch(cluster_id)
+            self.snapshots[cluster_id] = snapshot
+            return snapshot
+
+    def _fresh(self, snapshot: _Snapshot) -> bool:
+        """Determine if the snapshot is younger than the TTL."""
+        return time.time() - snapshot.fetched_at < self.ttl
+
+    def _fetch(self, cluster_id: str) -> _Snapshot:
+        """Fetch the cluster from the API, persisting the snapshot if a directory is configured."""
+        cluster = self.client.get_cluster(
+            request=container_v1.GetClusterRequest(
+                name=cluster_id,
+            ),
+        )
+        assert cluster
+        self.fetches += 1
+        snapshot = _Snapshot(data=container_v1.Cluster.serialize(cluster), fetched_at=time.time(), message=cluster)
+        if self.directory is not None:
+            self._save(cluster_id, snapshot)
+        return snapshot
+
+    def _path(self, cluster_id: str) -> pathlib.Path:
+        """Return the file that holds the persisted snapshot for cluster id."""
+        assert self.directory is not None
+        return self.directory.joinpath(hashlib.sha256(cluster_id.encode()).hexdigest()).with_suffix(SNAPSHOT_SUFFIX)
+
+    def _load(self, cluster_id: str) -> _Snapshot | None:
+        """Return the persisted snapshot for cluster id, if there is one."""
+        if self.directory is None:
+            return None
+        path = self._path(cluster_id)
+        try:
+            return _Snapshot(data=path.read_bytes(), fetched_at=path.stat().st_mtime)
+        except FileNotFoundError:
+            return None
+
+    def _save(self, cluster_id: str, snapshot: _Snapshot) -> None:
+        """Persist the snapshot for cluster id, replacing any existing file atomically."""
+        assert self.directory is not None
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=self.directory, suffix=SNAPSHOT_SUFFIX, delete=False) as tmp:
+            tmp.write(snapshot.data)
+        pathlib.Path(tmp.name).replace(self._path(cluster_id))
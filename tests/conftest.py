@@ -1,22 +1,25 @@
 """Common testing fixtures."""
 
-import base64
-import json
 import os
 import pathlib
-import subprocess
-import tempfile
-from collections.abc import Generator
+from collections.abc import Generator, Mapping
 from contextlib import contextmanager
-from typing import Any, cast
+from typing import Any
 
 import google.auth
-import google.auth.credentials
-import google.auth.transport.requests
 import kubernetes.client
 import pytest
 from google.cloud import artifactregistry_v1, container_v1, iam_admin_v1, resourcemanager_v3
 
+from .cassettes import REPLAY, cassette_client, cassette_mode
+from .cluster_snapshots import ClusterSnapshots
+from .fake_cluster_manager import fake_cluster_manager_client
+from .fake_tofu import FAKE_TOFU
+from .iam_policy import IamVerifier
+from .kubernetes_clients import KUBERNETES_CLIENTS, KubernetesClientFactory
+from .tofu_harness import DEFAULT_WORKER, FixtureRegistry, worker_id
+from .tofu_tracing import TRACER, Tracer, trace_file, trace_format
+
 DEFAULT_PREFIX = "pgke"
 DEFAULT_LABELS = {
     "use_case": "automated-tofu-testing",
@@ -24,6 +27,7 @@ DEFAULT_LABELS = {
     "driver": "pytest",
 }
 DEFAULT_REGION = "us-west1"
+SHARED_FIXTURE_NAME = "shared"
 
 
 @pytest.fixture(scope="session")
@@ -157,131 +161,104 @@ def kubeconfig_fixture_dir() -> pathlib.Path:
     return kubeconfig_fixture_dir
 
 
-def skip_destroy_phase() -> bool:
-    """Determine if tofu destroy phase should be skipped for successful fixtures."""
-    return os.getenv("TEST_SKIP_DESTROY_PHASE", "False").lower() in ["true", "t", "yes", "y", "1"]
+@pytest.fixture(scope="session")
+def fixture_registry() -> Generator[FixtureRegistry, None, None]:
+    """Yield a registry of tofu fixtures that are shared between test modules, destroying them at end of session."""
+    registry = FixtureRegistry()
+    yield registry
+    registry.close()
 
 
-@contextmanager
-def run_tofu_in_workspace(
-    fixture: pathlib.Path,
-    workspace: str | None,
-    tfvars: dict[str, Any] | None,
-) -> Generator[dict[str, Any], None, None]:
-    """Execute tofu init/apply/destroy lifecycle for a fixture in an optional workspace, yielding the output post-apply.
-
-    NOTE: Resources will not be destroyed if the test case raises an error.
+@pytest.fixture(scope="session")
+def shared_fixture_name(prefix: str) -> str:
+    """Return the name to use for resources that are shared between test modules.
+
+    NOTE: Each pytest-xdist worker has its own registry of shared fixtures, so the name includes the worker to keep the
+    resources, and the workspaces named from their tfvars, of different workers apart. Replayed cassettes are keyed by
+    the recorded tfvars, so the name is unchanged when replaying.
+    """
+    worker = worker_id()
+    if worker == DEFAULT_WORKER or cassette_mode() == REPLAY:
+        return f"{prefix}-{SHARED_FIXTURE_NAME}"
+    return f"{prefix}-{SHARED_FIXTURE_NAME}-{worker}"
+
+
+@pytest.fixture(scope="session")
+def shared_sa_tfvars(project_id: str, shared_fixture_name: str) -> dict[str, Any]:
+    """Return the tfvars for a service account that can be shared by any test module that needs a cluster."""
+    return {
+        "project_id": project_id,
+        "name": shared_fixture_name,
+    }
+
+
+@pytest.fixture(scope="session")
+def shared_vpc_tfvars(
+    project_id: str,
+    shared_fixture_name: str,
+    region: str,
+    labels: dict[str, str],
+) -> dict[str, Any]:
+    """Return the tfvars for a VPC and bastion that can be shared by any test module that needs a cluster.
+
+    NOTE: Private clusters in the same VPC must each use a unique master CIDR.
     """
-    if tfvars is None:
-        tfvars = {}
-    tf_command = os.getenv("TEST_TF_COMMAND", "tofu")
-    if workspace is not None and workspace != "":
-        subprocess.run(
-            [
-                tf_command,
-                f"-chdir={fixture!s}",
-                "workspace",
-                "select",
-                "-or-create",
-                workspace,
-            ],
-            check=True,
-            capture_output=True,
-        )
-    subprocess.run(
-        [
-            tf_command,
-            f"-chdir={fixture!s}",
-            "init",
-            "-no-color",
-        ],
-        check=True,
-        capture_output=True,
-    )
-    with tempfile.NamedTemporaryFile(
-        mode="w",
-        prefix="tfvars",
-        suffix=".json",
-        encoding="utf-8",
-        delete_on_close=False,
-        delete=True,
-    ) as tfvar_file:
-        json.dump(tfvars, tfvar_file, ensure_ascii=False, indent=2)
-        tfvar_file.close()
-        subprocess.run(
-            [
-                tf_command,
-                f"-chdir={fixture!s}",
-                "apply",
-                "-no-color",
-                "-auto-approve",
-                f"-var-file={tfvar_file.name}",
-            ],
-            check=True,
-            capture_output=True,
-        )
-        output = subprocess.run(
-            [
-                tf_command,
-                f"-chdir={fixture!s}",
-                "output",
-                "-no-color",
-                "-json",
-            ],
-            check=True,
-            capture_output=True,
-        )
-        try:
-            yield {k: v["value"] for k, v in json.loads(output.stdout).items()}
-            if not skip_destroy_phase():
-                subprocess.run(
-                    [
-                        tf_command,
-                        f"-chdir={fixture!s}",
-                        "destroy",
-                        "-no-color",
-                        "-auto-approve",
-                        f"-var-file={tfvar_file.name}",
-                    ],
-                    check=True,
-                    capture_output=True,
-                )
-        finally:
-            subprocess.run(
-                [
-                    tf_command,
-                    f"-chdir={fixture!s}",
-                    "workspace",
-                    "select",
-                    "default",
-                ],
-                check=True,
-                capture_output=True,
-            )
+    return {
+        "project_id": project_id,
+        "name": shared_fixture_name,
+        "region": region,
+        "labels": {
+            "fixture": SHARED_FIXTURE_NAME,
+        }
+        | labels,
+    }
 
 
 @pytest.fixture(scope="session")
 def iam_client() -> iam_admin_v1.IAMClient:
     """Return an IAM client."""
-    return iam_admin_v1.IAMClient()
+    return cassette_client(iam_admin_v1.IAMClient, "iam")
 
 
 @pytest.fixture(scope="session")
 def projects_client() -> resourcemanager_v3.ProjectsClient:
     """Return a Resource Manager Projects client."""
-    return resourcemanager_v3.ProjectsClient()
+    return cassette_client(resourcemanager_v3.ProjectsClient, "resourcemanager")
 
 
 @pytest.fixture(scope="session")
 def gar_client() -> artifactregistry_v1.ArtifactRegistryClient:
     """Return a GAR client."""
-    return artifactregistry_v1.ArtifactRegistryClient()
+    return cassette_client(artifactregistry_v1.ArtifactRegistryClient, "artifactregistry")
+
+
+@pytest.fixture(scope="session")
+def iam_verifier(
+    iam_client: iam_admin_v1.IAMClient,
+    projects_client: resourcemanager_v3.ProjectsClient,
+    gar_client: artifactregistry_v1.ArtifactRegistryClient,
+) -> IamVerifier:
+    """Return a cache of IAM policies and service accounts that is shared by every test module."""
+    return IamVerifier(projects_client=projects_client, gar_client=gar_client, iam_client=iam_client)
 
 
 @pytest.fixture(scope="session")
 def cluster_manager_client() -> container_v1.ClusterManagerClient:
-    """Return a Cluster Manager client."""
-    return container_v1.ClusterManagerClient()
+    """Return a Cluster Manager client.
+
+    If the environment variable TEST_CLUSTER_MANAGER_ENDPOINT is set, the client will call the fake Cluster Manager
+    service at that address instead of GKE.
+    """
+    endpoint = os.getenv("TEST_CLUSTER_MANAGER_ENDPOINT", "").strip()
+    if endpoint:
+        return fake_cluster_manager_client(endpoint)
+    return cassette_client(container_v1.ClusterManagerClient, "container")
+
+
+@pytest.fixture(scope="session")
+def cluster_snapshots(cluster_manager_client: container_v1.ClusterManagerClient) -> ClusterSnapshots:
+    """Return a cache of GKE Cluster snapshots that is shared by every test module."""
+    return ClusterSnapshots(client=cluster_manager_client)
 
 
 @contextmanager
@@ -292,35 +269,56 @@ def kubernetes_api_client(
 ) -> Generator[kubernetes.client.ApiClient, None, None]:
     """Yield a configured API client built from GKE parameters.
 
-    NOTE: API client expects CA certificate to be passed as a file, so this will create a temporary file that will be
-    destroyed after the API client is released.
+    NOTE: API clients are pooled by host, CA certificate and proxy for the session, and share credentials that are
+    refreshed in the background before they expire; see KubernetesClientFactory. Kubernetes API calls are not recorded
+    to cassettes, so the calling test is skipped when replaying.
+    """
+    if cassette_mode() == REPLAY:
+        pytest.skip("Kubernetes API calls cannot be replayed from cassettes")
+    client = KUBERNETES_CLIENTS.api_client(host=host, ca=ca, proxy_url=proxy_url)
+    assert client
+    yield client
+
+
+def release_kubernetes_clients(cluster_output: Mapping[str, Any]) -> None:
+    """Release the pooled API clients, and stop their informers, for every endpoint of a cluster being destroyed."""
+    hosts = [cluster_output.get(name) for name in ["endpoint_url", "public_endpoint_url"]]
+    KUBERNETES_CLIENTS.release(*(host for host in hosts if host))
+
+
+@pytest.fixture(scope="session", autouse=True)
+def kubernetes_clients() -> Generator[KubernetesClientFactory, None, None]:
+    """Yield the session-wide Kubernetes API client factory, closing its pooled clients at the end of the session."""
+    try:
+        yield KUBERNETES_CLIENTS
+    finally:
+        KUBERNETES_CLIENTS.close()
+
+
+@pytest.fixture(scope="session", autouse=True)
+def tofu_trace() -> Generator[Tracer, None, None]:
+    """Yield the session-wide tracer of tofu phases, writing its spans to TEST_TF_TRACE at the end of the session.
+
+    NOTE: Each pytest-xdist worker writes a separate trace, with the worker name added to the file name.
+    """
+    try:
+        yield TRACER
+    finally:
+        worker = worker_id()
+        path = trace_file(worker=None if worker == DEFAULT_WORKER else worker)
+        if path is not None:
+            TRACER.export(path, trace_format=trace_format())
+
+
+@pytest.fixture
+def fake_tofu(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch) -> pathlib.Path:
+    """Make the fake tofu executable the default, with a private plugin cache and its calls recorded in tmp_path.
+
+    NOTE: Failures and latency configured in the environment are cleared; see fake_tofu for the settings it reads.
     """
-    credentials, _ = google.auth.default()
-    credentials = cast("google.auth.credentials.Credentials", credentials)
-    request = google.auth.transport.requests.Request()
-    credentials.refresh(request)
-    with tempfile.NamedTemporaryFile(
-        mode="w+b",
-        prefix="ca",
-        suffix=".pem",
-        delete_on_close=False,
-        delete=True,
-    ) as ca_cert_file:
-        ca_cert_file.write(base64.standard_b64decode(ca))
-        ca_cert_file.close()
-        config = kubernetes.client.Configuration(
-            host=host,
-            api_key_prefix={
-                "authorization": "Bearer",
-            },
-            api_key={
-                "authorization": credentials.token,
-            },
-        )
-        config.ssl_ca_cert = ca_cert_file.name  # pyright: ignore[reportAttributeAccessIssue]
-        config.verify_ssl = True
-        if proxy_url:
-            config.proxy = proxy_url  # pyright: ignore[reportAttributeAccessIssue]
-        client = kubernetes.client.ApiClient(configuration=config)
-        assert client
-        yield client
+    monkeypatch.setenv("TEST_TF_COMMAND", str(FAKE_TOFU))
+    monkeypatch.setenv("TEST_TF_PLUGIN_CACHE_DIR", str(tmp_path / "plugins"))
+    monkeypatch.setenv("TEST_FAKE_TOFU_CALLS", str(tmp_path / "tofu-calls.jsonl"))
+    for variable in ["TEST_FAKE_TOFU_LATENCY", "TEST_FAKE_TOFU_FAIL", "TEST_SKIP_DESTROY_PHASE", "TF_WORKSPACE"]:
+        monkeypatch.delenv(variable, raising=False)
+    return FAKE_TOFU
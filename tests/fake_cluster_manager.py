@@ -0,0 +1,180 @@
+"""An in-process fake of the GKE Cluster Manager gRPC service, backed by an in-memory store of Cluster messages.
+
+NOTE: Only the read methods used by the assertion suites are implemented; every other method returns UNIMPLEMENTED.
+Responses are serialised once when a cluster is stored, so that the fake can be used to load-test assertion helpers
+without becoming the bottleneck.
+"""
+
+import threading
+from collections.abc import Callable, Generator, Mapping
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any
+
+import grpc
+from google.cloud import container_v1
+
+from .tofu_translator import clusters_from_json
+
+SERVICE_NAME = "google.container.v1.ClusterManager"
+DEFAULT_MAX_WORKERS = 8
+
+
+def cluster_name(project_id: str, location: str, cluster_id: str) -> str:
+    """Return the fully-qualified name of a cluster."""
+    return f"projects/{project_id}/locations/{location}/clusters/{cluster_id}"
+
+
+def _request_name(name: str, project_id: str, zone: str, cluster_id: str) -> str:
+    """Return the cluster name of a request, allowing for the deprecated project_id, zone and cluster_id fields."""
+    return name or cluster_name(project_id=project_id, location=zone, cluster_id=cluster_id)
+
+
+def _identity(data: bytes) -> bytes:
+    """Return pre-serialised response bytes unchanged."""
+    return data
+
+
+class FakeClusterManager:
+    """Store Cluster messages by name, and serve them through the ClusterManager gRPC methods."""
+
+    def __init__(self) -> None:
+        """Initialise an empty store."""
+        self._lock = threading.Lock()
+        self._clusters: dict[str, bytes] = {}
+        self._node_pools: dict[str, bytes] = {}
+        self._node_pool: dict[str, bytes] = {}
+        self.calls: dict[str, int] = {}
+
+    def add(self, cluster: container_v1.Cluster, project_id: str, location: str) -> str:
+        """Store a copy of cluster under its fully-qualified name, replacing any cluster with that name.
+
+        Return the fully-qualified name of the stored cluster.
+        """
+        name = cluster_name(project_id=project_id, location=location, cluster_id=cluster.name)
+        cluster = container_v1.Cluster(
+            cluster,
+            id=cluster.id or cluster.name,
+            location=cluster.location or location,
+            self_link=cluster.self_link or f"https://container.googleapis.com/v1/{name}",
+            status=cluster.status or container_v1.Cluster.Status.RUNNING,
+        )
+        node_pools = {
+            f"{name}/nodePools/{node_pool.name}": container_v1.NodePool(
+                node_pool,
+                self_link=node_pool.self_link
+                or f"https://container.googleapis.com/v1/{name}/nodePools/{node_pool.name}",
+                status=node_pool.status or container_v1.NodePool.Status.RUNNING,
+            )
+            for node_pool in cluster.node_pools
+        }
+        cluster.node_pools = list(node_pools.values())
+        with self._lock:
+            for pool_name in [pool_name for pool_name in self._node_pool if pool_name.startswith(f"{name}/")]:
+                del self._node_pool[pool_name]
+            self._clusters[name] = container_v1.Cluster.serialize(cluster)
+            self._node_pools[name] = container_v1.ListNodePoolsResponse.serialize(
+                container_v1.ListNodePoolsResponse(node_pools=cluster.node_pools),
+            )
+            self._node_pool.update(
+                {pool_name: container_v1.NodePool.serialize(pool) for pool_name, pool in node_pools.items()},
+            )
+        return name
+
+    def add_from_json(self, document: Mapping[str, Any], project_id: str, location: str) -> list[str]:
+        """Store every cluster in the JSON representation of a tofu plan or state, returning their names."""
+        return [self.add(cluster, project_id=project_id, location=location) for cluster in clusters_from_json(document)]
+
+    def remove(self, name: str) -> None:
+        """Remove the cluster with fully-qualified name, and its node pools, from the store."""
+        with self._lock:
+            self._clusters.pop(name, None)
+            self._node_pools.pop(name, None)
+            for pool_name in [pool_name for pool_name in self._node_pool if pool_name.startswith(f"{name}/")]:
+                del self._node_pool[pool_name]
+
+    def _lookup(self, store: dict[str, bytes], name: str, context: grpc.ServicerContext) -> bytes:
+        """Return the serialised message with name from store, aborting the call with NOT_FOUND if it is missing."""
+        with self._lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+            data = store.get(name)
+        if data is None:
+            context.abort(grpc.StatusCode.NOT_FOUND, f"{name} not found")
+        return data
+
+    def get_cluster(self, request: Any, context: grpc.ServicerContext) -> bytes:  # noqa: ANN401
+        """Return the serialised Cluster named by a GetClusterRequest."""
+        name = _request_name(request.name, request.project_id, request.zone, request.cluster_id)
+        return self._lookup(self._clusters, name, context)
+
+    def list_clusters(self, request: Any, context: grpc.ServicerContext) -> bytes:  # noqa: ANN401, ARG002
+        """Return a serialised ListClustersResponse for the clusters in the parent of a ListClustersRequest."""
+        parent = request.parent or f"projects/{request.project_id}/locations/{request.zone}"
+        with self._lock:
+            clusters = [
+                data
+                for name, data in self._clusters.items()
+                if name.startswith(f"{parent}/clusters/") or parent.endswith("/locations/-")
+            ]
+        return container_v1.ListClustersResponse.serialize(
+            container_v1.ListClustersResponse(clusters=[container_v1.Cluster.deserialize(data) for data in clusters]),
+        )
+
+    def list_node_pools(self, request: Any, context: grpc.ServicerContext) -> bytes:  # noqa: ANN401
+        """Return the serialised ListNodePoolsResponse for the cluster named by a ListNodePoolsRequest."""
+        name = _request_name(request.parent, request.project_id, request.zone, request.cluster_id)
+        return self._lookup(self._node_pools, name, context)
+
+    def get_node_pool(self, request: Any, context: grpc.ServicerContext) -> bytes:  # noqa: ANN401
+        """Return the serialised NodePool named by a GetNodePoolRequest."""
+        name = request.name or (
+            f"{_request_name('', request.project_id, request.zone, request.cluster_id)}/nodePools/"
+            f"{request.node_pool_id}"
+        )
+        return self._lookup(self._node_pool, name, context)
+
+    def handler(self) -> grpc.GenericRpcHandler:
+        """Return the handler for the ClusterManager service methods that are implemented."""
+
+        def method(
+            behaviour: Callable[[Any, grpc.ServicerContext], bytes],
+            request_type: type[Any],
+        ) -> grpc.RpcMethodHandler:
+            return grpc.unary_unary_rpc_method_handler(
+                behaviour,
+                request_deserializer=request_type.pb().FromString,
+                response_serializer=_identity,
+            )
+
+        return grpc.method_handlers_generic_handler(
+            SERVICE_NAME,
+            {
+                "GetCluster": method(self.get_cluster, container_v1.GetClusterRequest),
+                "ListClusters": method(self.list_clusters, container_v1.ListClustersRequest),
+                "ListNodePools": method(self.list_node_pools, container_v1.ListNodePoolsRequest),
+                "GetNodePool": method(self.get_node_pool, container_v1.GetNodePoolRequest),
+            },
+        )
+
+    @contextmanager
+    def serve(self, max_workers: int = DEFAULT_MAX_WORKERS) -> Generator[str, None, None]:
+        """Serve the fake on a free localhost port for the duration of the context, yielding its address."""
+        server = grpc.server(ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="fake-gke"))
+        server.add_generic_rpc_handlers((self.handler(),))
+        port = server.add_insecure_port("localhost:0")
+        server.start()
+        try:
+            yield f"localhost:{port}"
+        finally:
+            server.stop(grace=None)
+
+
+def fake_cluster_manager_client(endpoint: str) -> container_v1.ClusterManagerClient:
+    """Return a Cluster Manager client that calls the fake at endpoint without TLS or credentials."""
+    transport_class = container_v1.ClusterManagerClient.get_transport_class("grpc")
+    return container_v1.ClusterManagerClient(
+        transport=transport_class(
+            host=endpoint,
+            channel=grpc.insecure_channel(endpoint),
+        ),
+    )
@@ -0,0 +1,151 @@
+"""An in-process fake of the list and watch endpoints of the Kubernetes API, for offline tests of Kubernetes helpers.
+
+NOTE: Collections are identified by their URL path, e.g. /api/v1/namespaces or /api/v1/namespaces/default/services,
+and hold plain JSON objects. Only equality-based label selectors are supported.
+"""
+
+import json
+import threading
+import time
+import urllib.parse
+from collections.abc import Generator
+from contextlib import contextmanager
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, ClassVar
+
+# The longest a fake watch request is held open when the client does not set timeoutSeconds.
+DEFAULT_WATCH_SECONDS = 5.0
+
+
+def _matches(obj: dict[str, Any], label_selector: str) -> bool:
+    """Determine if the labels of obj satisfy an equality-based label selector."""
+    labels = obj.get("metadata", {}).get("labels") or {}
+    for requirement in filter(None, label_selector.split(",")):
+        key, _, value = requirement.partition("=")
+        if labels.get(key.strip()) != value.strip().lstrip("="):
+            return False
+    return True
+
+
+class FakeKubernetesApi:
+    """Store Kubernetes objects by collection path, and serve list and watch requests for them."""
+
+    def __init__(self) -> None:
+        """Initialise an empty store."""
+        self._condition = threading.Condition()
+        self._resource_version = 0
+        self._objects: dict[str, dict[str, dict[str, Any]]] = {}
+        self._events: list[tuple[int, str, str, dict[str, Any]]] = []
+        self.requests: list[tuple[str, dict[str, str]]] = []
+
+    def put(self, path: str, obj: dict[str, Any]) -> dict[str, Any]:
+        """Add or replace obj in the collection at path, returning the stored object with its new resource version."""
+        with self._condition:
+            self._resource_version += 1
+            metadata = obj.setdefault("metadata", {})
+            metadata["resourceVersion"] = str(self._resource_version)
+            collection = self._objects.setdefault(path, {})
+            event_type = "MODIFIED" if metadata["name"] in collection else "ADDED"
+            collection[metadata["name"]] = obj
+            self._events.append((self._resource_version, path, event_type, obj))
+            self._condition.notify_all()
+        return obj
+
+    def delete(self, path: str, name: str) -> None:
+        """Remove the object with name from the collection at path."""
+        with self._condition:
+            obj = self._objects.get(path, {}).pop(name)
+            self._resource_version += 1
+            self._events.append((self._resource_version, path, "DELETED", obj))
+            self._condition.notify_all()
+
+    def list_objects(self, path: str, label_selector: str) -> tuple[int, list[dict[str, Any]]]:
+        """Return the current resource version and the objects in the collection at path."""
+        with self._condition:
+            objects = [obj for obj in self._objects.get(path, {}).values() if _matches(obj, label_selector)]
+            return self._resource_version, objects
+
+    def events(
+        self,
+        path: str,
+        label_selector: str,
+        resource_version: int,
+        timeout_seconds: float,
+    ) -> Generator[tuple[str, dict[str, Any]], None, None]:
+        """Yield the events for the collection at path after resource version, until the timeout expires."""
+        deadline = time.monotonic() + timeout_seconds
+        position = 0
+        while True:
+            with self._condition:
+                pending = [
+                    (event_type, obj)
+                    for version, event_path, event_type, obj in self._events[position:]
+                    if version > resource_version and event_path == path and _matches(obj, label_selector)
+                ]
+                position = len(self._events)
+                if not pending:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return
+                    self._condition.wait(remaining)
+                    continue
+            yield from pending
+
+    def handler(self) -> type[BaseHTTPRequestHandler]:
+        """Return a request handler class that serves this fake."""
+        fake = self
+
+        class _Handler(BaseHTTPRequestHandler):
+            # Watch events are streamed with chunked transfer encoding, like the real API server.
+            protocol_version = "HTTP/1.1"
+            store: ClassVar[FakeKubernetesApi] = fake
+
+            def log_message(self, format: str, *args: Any) -> None:  # noqa: A002, ANN401
+                """Silence request logging."""
+
+            def do_GET(self) -> None:
+                url = urllib.parse.urlsplit(self.path)
+                query = dict(urllib.parse.parse_qsl(url.query))
+                self.store.requests.append((url.path, query))
+                label_selector = query.get("labelSelector", "")
+                if query.get("watch") in {"true", "1"}:
+                    self.send_response(HTTPStatus.OK)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Transfer-Encoding", "chunked")
+                    self.end_headers()
+                    for event_type, obj in self.store.events(
+                        path=url.path,
+                        label_selector=label_selector,
+                        resource_version=int(query.get("resourceVersion") or 0),
+                        timeout_seconds=float(query.get("timeoutSeconds") or DEFAULT_WATCH_SECONDS),
+                    ):
+                        self._write_chunk(json.dumps({"type": event_type, "object": obj}).encode() + b"\n")
+                    self._write_chunk(b"")
+                    return
+                resource_version, items = self.store.list_objects(url.path, label_selector)
+                body = json.dumps({"metadata": {"resourceVersion": str(resource_version)}, "items": items}).encode()
+                self.send_response(HTTPStatus.OK)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _write_chunk(self, data: bytes) -> None:
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+
+        return _Handler
+
+    @contextmanager
+    def serve(self) -> Generator[str, None, None]:
+        """Serve the fake on a free localhost port for the duration of the context, yielding its base URL."""
+        server = ThreadingHTTPServer(("127.0.0.1", 0), self.handler())
+        server.daemon_threads = True
+        thread = threading.Thread(target=server.serve_forever, name="fake-kubernetes-api", daemon=True)
+        thread.start()
+        try:
+            yield f"http://127.0.0.1:{server.server_address[1]}"
+        finally:
+            server.shutdown()
+            server.server_close()
@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""A stand-in for the tofu executable, so the harness can be exercised and profiled without cloud credentials.
+
+Set the environment variable TEST_TF_COMMAND to the path of this file to use it. It implements the subset of tofu that
+the harness uses: init, workspace select/new/show/list, plan -detailed-exitcode, apply, output -json and destroy, with
+-json UI messages for apply and destroy. Workspaces are kept as tofu keeps them for the local backend, the selected
+workspace is read from TF_WORKSPACE or the data directory named by TF_DATA_DIR, and the state of a workspace records the
+tfvars it was applied with and the outputs synthesised from the outputs.tf of the fixture.
+
+The environment variable TEST_FAKE_TOFU_LATENCY adds a delay to every command, as a number of seconds or as
+comma-separated command=seconds pairs where * matches any command. TEST_FAKE_TOFU_FAIL is a comma-separated list of
+commands that fail, each optionally restricted to one fixture directory name with command@fixture. When
+TEST_FAKE_TOFU_CALLS names a file, the arguments of every command are appended to it as a JSON line, with the fixture
+directory it was run in; read them back with read_calls.
+
+NOTE: Outputs are synthesised from the name of each output: a literal value or var reference is evaluated against the
+tfvars, an object literal is synthesised field by field, and any other expression is replaced by a placeholder that
+looks like the output it stands for, such as an IP address for a name ending in ip_address.
+"""
+
+import datetime as dt
+import json
+import os
+import pathlib
+import re
+import shutil
+import sys
+import tempfile
+import time
+from collections.abc import Sequence
+from typing import Any
+
+FAKE_TOFU = pathlib.Path(__file__).resolve()
+REPO_ROOT = FAKE_TOFU.parent.parent
+STATE_FILE = "terraform.tfstate"
+WORKSPACES_DIR = "terraform.tfstate.d"
+DEFAULT_WORKSPACE = "default"
+DEFAULT_DATA_DIR = ".terraform"
+ENVIRONMENT_FILE = "environment"
+# The directory that init creates in the data directory, without which other commands fail.
+PROVIDERS_DIR = "providers"
+PLAN_HAS_CHANGES = 2
+OUTPUT_BLOCK = re.compile(r'^output\s+"(?P<name>[^"]+)"\s*\{(?P<body>.*?)^\}', re.MULTILINE | re.DOTALL)
+RESOURCE_BLOCK = re.compile(r'^(?P<kind>resource|module)\s+"(?P<type>[^"]+)"(?:\s+"(?P<name>[^"]+)")?', re.MULTILINE)
+ATTRIBUTE = re.compile(r"^\s*(?P<key>\w+)\s*=\s*(?P<expr>.+?)\s*$", re.MULTILINE)
+VAR_REFERENCE = re.compile(r"^var\.(?P<name>\w+)$")
+INTERPOLATION = re.compile(r"\$\{\s*var\.(?P<name>\w+)\s*\}")
+# Placeholders for outputs that cannot be evaluated, by the name of the output or the last words of its name.
+PLACEHOLDERS = {
+    "ip_address": "192.0.2.1",
+    "my_address": "192.0.2.1",
+    "url": "https://192.0.2.1",
+    "email": "{name}@{project}.iam.gserviceaccount.com",
+    "member": "serviceAccount:{name}@{project}.iam.gserviceaccount.com",
+    "id": "projects/{project}/locations/fake/{name}",
+    "self_link": "https://www.googleapis.com/compute/v1/projects/{project}/fake/{name}",
+}
+
+
+class TofuError(Exception):
+    """An error that is reported as a tofu diagnostic, with a non-zero exit code."""
+
+
+def _configured(variable: str) -> dict[str, str]:
+    """Return the comma-separated key=value pairs of an environment variable; a bare value is keyed by *."""
+    pairs: dict[str, str] = {}
+    for item in os.getenv(variable, "").split(","):
+        if not item.strip():
+            continue
+        key, _, value = item.strip().rpartition("=")
+        pairs[key.strip() or "*"] = value.strip()
+    return pairs
+
+
+def latency(command: str) -> float:
+    """Return the seconds that command is delayed by TEST_FAKE_TOFU_LATENCY."""
+    configured = _configured("TEST_FAKE_TOFU_LATENCY")
+    return float(configured.get(command, configured.get("*", "0")))
+
+
+def fails(command: str, fixture: pathlib.Path) -> bool:
+    """Determine if TEST_FAKE_TOFU_FAIL makes command fail in the fixture directory."""
+    failures = {item.strip() for item in os.getenv("TEST_FAKE_TOFU_FAIL", "").split(",") if item.strip()}
+    return command in failures or f"{command}@{fixture.name}" in failures
+
+
+class FakeTofu:
+    """Execute one tofu command against the fake state of a fixture directory."""
+
+    def __init__(self, fixture: pathlib.Path, *, json_ui: bool = False) -> None:
+        """Operate on the fixture directory, writing JSON UI messages if json_ui is True."""
+        self.fixture = fixture
+        self.json_ui = json_ui
+        self.data_dir = fixture.joinpath(os.getenv("TF_DATA_DIR") or DEFAULT_DATA_DIR)
+
+    def message(self, message: str, kind: str = "log", level: str = "info", **fields: Any) -> None:  # noqa: ANN401
+        """Write a message, as a JSON UI message if json_ui is True."""
+        if not self.json_ui:
+            print(message)  # noqa: T201
+            return
+        ui_message = {
+            "@level": level,
+            "@message": message,
+            "@module": "tofu.ui",
+            "@timestamp": dt.datetime.now(tz=dt.UTC).isoformat(),
+            "type": kind,
+            **fields,
+        }
+        print(json.dumps(ui_message), flush=True)  # noqa: T201
+
+    def workspace(self) -> str:
+        """Return the selected workspace."""
+        if os.getenv("TF_WORKSPACE"):
+            return os.environ["TF_WORKSPACE"]
+        environment = self.data_dir.joinpath(ENVIRONMENT_FILE)
+        return environment.read_text(encoding="utf-8").strip() if environment.exists() else DEFAULT_WORKSPACE
+
+    def workspaces(self) -> list[str]:
+        """Return every workspace of the fixture."""
+        workspaces = self.fixture.joinpath(WORKSPACES_DIR)
+        named = sorted(path.name for path in workspaces.iterdir() if path.is_dir()) if workspaces.is_dir() else []
+        return [DEFAULT_WORKSPACE, *named]
+
+    def state_file(self) -> pathlib.Path:
+        """Return the state file of the selected workspace."""
+        workspace = self.workspace()
+        if workspace == DEFAULT_WORKSPACE:
+            return self.fixture.joinpath(STATE_FILE)
+        return self.fixture.joinpath(WORKSPACES_DIR, workspace, STATE_FILE)
+
+    def state(self) -> dict[str, Any] | None:
+        """Return the state of the selected workspace, or None if nothing has been applied."""
+        state_file = self.state_file()
+        if not state_file.exists():
+            return None
+        return json.loads(state_file.read_text(encoding="utf-8"))
+
+    def write_state(self, state: dict[str, Any] | None) -> None:
+        """Replace the state of the selected workspace atomically, or remove it if state is None."""
+        state_file = self.state_file()
+        if state is None:
+            state_file.unlink(missing_ok=True)
+            return
+        state_file.parent.mkdir(parents=True, exist_ok=True)
+        with tempfile.NamedTemporaryFile(mode="w", dir=state_file.parent, delete=False, encoding="utf-8") as temp:
+            json.dump(state, temp)
+        pathlib.Path(temp.name).replace(state_file)
+
+    def require_init(self) -> None:
+        """Raise a TofuError unless init has been executed in the data directory."""
+        if not self.data_dir.joinpath(PROVIDERS_DIR).is_dir():
+            msg = "Required plugins are not installed; run tofu init"
+            raise TofuError(msg)
+
+    def resources(self) -> list[str]:
+        """Return the addresses of the resources and modules declared by the fixture."""
+        addresses: list[str] = []
+        for path in sorted(self.fixture.glob("*.tf")):
+            for match in RESOURCE_BLOCK.finditer(path.read_text(encoding="utf-8")):
+                if match["kind"] == "module":
+                    addresses.append(f"module.{match['type']}")
+                elif match["name"]:
+                    addresses.append(f"{match['type']}.{match['name']}")
+        return addresses
+
+    def outputs(self, tfvars: dict[str, Any]) -> dict[str, dict[str, Any]]:
+        """Return the outputs of the fixture, synthesised from outputs.tf and the tfvars."""
+        outputs: dict[str, dict[str, Any]] = {}
+        for path in sorted(self.fixture.glob("*.tf")):
+            for match in OUTPUT_BLOCK.finditer(path.read_text(encoding="utf-8")):
+                body = match["body"]
+                attributes = {m["key"]: m["expr"] for m in ATTRIBUTE.finditer(body)}
+                if attributes.get("value") == "{":
+                    inner = body[body.index("{") + 1 : body.rindex("}")]
+                    value: Any = {m["key"]: synthesise(m["key"], m["expr"], tfvars) for m in ATTRIBUTE.finditer(inner)}
+                else:
+                    value = synthesise(match["name"], attributes.get("value", "null"), tfvars)
+                outputs[match["name"]] = {
+                    "sensitive": attributes.get("sensitive") == "true",
+                    "type": "object" if isinstance(value, dict) else "string",
+                    "value": value,
+                }
+        return outputs
+
+    def apply(self, tfvars: dict[str, Any], *, destroy: bool = False) -> None:
+        """Apply the tfvars to the selected workspace, or destroy it, writing a hook message for every resource.
+
+        The latency of the command is divided between the resources.
+        """
+        self.require_init()
+        action = "delete" if destroy else "create"
+        addresses = self.resources()
+        delay = latency("destroy" if destroy else "apply") / max(len(addresses), 1)
+        for address in reversed(addresses) if destroy else addresses:
+            hook = {"resource": {"addr": address}, "action": action}
+            self.message(f"{address}: {'Destroying' if destroy else 'Creating'}...", "apply_start", hook=hook)
+            time.sleep(delay)
+            self.message(
+                f"{address}: {'Destruction' if destroy else 'Creation'} complete",
+                "apply_complete",
+                hook=hook | {"elapsed_seconds": int(delay)},
+            )
+        self.write_state(None if destroy else {"tfvars": tfvars, "outputs": self.outputs(tfvars)})
+        self.message(f"{'Destroy' if destroy else 'Apply'} complete!", "change_summary")
+
+    def run(self, command: str, args: Sequence[str], options: dict[str, str]) -> int:
+        """Execute command with its positional arguments and options, returning the exit code."""
+        if fails(command, self.fixture):
+            msg = f"{command} failed, as requested by TEST_FAKE_TOFU_FAIL"
+            raise TofuError(msg)
+        match command:
+            case "init":
+                self.data_dir.joinpath(PROVIDERS_DIR).mkdir(parents=True, exist_ok=True)
+                self.message("OpenTofu has been successfully initialized!")
+            case "workspace":
+                self.run_workspace(args, options)
+            case "apply" | "destroy":
+                self.apply(read_tfvars(options), destroy=command == "destroy")
+            case "plan":
+                self.require_init()
+                state = self.state()
+                if state is None or state["tfvars"] != read_tfvars(options):
+                    self.message("Plan: changes to apply")
+                    return PLAN_HAS_CHANGES if "detailed-exitcode" in options else 0
+                self.message("No changes.")
+            case "output":
+                self.require_init()
+                outputs = (self.state() or {}).get("outputs", {})
+                print(json.dumps(outputs if "json" in options else {k: v["value"] for k, v in outputs.items()}))  # noqa: T201
+            case _:
+                msg = f"{command} is not implemented by the fake tofu executable"
+                raise TofuError(msg)
+        return 0
+
+    def run_workspace(self, args: Sequence[str], options: dict[str, str]) -> None:
+        """Execute a workspace subcommand."""
+        subcommand, *names = args or ["show"]
+        match subcommand:
+            case "show":
+                print(self.workspace())  # noqa: T201
+            case "list":
+                for workspace in self.workspaces():
+                    print(f"{'*' if workspace == self.workspace() else ' '} {workspace}")  # noqa: T201
+            case "select" | "new" if names:
+                if os.getenv("TF_WORKSPACE"):
+                    msg = "The selected workspace is currently overridden using the TF_WORKSPACE environment variable"
+                    raise TofuError(msg)
+                name = names[0]
+                exists = name in self.workspaces()
+                if subcommand == "select" and not exists and "or-create" not in options:
+                    msg = f'Workspace "{name}" doesn\'t exist'
+                    raise TofuError(msg)
+                if subcommand == "new" and exists:
+                    msg = f'Workspace "{name}" already exists'
+                    raise TofuError(msg)
+                if name != DEFAULT_WORKSPACE:
+                    self.fixture.joinpath(WORKSPACES_DIR, name).mkdir(parents=True, exist_ok=True)
+                self.data_dir.mkdir(parents=True, exist_ok=True)
+                self.data_dir.joinpath(ENVIRONMENT_FILE).write_text(name, encoding="utf-8")
+                self.message(f'Switched to workspace "{name}".')
+            case _:
+                msg = f"workspace {subcommand} is not implemented by the fake tofu executable"
+                raise TofuError(msg)
+
+
+def synthesise(name: str, expression: str, tfvars: dict[str, Any]) -> Any:  # noqa: ANN401
+    """Return a value for an output expression: literals and var references are evaluated, anything else invented."""
+    expression = expression.strip()
+    if reference := VAR_REFERENCE.match(expression):
+        return tfvars.get(reference["name"])
+    if expression.startswith('"') and expression.endswith('"'):
+        return INTERPOLATION.sub(lambda m: str(tfvars.get(m["name"], "")), expression[1:-1])
+    placeholder = next(
+        (value for suffix, value in PLACEHOLDERS.items() if name == suffix or name.endswith(f"_{suffix}")),
+        "{name}-{output}",
+    )
+    return placeholder.format(
+        name=tfvars.get("name") or "fake",
+        project=tfvars.get("project_id") or "fake-project",
+        output=name,
+    )
+
+
+def read_tfvars(options: dict[str, str]) -> dict[str, Any]:
+    """Return the tfvars read from the -var-file option, or an empty dict."""
+    var_file = options.get("var-file")
+    if not var_file:
+        return {}
+    return json.loads(pathlib.Path(var_file).read_text(encoding="utf-8"))
+
+
+def record_call(fixture: pathlib.Path, args: Sequence[str]) -> None:
+    """Append the arguments of a command run in the fixture directory to the file named by TEST_FAKE_TOFU_CALLS."""
+    calls = os.getenv("TEST_FAKE_TOFU_CALLS", "").strip()
+    if not calls:
+        return
+    with pathlib.Path(calls).open(mode="a", encoding="utf-8") as log:
+        log.write(json.dumps({"fixture": str(fixture), "args": list(args)}) + "\n")
+
+
+def read_calls(fixture: pathlib.Path | None = None) -> list[list[str]]:
+    """Return the arguments of every command recorded in TEST_FAKE_TOFU_CALLS, only those run in fixture if given."""
+    calls = pathlib.Path(os.environ["TEST_FAKE_TOFU_CALLS"])
+    if not calls.exists():
+        return []
+    records = [json.loads(line) for line in calls.read_text(encoding="utf-8").splitlines()]
+    return [record["args"] for record in records if fixture is None or record["fixture"] == str(fixture.resolve())]
+
+
+def copy_fixture(fixture: pathlib.Path, destination: pathlib.Path) -> pathlib.Path:
+    """Copy a fixture and the module sources it calls, preserving their layout, and return the copied fixture.
+
+    NOTE: Copies keep the state of the fake executable out of the fixture directories that real tofu uses.
+    """
+    destination.mkdir(parents=True, exist_ok=True)
+    for path in REPO_ROOT.glob("*.tf"):
+        shutil.copy(path, destination)
+    ignore = shutil.ignore_patterns(".terraform*", "terraform.tfstate*")
+    shutil.copytree(REPO_ROOT / "modules", destination / "modules", ignore=ignore, dirs_exist_ok=True)
+    copied = destination.joinpath(fixture.resolve().relative_to(REPO_ROOT))
+    return pathlib.Path(shutil.copytree(fixture, copied, ignore=ignore))
+
+
+def main(argv: Sequence[str]) -> int:
+    """Parse a tofu command line and execute it, returning the exit code."""
+    fixture = pathlib.Path.cwd()
+    command: str | None = None
+    args: list[str] = []
+    options: dict[str, str] = {}
+    for arg in argv:
+        if arg.startswith("-chdir=") and command is None:
+            fixture = pathlib.Path(arg.removeprefix("-chdir="))
+        elif arg.startswith("-"):
+            key, _, value = arg.lstrip("-").partition("=")
+            options[key] = value
+        elif command is None:
+            command = arg
+        else:
+            args.append(arg)
+    record_call(fixture.resolve(), [arg for arg in argv if not arg.startswith("-chdir=")])
+    if command is None:
+        print("Usage: tofu [global options] <subcommand> [args]", file=sys.stderr)  # noqa: T201
+        return 1
+    tofu = FakeTofu(fixture.resolve(), json_ui="json" in options and command in ["apply", "destroy", "plan"])
+    if command not in ["apply", "destroy"]:
+        time.sleep(latency(command))
+    try:
+        return tofu.run(command, args, options)
+    except TofuError as exc:
+        if tofu.json_ui:
+            tofu.message(f"Error: {exc}", "diagnostic", level="error")
+        print(f"Error: {exc}", file=sys.stderr)  # noqa: T201
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
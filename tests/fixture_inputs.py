@@ -0,0 +1,35 @@
+"""Module inputs that are shared by the live fixture tests and the offline plan-only tests."""
+
+# The node pool of the root-fixed-pool fixture.
+FIXED_NODE_POOL_CONFIG = {
+    "image_type": "COS_CONTAINERD",
+    "auto_upgrade": True,
+    "autoscaling": False,
+    "min_nodes_per_zone": 1,
+    "max_nodes_per_zone": 3,
+    "location_policy": None,
+    "auto_repair": True,
+    "disk_size": 20,
+    "disk_type": "pd-standard",
+    "labels": None,
+    "local_ssd_count": 0,
+    "ephemeral_local_ssd_count": 0,
+    "machine_type": "e2-medium",
+    "min_cpu_platform": None,
+    "preemptible": True,
+    "spot": False,
+    "boot_disk_kms_key": None,
+    "enable_gcfs": False,
+    "enable_gvnic": False,
+    "enable_gvisor_sandbox": False,
+    "enable_secure_boot": False,
+    "enable_integrity_monitoring": True,
+    "max_surge": 1,
+    "max_unavailable": 0,
+    "placement_policy": None,
+    "metadata": None,
+    "sysctls": None,
+    "taints": None,
+    "tags": None,
+    "gpus": None,
+}
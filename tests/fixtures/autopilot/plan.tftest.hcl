@@ -0,0 +1,16 @@
+# Plan the fixture against mocked Google providers, so that it can be verified offline by the plan-only test tier.
+# NOTE: The values mocked here must match PLAN_REGION and PLAN_NETWORK in tests/test_plan.py.
+mock_provider "google" {
+  mock_data "google_compute_subnetwork" {
+    defaults = {
+      region  = "us-west1"
+      network = "https://www.googleapis.com/compute/v1/projects/offline/global/networks/offline"
+    }
+  }
+}
+
+mock_provider "google-beta" {}
+
+run "plan" {
+  command = plan
+}
@@ -8,6 +8,7 @@ from collections.abc import MutableSequence
 from google.cloud import container_v1
 
 from .gke_common_assertions import (
+    ASSERTED_CLUSTER_FIELDS,
     assert_anonymous_authentication_config,
     assert_compliance_posture_config,
     assert_default_authenticator_groups_config,
@@ -223,6 +224,7 @@ def assert_rbac_binding_config(rbac_binding_config: container_v1.RBACBindingConf
 
 
 __all__ = [
+    "ASSERTED_CLUSTER_FIELDS",
     "assert_anonymous_authentication_config",
     "assert_compliance_posture_config",
     "assert_default_addons_config",
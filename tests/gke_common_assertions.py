@@ -8,6 +8,64 @@ from collections.abc import Mapping, MutableMapping
 
 from google.cloud import container_v1
 
+# The top-level Cluster fields read by the assertion suites; tests project the cluster snapshot onto these fields
+# rather than asserting against the full message.
+ASSERTED_CLUSTER_FIELDS = (
+    "addons_config",
+    "alpha_cluster_feature_gates",
+    "anonymous_authentication_config",
+    "authenticator_groups_config",
+    "autopilot",
+    "autoscaling",
+    "binary_authorization",
+    "compliance_posture_config",
+    "confidential_nodes",
+    "control_plane_endpoints_config",
+    "cost_management_config",
+    "database_encryption",
+    "default_max_pods_constraint",
+    "description",
+    "enable_k8s_beta_apis",
+    "enable_kubernetes_alpha",
+    "enable_tpu",
+    "enterprise_config",
+    "fleet",
+    "gke_auto_upgrade_config",
+    "identity_service_config",
+    "initial_node_count",
+    "ip_allocation_policy",
+    "legacy_abac",
+    "location",
+    "logging_config",
+    "logging_service",
+    "maintenance_policy",
+    "master_auth",
+    "mesh_certificates",
+    "monitoring_config",
+    "monitoring_service",
+    "name",
+    "network",
+    "network_config",
+    "network_policy",
+    "node_pool_auto_config",
+    "node_pool_defaults",
+    "node_pools",
+    "notification_config",
+    "pod_autoscaling",
+    "rbac_binding_config",
+    "release_channel",
+    "resource_labels",
+    "resource_usage_export_config",
+    "secret_manager_config",
+    "security_posture_config",
+    "shielded_nodes",
+    "status",
+    "subnetwork",
+    "user_managed_keys_config",
+    "vertical_pod_autoscaling",
+    "workload_identity_config",
+)
+
 
 def assert_default_release_channel(release_channel: container_v1.ReleaseChannel | None) -> None:
     """Raise an AssertionError if the release channel does not meet default module expectations."""
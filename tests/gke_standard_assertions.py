@@ -10,6 +10,7 @@ from typing import Any
 from google.cloud import container_v1
 
 from .gke_common_assertions import (
+    ASSERTED_CLUSTER_FIELDS,
     assert_anonymous_authentication_config,
     assert_compliance_posture_config,
     assert_default_authenticator_groups_config,
@@ -280,6 +281,7 @@ def assert_node_config(config: container_v1.NodeConfig, settings: dict[str, Any]
 
 
 __all__ = [
+    "ASSERTED_CLUSTER_FIELDS",
     "assert_anonymous_authentication_config",
     "assert_compliance_posture_config",
     "assert_default_addons_config",
@@ -0,0 +1,216 @@
+"""Index the bindings of fetched IAM policies, and verify role expectations against them in batches.
+
+NOTE: Shared CI projects can have thousands of bindings; a PolicyIndex is built once per fetched Policy and answers
+membership questions from role and member maps. Conditional bindings are indexed with the unconditional ones, by role.
+An IamVerifier caches the policies and service accounts it fetches for the session, fetching any that are missing
+concurrently; a policy that does not satisfy an expectation is fetched again once, in case it was cached before a later
+fixture granted the role.
+"""
+
+import re
+import threading
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from google.cloud import artifactregistry_v1, iam_admin_v1, resourcemanager_v3
+from google.iam.v1 import policy_pb2
+
+DEFAULT_MAX_WORKERS = 8
+PROJECT_RESOURCE = re.compile(r"^projects/[^/]+$")
+REPOSITORY_RESOURCE = re.compile(r"^projects/[^/]+/locations/[^/]+/repositories/[^/]+$")
+
+
+@dataclass(frozen=True)
+class RoleDiff:
+    """The expected roles a member is missing, and the roles it has that were not expected."""
+
+    member: str
+    missing: frozenset[str] = frozenset()
+    unexpected: frozenset[str] = frozenset()
+
+    @property
+    def ok(self) -> bool:
+        """Determine if the member has exactly the expected roles."""
+        return not self.missing and not self.unexpected
+
+    def __str__(self) -> str:
+        """Describe the differences for an assertion message."""
+        return (
+            f"{self.member}: missing roles {sorted(self.missing) or 'none'}, "
+            f"unexpected roles {sorted(self.unexpected) or 'none'}"
+        )
+
+
+class PolicyIndex:
+    """Map the roles of an IAM policy to their members, and each member to its roles."""
+
+    def __init__(self, policy: policy_pb2.Policy) -> None:
+        """Build the role and member maps from the bindings of policy."""
+        self.etag = policy.etag
+        self._members: dict[str, set[str]] = {}
+        self._roles: dict[str, set[str]] = {}
+        self._bindings: dict[str, int] = {}
+        for binding in policy.bindings:
+            self._bindings[binding.role] = self._bindings.get(binding.role, 0) + 1
+            self._members.setdefault(binding.role, set()).update(binding.members)
+            for member in binding.members:
+                self._roles.setdefault(member, set()).add(binding.role)
+
+    def has_role(self, member: str, role: str) -> bool:
+        """Determine if member is bound to role."""
+        return role in self._roles.get(member, ())
+
+    def members(self, role: str) -> frozenset[str]:
+        """Return the members bound to role."""
+        return frozenset(self._members.get(role, ()))
+
+    def roles(self, member: str) -> frozenset[str]:
+        """Return the roles bound to member."""
+        return frozenset(self._roles.get(member, ()))
+
+    def binding_count(self, role: str) -> int:
+        """Return the number of bindings for role; more than one means some have conditions."""
+        return self._bindings.get(role, 0)
+
+    def diff(self, member: str, expected_roles: Iterable[str]) -> RoleDiff:
+        """Return the expected roles that member is missing, and the roles it has that were not expected."""
+        expected = frozenset(expected_roles)
+        actual = self.roles(member)
+        return RoleDiff(member=member, missing=expected - actual, unexpected=actual - expected)
+
+
+def assert_member_roles(index: PolicyIndex, member: str, expected_roles: Iterable[str]) -> None:
+    """Raise an AssertionError unless member has exactly the expected roles, each from a single binding."""
+    expected = list(expected_roles)
+    diff = index.diff(member=member, expected_roles=expected)
+    assert diff.ok, f"IAM roles differ for {diff}"
+    multiple = [role for role in expected if index.binding_count(role) != 1]
+    assert not multiple, f"IAM roles {multiple} have more than one binding"
+
+
+@dataclass(frozen=True)
+class RoleExpectation:
+    """Expect member to be bound to role in the IAM policy of resource, a project or Artifact Registry repository."""
+
+    member: str
+    resource: str
+    role: str
+
+
+@dataclass(frozen=True)
+class RoleCheck:
+    """The outcome of checking a RoleExpectation."""
+
+    expectation: RoleExpectation
+    granted: bool
+
+
+@dataclass
+class IamVerifier:
+    """Fetch and cache IAM policies and service accounts for the session, and verify role expectations against them."""
+
+    projects_client: resourcemanager_v3.ProjectsClient
+    gar_client: artifactregistry_v1.ArtifactRegistryClient
+    iam_client: iam_admin_v1.IAMClient
+    max_workers: int = DEFAULT_MAX_WORKERS
+    fetches: int = 0
+    hits: int = 0
+    policies: dict[str, PolicyIndex] = field(default_factory=dict)
+    service_accounts: dict[str, iam_admin_v1.ServiceAccount] = field(default_factory=dict)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    def policy(self, resource: str, *, refresh: bool = False) -> PolicyIndex:
+        """Return the indexed IAM policy of resource, fetching it if refresh is True or it has not been fetched."""
+        return self.prefetch([resource], refresh=refresh)[0]
+
+    def prefetch(self, resources: Iterable[str], *, refresh: bool = False) -> list[PolicyIndex]:
+        """Return the indexed IAM policies of resources in order, fetching those that are needed concurrently."""
+        resources = list(resources)
+        with self.lock:
+            missing = sorted({r for r in resources if refresh or r not in self.policies})
+            self.hits += len(set(resources)) - len(missing)
+        self._fetch_concurrently(missing, self._fetch_policy, self.policies)
+        with self.lock:
+            return [self.policies[resource] for resource in resources]
+
+    def service_account(self, name: str, *, refresh: bool = False) -> iam_admin_v1.ServiceAccount:
+        """Return the service account with name, fetching it if refresh is True or it has not been fetched."""
+        with self.lock:
+            cached = None if refresh else self.service_accounts.get(name)
+            if cached is not None:
+                self.hits += 1
+                return cached
+        self._fetch_concurrently([name], self._fetch_service_account, self.service_accounts)
+        with self.lock:
+            return self.service_accounts[name]
+
+    def invalidate(self, resource: str) -> None:
+        """Discard the cached IAM policy of resource."""
+        with self.lock:
+            self.policies.pop(resource, None)
+
+    def check(self, expectations: Iterable[RoleExpectation]) -> list[RoleCheck]:
+        """Check every expectation against the cached policies, fetching policies that fail a check once more."""
+        expectations = list(expectations)
+        self.prefetch(e.resource for e in expectations)
+        stale = {e.resource for e in expectations if not self._granted(e)}
+        if stale:
+            self.prefetch(stale, refresh=True)
+        return [RoleCheck(expectation=e, granted=self._granted(e)) for e in expectations]
+
+    def assert_granted(self, expectations: Iterable[RoleExpectation]) -> list[RoleCheck]:
+        """Raise an AssertionError naming every expectation that is not granted; otherwise return the checks."""
+        checks = self.check(expectations)
+        denied = [
+            f"{c.expectation.member} lacks {c.expectation.role} on {c.expectation.resource}"
+            for c in checks
+            if not c.granted
+        ]
+        assert not denied, f"IAM roles not granted: {'; '.join(denied)}"
+        return checks
+
+    def assert_member_roles(self, resource: str, member: str, expected_roles: Iterable[str]) -> PolicyIndex:
+        """Raise an AssertionError unless member has exactly the expected roles on resource, each from one binding.
+
+        The policy is fetched again once if the cached policy does not satisfy the assertion.
+        """
+        expected = list(expected_roles)
+        index = self.policy(resource)
+        try:
+            assert_member_roles(index=index, member=member, expected_roles=expected)
+        except AssertionError:
+            index = self.policy(resource, refresh=True)
+            assert_member_roles(index=index, member=member, expected_roles=expected)
+        return index
+
+    def _granted(self, expectation: RoleExpectation) -> bool:
+        """Determine if the cached policy of the expectation's resource binds its member to its role."""
+        with self.lock:
+            return self.policies[expectation.resource].has_role(expectation.member, expectation.role)
+
+    def _fetch_concurrently[T](self, keys: list[str], fetch: Callable[[str], T], cache: dict[str, T]) -> None:
+        """Fetch the value for every key on a thread pool, storing the results in cache."""
+        if not keys:
+            return
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(keys)), thread_name_prefix="iam") as executor:
+            results = list(executor.map(fetch, keys))
+        with self.lock:
+            self.fetches += len(keys)
+            cache.update(zip(keys, results, strict=True))
+
+    def _fetch_policy(self, resource: str) -> PolicyIndex:
+        """Fetch and index the IAM policy of a project or Artifact Registry repository."""
+        if PROJECT_RESOURCE.match(resource):
+            policy = self.projects_client.get_iam_policy(resource=resource)
+        elif REPOSITORY_RESOURCE.match(resource):
+            policy = self.gar_client.get_iam_policy(request={"resource": resource})
+        else:
+            msg = f"unsupported IAM resource: {resource}"
+            raise ValueError(msg)
+        assert policy
+        return PolicyIndex(policy)
+
+    def _fetch_service_account(self, name: str) -> iam_admin_v1.ServiceAccount:
+        """Fetch the service account with name."""
+        return self.iam_client.get_service_account(request=iam_admin_v1.GetServiceAccountRequest(name=name))
@@ -0,0 +1,152 @@
+"""Enumerate combinations of kubeconfig module inputs, and choose a covering array of them for live tests.
+
+NOTE: Every combination is cheap to check through the offline renderer, but each live combination costs a tofu apply.
+The live tier uses a pairwise covering array instead: every pair of input values appears in at least one of its
+combinations, starting from the hand-picked combinations that the live tests always covered.
+"""
+
+import itertools
+import os
+from collections.abc import Iterable, Mapping, Sequence
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Any
+
+from google.cloud import container_v1
+
+from .kubeconfig_template import render_kubeconfig, validate_kubeconfig
+
+EXEC_USER = "exec"
+TOKEN_USER = "token"
+TOKEN_USER_NAME = "token-user"
+# Replaced by the public IP address of the bastion when a combination is turned into module inputs.
+BASTION_PROXY_URL = "http://{bastion}:8888"
+
+DIMENSIONS: dict[str, list[Any]] = {
+    "use_private_endpoint": [True, False],
+    "proxy_url": [None, "", BASTION_PROXY_URL],
+    "cluster_name": [None, "test-cluster"],
+    "context_name": [None, "test-context"],
+    "user": [EXEC_USER, TOKEN_USER],
+}
+# An empty proxy URL renders the same kubeconfig as a null one, so only the offline tier needs to cover it.
+LIVE_DIMENSIONS = {**DIMENSIONS, "proxy_url": [None, BASTION_PROXY_URL]}
+
+
+@dataclass(frozen=True)
+class KubeconfigInputs:
+    """One combination of kubeconfig module inputs."""
+
+    use_private_endpoint: bool = True
+    proxy_url: str | None = None
+    cluster_name: str | None = None
+    context_name: str | None = None
+    user: str = EXEC_USER
+
+    @property
+    def id(self) -> str:
+        """Return a short, unique name for the combination, suitable for test ids and tofu workspaces."""
+        proxy = {None: "noproxy", "": "emptyproxy"}.get(self.proxy_url, "proxy")
+        return "-".join(
+            [
+                "private" if self.use_private_endpoint else "public",
+                proxy,
+                "cluster" if self.cluster_name else "defcluster",
+                "context" if self.context_name else "defcontext",
+                self.user,
+            ],
+        )
+
+    @property
+    def reachable(self) -> bool:
+        """Determine if the kubeconfig can reach the API server; a private endpoint is only reachable via a proxy."""
+        return not self.use_private_endpoint or bool(self.proxy_url)
+
+    def module_inputs(self, bastion: str, token: str) -> dict[str, Any]:
+        """Return the kubeconfig module inputs for the combination, omitting those left at their defaults.
+
+        The bastion address is substituted into the proxy URL, and a token user authenticates with token.
+        """
+        inputs: dict[str, Any] = {}
+        if not self.use_private_endpoint:
+            inputs["use_private_endpoint"] = False
+        if self.proxy_url is not None:
+            inputs["proxy_url"] = self.proxy_url.format(bastion=bastion)
+        if self.cluster_name:
+            inputs["cluster_name"] = self.cluster_name
+        if self.context_name:
+            inputs["context_name"] = self.context_name
+        if self.user == TOKEN_USER:
+            inputs["user"] = {"name": TOKEN_USER_NAME, "token": token}
+        return inputs
+
+
+# The combinations of the hand-picked live tests in test_kubeconfig.py: minimal, with proxy, public, and public with
+# cluster or context name.
+LIVE_SEEDS = [
+    KubeconfigInputs(),
+    KubeconfigInputs(proxy_url=BASTION_PROXY_URL),
+    KubeconfigInputs(use_private_endpoint=False),
+    KubeconfigInputs(use_private_endpoint=False, cluster_name="test-cluster"),
+    KubeconfigInputs(use_private_endpoint=False, context_name="test-context"),
+]
+
+
+def all_inputs(dimensions: Mapping[str, Sequence[Any]] = DIMENSIONS) -> list[KubeconfigInputs]:
+    """Return the cross product of the values of every dimension."""
+    names = list(dimensions)
+    return [
+        KubeconfigInputs(**dict(zip(names, values, strict=True)))
+        for values in itertools.product(*(dimensions[name] for name in names))
+    ]
+
+
+def _pairs(inputs: KubeconfigInputs, strength: int) -> set[tuple[tuple[str, Any], ...]]:
+    """Return every combination of strength (dimension, value) assignments made by inputs."""
+    values = sorted(asdict(inputs).items(), key=lambda item: item[0])
+    return set(itertools.combinations(values, strength))
+
+
+def covering_array(
+    seeds: Iterable[KubeconfigInputs] = (),
+    strength: int = 2,
+    dimensions: Mapping[str, Sequence[Any]] = DIMENSIONS,
+) -> list[KubeconfigInputs]:
+    """Return seeds, followed by combinations chosen greedily until every strength-way interaction of values is covered.
+
+    The choice is deterministic: each step adds the first combination, in cross product order, that covers the most
+    interactions not yet covered.
+    """
+    assert 1 <= strength <= len(dimensions), "strength must be between 1 and the number of dimensions"
+    candidates = all_inputs(dimensions)
+    uncovered: set[tuple[tuple[str, Any], ...]] = set().union(*(_pairs(c, strength) for c in candidates))
+    chosen: list[KubeconfigInputs] = []
+    for seed in seeds:
+        if seed not in chosen:
+            chosen.append(seed)
+            uncovered -= _pairs(seed, strength)
+    while uncovered:
+        best = max(candidates, key=lambda candidate: len(_pairs(candidate, strength) & uncovered))
+        chosen.append(best)
+        uncovered -= _pairs(best, strength)
+    return chosen
+
+
+def render_all(
+    combinations: Iterable[KubeconfigInputs],
+    cluster: container_v1.Cluster,
+    bastion: str = "192.0.2.1",
+    token: str = "test-token",
+    max_workers: int | None = None,
+) -> list[tuple[KubeconfigInputs, dict[str, Any]]]:
+    """Render and validate the kubeconfig for every combination concurrently, returning the parsed documents in order.
+
+    Raise the ValueError of the first combination that renders an invalid kubeconfig.
+    """
+    combinations = list(combinations)
+
+    def _render(inputs: KubeconfigInputs) -> dict[str, Any]:
+        return validate_kubeconfig(render_kubeconfig(cluster, **inputs.module_inputs(bastion=bastion, token=token)))
+
+    with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count(), thread_name_prefix="kubeconfig") as executor:
+        return list(zip(combinations, executor.map(_render, combinations), strict=True))
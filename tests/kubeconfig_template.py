@@ -0,0 +1,449 @@
+"""Render the kubeconfig module template offline, and validate the result against the kubeconfig v1 schema.
+
+NOTE: Only the subset of the tofu template language used by the module templates is supported: ${...} interpolation,
+%{ if }/%{ else }/%{ endif } directives, $${ and %%{ escapes, and ~ strip markers, with expressions made of literals,
+variables, parentheses, !, ==, !=, && and ||, and the coalesce function. As in tofu, the template is split into
+literal tokens at each newline, so a strip marker trims whitespace from the adjacent literal up to the end of the line,
+or removes the newline itself when the directive ends the line.
+"""
+
+import base64
+import binascii
+import pathlib
+import re
+import urllib.parse
+from collections.abc import Callable, Mapping
+from dataclasses import dataclass, field
+from typing import Any
+
+import yaml
+from google.cloud import container_v1
+
+TEMPLATE_PATH = pathlib.Path(__file__).parent.joinpath("../modules/kubeconfig/templates/kubeconfig.yaml").resolve()
+EXEC_API_VERSIONS = {"client.authentication.k8s.io/v1beta1", "client.authentication.k8s.io/v1"}
+PROXY_SCHEMES = {"http", "https", "socks5"}
+
+EXPRESSION_TOKEN = re.compile(
+    r"""\s*(?:(?P<string>"(?:[^"\\]|\\.)*")|(?P<number>\d+(?:\.\d+)?)|(?P<name>[A-Za-z_][A-Za-z0-9_-]*)"""
+    r"""|(?P<operator>==|!=|&&|\|\||[!(),]))""",
+)
+STRING_ESCAPES = {"n": "\n", "r": "\r", "t": "\t", '"': '"', "\\": "\\"}
+# A Cluster to render the template for in offline tests, with documentation addresses for its endpoints.
+OFFLINE_CLUSTER = container_v1.Cluster(
+    name="test",
+    endpoint="203.0.113.10",
+    master_auth=container_v1.MasterAuth(
+        cluster_ca_certificate=base64.standard_b64encode(b"-----BEGIN CERTIFICATE-----\n").decode(),
+    ),
+    private_cluster_config=container_v1.PrivateClusterConfig(private_endpoint="10.0.0.2"),
+)
+
+
+def _coalesce(*args: Any) -> Any:  # noqa: ANN401
+    """Return the first argument that is not null or an empty string, as the tofu coalesce function does."""
+    for arg in args:
+        if arg is not None and arg != "":
+            return arg
+    msg = "coalesce: no non-null, non-empty-string arguments"
+    raise ValueError(msg)
+
+
+FUNCTIONS: dict[str, Callable[..., Any]] = {
+    "coalesce": _coalesce,
+}
+
+
+class _ExpressionParser:
+    """Evaluate a template expression by recursive descent, with the precedence of the tofu operators."""
+
+    def __init__(self, source: str, variables: Mapping[str, Any]) -> None:
+        """Tokenise source for evaluation against variables."""
+        self.source = source
+        self.variables = variables
+        self.tokens: list[tuple[str, str]] = []
+        position = 0
+        while source[position:].strip():
+            token = EXPRESSION_TOKEN.match(source, position)
+            if not token or token.lastgroup is None:
+                msg = f"unsupported template expression: {source!r}"
+                raise ValueError(msg)
+            self.tokens.append((token.lastgroup, token[token.lastgroup]))
+            position = token.end()
+        self.position = 0
+
+    def evaluate(self) -> Any:  # noqa: ANN401
+        """Return the value of the whole expression."""
+        value = self._or()
+        if self.position != len(self.tokens):
+            msg = f"unexpected {self.tokens[self.position][1]!r} in template expression {self.source!r}"
+            raise ValueError(msg)
+        return value
+
+    def _peek(self) -> str | None:
+        return self.tokens[self.position][1] if self.position < len(self.tokens) else None
+
+    def _take(self, expected: str | None = None) -> tuple[str, str]:
+        if self.position >= len(self.tokens) or (expected is not None and self._peek() != expected):
+            msg = f"expected {expected or 'a value'} in template expression {self.source!r}"
+            raise ValueError(msg)
+        token = self.tokens[self.position]
+        self.position += 1
+        return token
+
+    def _or(self) -> Any:  # noqa: ANN401
+        value = self._and()
+        while self._peek() == "||":
+            self._take()
+            right = self._and()
+            value = bool(value) or bool(right)
+        return value
+
+    def _and(self) -> Any:  # noqa: ANN401
+        value = self._equality()
+        while self._peek() == "&&":
+            self._take()
+            right = self._equality()
+            value = bool(value) and bool(right)
+        return value
+
+    def _equality(self) -> Any:  # noqa: ANN401
+        value = self._unary()
+        while self._peek() in {"==", "!="}:
+            _, operator = self._take()
+            right = self._unary()
+            value = (value == right) if operator == "==" else (value != right)
+        return value
+
+    def _unary(self) -> Any:  # noqa: ANN401
+        if self._peek() == "!":
+            self._take()
+            return not self._unary()
+        return self._primary()
+
+    def _primary(self) -> Any:  # noqa: ANN401
+        kind, text = self._take()
+        if text == "(" and kind == "operator":
+            value = self._or()
+            self._take(")")
+            return value
+        if kind == "string":
+            return re.sub(r"\\(.)", lambda escape: STRING_ESCAPES.get(escape[1], escape[0]), text[1:-1])
+        if kind == "number":
+            return float(text) if "." in text else int(text)
+        if kind == "name":
+            return self._call(text) if self._peek() == "(" else self._name(text)
+        msg = f"unexpected {text!r} in template expression {self.source!r}"
+        raise ValueError(msg)
+
+    def _name(self, name: str) -> Any:  # noqa: ANN401
+        if name in {"true", "false"}:
+            return name == "true"
+        if name == "null":
+            return None
+        if name not in self.variables:
+            msg = f"vars map does not contain key {name!r}, referenced in template expression {self.source!r}"
+            raise ValueError(msg)
+        return self.variables[name]
+
+    def _call(self, name: str) -> Any:  # noqa: ANN401
+        if name not in FUNCTIONS:
+            msg = f"unsupported function {name!r} in template expression {self.source!r}"
+            raise ValueError(msg)
+        self._take("(")
+        args = []
+        while self._peek() != ")":
+            args.append(self._or())
+            if self._peek() != ")":
+                self._take(",")
+        self._take(")")
+        return FUNCTIONS[name](*args)
+
+
+def evaluate(expression: str, variables: Mapping[str, Any]) -> Any:  # noqa: ANN401
+    """Return the value of a template expression, with variables in scope."""
+    return _ExpressionParser(expression, variables).evaluate()
+
+
+@dataclass
+class _Sequence:
+    """An interpolation or directive, with its strip markers."""
+
+    kind: str
+    expression: str
+    strip_left: bool
+    strip_right: bool
+
+
+@dataclass
+class _If:
+    """An if directive, with the parts rendered when its condition is true or false."""
+
+    condition: str
+    then: list[Any] = field(default_factory=list)
+    otherwise: list[Any] | None = None
+
+
+def _sequence_end(template: str, start: int) -> int:
+    """Return the index of the closing brace of the sequence whose body starts at start, skipping quoted strings."""
+    depth = 0
+    quoted = False
+    position = start
+    while position < len(template):
+        char = template[position]
+        if quoted:
+            if char == "\\":
+                position += 1
+            elif char == '"':
+                quoted = False
+        elif char == '"':
+            quoted = True
+        elif char == "{":
+            depth += 1
+        elif char == "}":
+            if depth == 0:
+                return position
+            depth -= 1
+        position += 1
+    msg = f"unterminated template sequence at offset {start}"
+    raise ValueError(msg)
+
+
+def _tokens(template: str) -> list[str | _Sequence]:
+    """Split a template into literal tokens, which never span a newline, and sequences."""
+    tokens: list[str | _Sequence] = []
+    literal: list[str] = []
+
+    def flush() -> None:
+        text = "".join(literal)
+        literal.clear()
+        tokens.extend(part for part in re.split(r"(\r?\n)", text) if part)
+
+    position = 0
+    while position < len(template):
+        if template.startswith(("$${", "%%{"), position):
+            literal.append(template[position + 1 : position + 3])
+            position += 3
+        elif template.startswith(("${", "%{"), position):
+            end = _sequence_end(template, position + 2)
+            body = template[position + 2 : end]
+            flush()
+            tokens.append(
+                _Sequence(
+                    kind="interpolation" if template[position] == "$" else "directive",
+                    expression=body.removeprefix("~").removesuffix("~").strip(),
+                    strip_left=body.startswith("~"),
+                    strip_right=body.endswith("~"),
+                ),
+            )
+            position = end + 1
+        else:
+            literal.append(template[position])
+            position += 1
+    flush()
+    return tokens
+
+
+def _strip(tokens: list[str | _Sequence]) -> list[str | _Sequence]:
+    """Apply the strip markers of each sequence to the literal token directly before or after it."""
+    stripped = list(tokens)
+    for position, token in enumerate(tokens):
+        if not isinstance(token, _Sequence):
+            continue
+        if token.strip_left and position > 0 and isinstance(stripped[position - 1], str):
+            stripped[position - 1] = str(stripped[position - 1]).rstrip()
+        if token.strip_right and position + 1 < len(tokens) and isinstance(tokens[position + 1], str):
+            stripped[position + 1] = str(stripped[position + 1]).lstrip()
+    return stripped
+
+
+def parse_template(template: str) -> list[Any]:
+    """Return the parts of a template: literal strings, interpolations and if directives with nested parts."""
+    root: list[Any] = []
+    stack: list[tuple[_If | None, list[Any]]] = [(None, root)]
+    for token in _strip(_tokens(template)):
+        current_if, parts = stack[-1]
+        if isinstance(token, str) or token.kind == "interpolation":
+            parts.append(token)
+        elif token.expression.startswith("if "):
+            directive = _If(condition=token.expression.removeprefix("if ").strip())
+            parts.append(directive)
+            stack.append((directive, directive.then))
+        elif token.expression == "else" and current_if is not None and current_if.otherwise is None:
+            current_if.otherwise = []
+            stack[-1] = (current_if, current_if.otherwise)
+        elif token.expression == "endif" and current_if is not None:
+            stack.pop()
+        else:
+            msg = f"unsupported template directive %{{{token.expression}}}"
+            raise ValueError(msg)
+    if len(stack) > 1:
+        msg = "template has an if directive without endif"
+        raise ValueError(msg)
+    return root
+
+
+def _interpolate(value: Any, expression: str) -> str:  # noqa: ANN401
+    """Return the string form of an interpolated value, refusing null and collections as tofu does."""
+    if value is None:
+        msg = f"the value of template interpolation {expression!r} is null"
+        raise ValueError(msg)
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (str, int, float)):
+        return str(value)
+    msg = f"cannot interpolate {type(value).__name__} value of {expression!r} into a template"
+    raise ValueError(msg)
+
+
+def _render(parts: list[Any], variables: Mapping[str, Any]) -> str:
+    """Render parsed template parts with variables in scope."""
+    output: list[str] = []
+    for part in parts:
+        if isinstance(part, str):
+            output.append(part)
+        elif isinstance(part, _Sequence):
+            output.append(_interpolate(evaluate(part.expression, variables), part.expression))
+        else:
+            condition = evaluate(part.condition, variables)
+            if not isinstance(condition, bool):
+                msg = f"if condition {part.condition!r} is not a bool"
+                raise TypeError(msg)
+            output.append(_render(part.then if condition else part.otherwise or [], variables))
+    return "".join(output)
+
+
+def render_template(template: str, variables: Mapping[str, Any]) -> str:
+    """Render a template with variables, as the tofu templatefile function would."""
+    return _render(parse_template(template), variables)
+
+
+def kubeconfig_template_vars(
+    cluster: container_v1.Cluster,
+    cluster_name: str | None = None,
+    context_name: str | None = None,
+    use_private_endpoint: bool = True,  # noqa: FBT001, FBT002
+    proxy_url: str | None = None,
+    user: Mapping[str, str] | None = None,
+) -> dict[str, Any]:
+    """Return the template variables that the kubeconfig module passes to templatefile for its inputs and cluster."""
+    return {
+        "cluster_name": _coalesce(cluster_name, cluster.name),
+        "context_name": _coalesce(context_name, cluster.name),
+        "ca_cert": cluster.master_auth.cluster_ca_certificate,
+        "endpoint": "https://"
+        + (cluster.private_cluster_config.private_endpoint if use_private_endpoint else cluster.endpoint),
+        "proxy_url": proxy_url,
+        "user_name": _coalesce((user or {}).get("name", ""), cluster.name),
+        "user_token": (user or {}).get("token", ""),
+    }
+
+
+def render_kubeconfig(cluster: container_v1.Cluster, **kwargs: Any) -> str:  # noqa: ANN401
+    """Render the kubeconfig module template for a cluster and the module inputs in kwargs."""
+    return render_template(
+        TEMPLATE_PATH.read_text(encoding="utf-8"),
+        kubeconfig_template_vars(cluster, **kwargs),
+    )
+
+
+def _named_entries(config: Mapping[str, Any], kind: str, errors: list[str]) -> dict[str, Mapping[str, Any]]:
+    """Return the entries of the kubeconfig list for kind by name, recording any schema errors."""
+    entries: dict[str, Mapping[str, Any]] = {}
+    items = config.get(f"{kind}s")
+    if not isinstance(items, list) or not items:
+        errors.append(f"{kind}s must be a non-empty list")
+        return entries
+    for position, entry in enumerate(items):
+        name = entry.get("name") if isinstance(entry, Mapping) else None
+        if not isinstance(name, str) or not name:
+            errors.append(f"{kind}s[{position}] must have a non-empty name")
+        elif name in entries:
+            errors.append(f"{kind} name {name!r} is not unique")
+        elif not isinstance(entry.get(kind), Mapping):
+            errors.append(f"{kind} {name!r} must have a {kind} mapping")
+        else:
+            entries[name] = entry[kind]
+    return entries
+
+
+def _url_errors(value: object, schemes: set[str], description: str) -> list[str]:
+    """Return a schema error if value is not a URL with one of schemes and a host."""
+    url = urllib.parse.urlsplit(value) if isinstance(value, str) else None
+    if url is None or url.scheme not in schemes or not url.hostname:
+        return [f"{description} must be a {'/'.join(sorted(schemes))} URL, not {value!r}"]
+    return []
+
+
+def _cluster_errors(name: str, cluster: Mapping[str, Any]) -> list[str]:
+    """Return the schema errors of a cluster entry."""
+    errors = _url_errors(cluster.get("server"), {"https"}, f"cluster {name!r} server")
+    try:
+        base64.b64decode(cluster.get("certificate-authority-data") or "", validate=True)
+    except (binascii.Error, TypeError, ValueError):
+        errors.append(f"cluster {name!r} certificate-authority-data must be base64")
+    if not cluster.get("certificate-authority-data"):
+        errors.append(f"cluster {name!r} must have certificate-authority-data")
+    if "proxy-url" in cluster:
+        errors.extend(_url_errors(cluster["proxy-url"], PROXY_SCHEMES, f"cluster {name!r} proxy-url"))
+    return errors
+
+
+def _user_errors(name: str, user: Mapping[str, Any]) -> list[str]:
+    """Return the schema errors of a user entry, which must authenticate with exactly one of a token or exec plugin."""
+    if ("token" in user) == ("exec" in user):
+        return [f"user {name!r} must have exactly one of token or exec"]
+    if "token" in user:
+        token = user["token"]
+        return [] if isinstance(token, str) and token else [f"user {name!r} token must be a non-empty string"]
+    exec_config = user["exec"]
+    if not isinstance(exec_config, Mapping):
+        return [f"user {name!r} exec must be a mapping"]
+    errors = []
+    if exec_config.get("apiVersion") not in EXEC_API_VERSIONS:
+        errors.append(f"user {name!r} exec apiVersion must be one of {', '.join(sorted(EXEC_API_VERSIONS))}")
+    if not isinstance(exec_config.get("command"), str) or not exec_config["command"]:
+        errors.append(f"user {name!r} exec must have a command")
+    if not isinstance(exec_config.get("provideClusterInfo", False), bool):
+        errors.append(f"user {name!r} exec provideClusterInfo must be a bool")
+    return errors
+
+
+def kubeconfig_errors(config: Mapping[str, Any]) -> list[str]:
+    """Return every way a parsed kubeconfig violates the kubeconfig v1 schema."""
+    errors: list[str] = []
+    if config.get("apiVersion") != "v1":
+        errors.append("apiVersion must be v1")
+    if config.get("kind") != "Config":
+        errors.append("kind must be Config")
+    clusters = _named_entries(config, "cluster", errors)
+    contexts = _named_entries(config, "context", errors)
+    users = _named_entries(config, "user", errors)
+    for name, cluster in clusters.items():
+        errors.extend(_cluster_errors(name, cluster))
+    for name, user in users.items():
+        errors.extend(_user_errors(name, user))
+    for name, context in contexts.items():
+        if context.get("cluster") not in clusters:
+            errors.append(f"context {name!r} refers to unknown cluster {context.get('cluster')!r}")
+        if context.get("user") not in users:
+            errors.append(f"context {name!r} refers to unknown user {context.get('user')!r}")
+    if config.get("current-context") not in contexts:
+        errors.append(f"current-context {config.get('current-context')!r} is not a context")
+    return errors
+
+
+def validate_kubeconfig(text: str) -> dict[str, Any]:
+    """Return the parsed kubeconfig, raising a ValueError listing every way it violates the kubeconfig v1 schema."""
+    try:
+        config = yaml.safe_load(text)
+    except yaml.YAMLError as e:
+        msg = f"kubeconfig is not valid YAML: {e}"
+        raise ValueError(msg) from e
+    if not isinstance(config, dict):
+        msg = "kubeconfig must be a mapping"
+        raise ValueError(msg)  # noqa: TRY004
+    errors = kubeconfig_errors(config)
+    if errors:
+        msg = f"invalid kubeconfig: {'; '.join(errors)}"
+        raise ValueError(msg)
+    return config
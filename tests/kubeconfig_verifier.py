@@ -0,0 +1,195 @@
+"""Verify a generated kubeconfig in-process, with the same checks that were previously made by running kubectl.
+
+NOTE: The kubeconfig is loaded with the Kubernetes Python client, selecting the cluster and context as kubectl
+--cluster and --context would. Users that authenticate through gke-gcloud-auth-plugin are given a Google access token
+directly, since the plugin only exchanges local ADC credentials for one, so neither kubectl nor the plugin is needed on
+the runner.
+"""
+
+import copy
+import dataclasses
+import pathlib
+from collections.abc import Callable, Generator, Mapping
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, cast
+
+import kubernetes.client
+import kubernetes.config
+import pytest
+import yaml
+
+from .cassettes import REPLAY, cassette_mode
+from .kubernetes_assertions import (
+    DEFAULT_REQUEST_TIMEOUT,
+    DEFAULT_TIMEOUT_SECONDS,
+    Match,
+    Readiness,
+    close_informers,
+    labelled_service_expectation,
+    namespace_expectation,
+    wait_all,
+)
+from .kubernetes_clients import KUBERNETES_CLIENTS
+
+GKE_AUTH_PLUGIN = "gke-gcloud-auth-plugin"
+VERIFIED_NAMESPACE = "kube-system"
+CLUSTER_SERVICE_SELECTOR = "kubernetes.io/cluster-service=true"
+
+
+@dataclass(frozen=True)
+class KubeconfigSelection:
+    """The context, cluster and user chosen from a kubeconfig, and the cluster's server and proxy."""
+
+    context: str
+    cluster: str
+    user: str
+    server: str
+    proxy_url: str | None = None
+
+
+@dataclass(frozen=True)
+class KubeconfigVerification:
+    """The result of verifying a kubeconfig: what was selected from it, and the readiness of each check."""
+
+    selection: KubeconfigSelection
+    readiness: list[Readiness]
+
+    @property
+    def ok(self) -> bool:
+        """Determine if every check was satisfied."""
+        return all(r.ready for r in self.readiness)
+
+    def failures(self) -> list[str]:
+        """Return the descriptions of the checks that were not satisfied."""
+        return [r.expectation.description for r in self.readiness if not r.ready]
+
+
+def _named(entries: list[Mapping[str, Any]] | None, kind: str, name: str) -> Mapping[str, Any]:
+    """Return the kubeconfig entry of kind with name, raising a ConfigException if there is none."""
+    for entry in entries or []:
+        if entry.get("name") == name:
+            return entry
+    msg = f"{kind} {name!r} not found in kubeconfig"
+    raise kubernetes.config.ConfigException(msg)
+
+
+def select(
+    config: Mapping[str, Any],
+    cluster: str | None = None,
+    context: str | None = None,
+    token: Callable[[], str] = KUBERNETES_CLIENTS.token,
+) -> tuple[dict[str, Any], KubeconfigSelection]:
+    """Return a copy of a parsed kubeconfig with the selections of kubectl --cluster and --context applied.
+
+    The chosen context becomes current, and uses cluster in place of its own if given. A gke-gcloud-auth-plugin user is
+    replaced by a user with a token returned from token.
+    """
+    config = copy.deepcopy(dict(config))
+    context_name = context or config.get("current-context")
+    if not context_name:
+        msg = "kubeconfig has no current-context and no context was given"
+        raise kubernetes.config.ConfigException(msg)
+    context_entry = cast("dict[str, Any]", _named(config.get("contexts"), "context", context_name))
+    if cluster:
+        context_entry["context"]["cluster"] = cluster
+    cluster_entry = _named(config.get("clusters"), "cluster", context_entry["context"]["cluster"])
+    user_entry = cast("dict[str, Any]", _named(config.get("users"), "user", context_entry["context"]["user"]))
+    exec_config = (user_entry.get("user") or {}).get("exec") or {}
+    if exec_config.get("command") == GKE_AUTH_PLUGIN:
+        user_entry["user"] = {"token": token()}
+    config["current-context"] = context_name
+    return config, KubeconfigSelection(
+        context=context_name,
+        cluster=cluster_entry["name"],
+        user=user_entry["name"],
+        server=cluster_entry["cluster"]["server"],
+        proxy_url=cluster_entry["cluster"].get("proxy-url"),
+    )
+
+
+@contextmanager
+def kubeconfig_api_client(
+    kubeconfig: pathlib.Path,
+    cluster: str | None = None,
+    context: str | None = None,
+    token: Callable[[], str] = KUBERNETES_CLIENTS.token,
+) -> Generator[tuple[kubernetes.client.ApiClient, KubeconfigSelection], None, None]:
+    """Yield an API client loaded from the kubeconfig file with the given selections, and what was selected.
+
+    The client and its informers are closed when the context exits. Kubernetes API calls are not recorded to cassettes,
+    so the calling test is skipped when replaying.
+    """
+    if cassette_mode() == REPLAY:
+        pytest.skip("Kubernetes API calls cannot be replayed from cassettes")
+    config, selection = select(
+        config=yaml.safe_load(kubeconfig.read_text(encoding="utf-8")),
+        cluster=cluster,
+        context=context,
+        token=token,
+    )
+    client = kubernetes.config.new_client_from_config_dict(config_dict=config, context=selection.context)
+    try:
+        yield client, selection
+    finally:
+        close_informers(client)
+        client.close()
+
+
+def verify_kubeconfig(
+    kubeconfig: pathlib.Path,
+    cluster: str | None = None,
+    context: str | None = None,
+    timeout_seconds: float = DEFAULT_TIMEOUT_SECONDS,
+    request_timeout: int = DEFAULT_REQUEST_TIMEOUT,
+    token: Callable[[], str] = KUBERNETES_CLIENTS.token,
+) -> KubeconfigVerification:
+    """Verify the kube-system namespace is Active, and has cluster services, through a client loaded from kubeconfig.
+
+    Raise the error of the first API request if the cluster cannot be reached at all.
+    """
+    with kubeconfig_api_client(kubeconfig=kubeconfig, cluster=cluster, context=context, token=token) as (
+        client,
+        selection,
+    ):
+        expectations = [
+            dataclasses.replace(
+                namespace_expectation(client=client, namespace=VERIFIED_NAMESPACE),
+                condition=Match(field_path="status.phase", field_value="Active"),
+                description=f"Namespace {VERIFIED_NAMESPACE} is Active",
+            ),
+            dataclasses.replace(
+                labelled_service_expectation(
+                    client=client,
+                    namespace=VERIFIED_NAMESPACE,
+                    label_selector=CLUSTER_SERVICE_SELECTOR,
+                ),
+                condition=Match(field_path="status.load_balancer"),
+            ),
+        ]
+        readiness = wait_all(expectations, timeout_seconds=timeout_seconds, request_timeout=request_timeout)
+    return KubeconfigVerification(selection=selection, readiness=readiness)
+
+
+def assert_kubeconfig(
+    kubeconfig: pathlib.Path,
+    cluster: str | None = None,
+    context: str | None = None,
+    timeout_seconds: float = DEFAULT_TIMEOUT_SECONDS,
+    request_timeout: int = DEFAULT_REQUEST_TIMEOUT,
+    token: Callable[[], str] = KUBERNETES_CLIENTS.token,
+) -> KubeconfigVerification:
+    """Raise an AssertionError naming every check the kubeconfig failed; otherwise return the verification."""
+    verification = verify_kubeconfig(
+        kubeconfig=kubeconfig,
+        cluster=cluster,
+        context=context,
+        timeout_seconds=timeout_seconds,
+        request_timeout=request_timeout,
+        token=token,
+    )
+    assert verification.ok, (
+        f"kubeconfig {verification.selection.context} not verified within {timeout_seconds}s: "
+        f"{', '.join(verification.failures())}"
+    )
+    return verification
@@ -1,12 +1,42 @@
-"""Reusable Kubernetes resource assertions."""
+"""Reusable Kubernetes resource assertions.
 
-from collections.abc import Callable
-from typing import cast
+NOTE: Assertions wait on a shared Informer for each API client, list function and selector, so any number of
+assertions against the same kind of resource are served from one list call and one watch stream. Describe the expected
+objects with a Match, rather than an opaque callable, so the informer can find them through its name and label indexes.
+"""
+
+import logging
+import re
+import threading
+import time
+from collections.abc import Callable, Iterable, Mapping
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from typing import Any, cast
 
 import kubernetes.client
 import kubernetes.watch
 
 ACTIONABLE_WATCHER_TYPES = ["ADDED", "MODIFIED"]
+DELETED_WATCHER_TYPE = "DELETED"
+DEFAULT_TIMEOUT_SECONDS = 180
+DEFAULT_REQUEST_TIMEOUT = 10
+# The server-side timeout of each watch request; the watch is resumed from the last seen resource version after this.
+WATCH_TIMEOUT_SECONDS = 60
+# The delay before an informer retries a failed list or watch request.
+RETRY_SECONDS = 1.0
+
+LABEL_REQUIREMENT = re.compile(r"^(?P<key>[A-Za-z0-9_./-]+)\s*==?\s*(?P<value>[A-Za-z0-9_.-]*)$")
+FIELD_PATH_SEGMENT = re.compile(r"^(?P<attribute>[a-z_][a-z0-9_]*)(?:\[(?P<index>\d+)\])?$")
+# Sentinel for a field path that does not resolve to a value.
+MISSING = object()
+
+ObjectKey = tuple[str | None, str | None]
+Matcher = Callable[[object], bool]
+
+logger = logging.getLogger(__name__)
+_INFORMERS: dict[tuple[Any, ...], "Informer"] = {}
+_INFORMERS_GUARD = threading.Lock()
 
 
 def match_exists(obj: object) -> bool:
@@ -15,43 +45,453 @@ def match_exists(obj: object) -> bool:
     return True
 
 
-def match_metadata_name(name: str) -> Callable[[object], bool]:
-    """Return a function that can be called to test if an object has a metadata property matching name parameter."""
-    assert name, "name parameter is required"
+def object_metadata(obj: object) -> kubernetes.client.V1ObjectMeta:
+    """Return the metadata of a Kubernetes object, or empty metadata if it has none."""
+    metadata = getattr(obj, "metadata", None)
+    return cast("kubernetes.client.V1ObjectMeta", metadata) if metadata else kubernetes.client.V1ObjectMeta()
+
+
+def object_key(obj: object) -> ObjectKey:
+    """Return the namespace and name of a Kubernetes object."""
+    metadata = object_metadata(obj)
+    return metadata.namespace, metadata.name
+
+
+def parse_label_selector(label_selector: str) -> dict[str, str]:
+    """Return the labels required by an equality-based label selector, such as 'app=dns,tier==backend'.
+
+    Raise a ValueError for set-based or inequality requirements, which cannot be answered from an index.
+    """
+    labels: dict[str, str] = {}
+    for requirement in filter(None, (part.strip() for part in label_selector.split(","))):
+        parsed = LABEL_REQUIREMENT.match(requirement)
+        if not parsed:
+            msg = f"unsupported label selector requirement: {requirement!r}"
+            raise ValueError(msg)
+        labels[parsed["key"]] = parsed["value"]
+    return labels
 
-    def _matcher(obj: object) -> bool:
+
+def resolve_field_path(obj: object, path: str) -> object:
+    """Return the value at a dotted path of model attributes in obj, such as 'status.conditions[0].type'.
+
+    Return MISSING if any segment of the path is unset.
+    """
+    value: object = obj
+    for segment in path.split("."):
+        parsed = FIELD_PATH_SEGMENT.match(segment)
+        if not parsed:
+            msg = f"invalid field path segment {segment!r} in {path!r}"
+            raise ValueError(msg)
+        value = getattr(value, parsed["attribute"], None)
+        if value is not None and parsed["index"] is not None:
+            items = cast("list[object]", value)
+            value = items[int(parsed["index"])] if int(parsed["index"]) < len(items) else None
+        if value is None:
+            return MISSING
+    return value
+
+
+@dataclass(frozen=True)
+class Match:
+    """Describe the Kubernetes objects that satisfy an assertion.
+
+    Every given criterion must hold: the object name and namespace, labels, and the value at a field path using model
+    attribute names. If field_value is omitted, the field path must merely be set. A Match is also a plain matcher
+    callable, but informers use its name and labels to look candidates up in their indexes instead of scanning.
+    """
+
+    name: str | None = None
+    namespace: str | None = None
+    labels: Mapping[str, str] = field(default_factory=dict)
+    field_path: str | None = None
+    field_value: object = MISSING
+
+    @classmethod
+    def selector(cls, label_selector: str, **kwargs: Any) -> "Match":  # noqa: ANN401
+        """Return a Match for an equality-based label selector and any other criteria."""
+        return cls(labels=parse_label_selector(label_selector), **kwargs)
+
+    def __call__(self, obj: object) -> bool:
+        """Determine if obj satisfies every criterion."""
         assert obj
-        metadata = (
-            cast("kubernetes.client.V1ObjectMeta", obj.metadata)  # pyright: ignore[reportAttributeAccessIssue]
-            if hasattr(obj, "metadata")
-            else kubernetes.client.V1ObjectMeta()
-        )
-        assert metadata
-        if not metadata.name:
+        metadata = object_metadata(obj)
+        if self.name is not None and metadata.name != self.name:
+            return False
+        if self.namespace is not None and metadata.namespace != self.namespace:
+            return False
+        labels = metadata.labels or {}
+        if any(labels.get(key) != value for key, value in self.labels.items()):
             return False
-        return metadata.name == name
+        if self.field_path is not None:
+            value = resolve_field_path(obj, self.field_path)
+            if value is MISSING or (self.field_value is not MISSING and value != self.field_value):
+                return False
+        return True
+
+
+def match_metadata_name(name: str) -> Match:
+    """Return a Match for objects with a metadata property matching name parameter."""
+    assert name, "name parameter is required"
+    return Match(name=name)
+
+
+class ObjectIndex:
+    """Hold Kubernetes objects by namespace and name, with hash indexes by name and by label."""
+
+    def __init__(self, objects: Iterable[object] = ()) -> None:
+        """Initialise the index with objects."""
+        self.objects: dict[ObjectKey, object] = {}
+        self.by_name: dict[str | None, set[ObjectKey]] = {}
+        self.by_label: dict[tuple[str, str], set[ObjectKey]] = {}
+        for obj in objects:
+            self.put(obj)
+
+    def put(self, obj: object) -> None:
+        """Add or replace obj."""
+        key = object_key(obj)
+        self.remove(key)
+        self.objects[key] = obj
+        self.by_name.setdefault(key[1], set()).add(key)
+        for label in (object_metadata(obj).labels or {}).items():
+            self.by_label.setdefault(label, set()).add(key)
+
+    def remove(self, key: ObjectKey) -> None:
+        """Remove the object with key, if present."""
+        obj = self.objects.pop(key, None)
+        if obj is None:
+            return
+        self.by_name[key[1]].discard(key)
+        for label in (object_metadata(obj).labels or {}).items():
+            self.by_label[label].discard(key)
+
+    def candidates(self, match: Match) -> Iterable[ObjectKey]:
+        """Return the keys of the objects that could satisfy match, using the smallest applicable index."""
+        sets: list[set[ObjectKey]] = []
+        if match.name is not None:
+            sets.append(self.by_name.get(match.name, set()))
+        sets.extend(self.by_label.get(label, set()) for label in match.labels.items())
+        if not sets:
+            return list(self.objects)
+        return list(min(sets, key=len))
+
+    def find(self, matcher: Matcher) -> list[object]:
+        """Return every object that satisfies matcher."""
+        if isinstance(matcher, Match):
+            keys = self.candidates(matcher)
+            return [self.objects[key] for key in keys if matcher(self.objects[key])]
+        return [obj for obj in self.objects.values() if matcher(obj)]
+
+
+class Informer:
+    """Keep a local cache of the objects returned by a Kubernetes list function, updated from a single watch.
+
+    The cache is filled by one list call, then kept up to date by a watch that is resumed from the last seen resource
+    version, with a new list only if that resource version has expired. Any number of callers can wait for an object in
+    the cache to satisfy a matcher.
+    """
+
+    def __init__(
+        self,
+        lister: Callable,
+        request_timeout: int = DEFAULT_REQUEST_TIMEOUT,
+        **kwargs,  # noqa: ANN003
+    ) -> None:
+        """Start an informer for the objects returned by lister, called with kwargs such as namespace."""
+        self.lister = lister
+        self.request_timeout = request_timeout
+        self.kwargs = kwargs
+        self.lists = 0
+        self.events = 0
+        self._index = ObjectIndex()
+        self._synced = False
+        self._error: BaseException | None = None
+        self._condition = threading.Condition()
+        self._stopped = threading.Event()
+        self._watch: kubernetes.watch.Watch | None = None
+        self._listeners: set[threading.Event] = set()
+        self._thread = threading.Thread(target=self._run, name=f"informer-{lister.__name__}", daemon=True)
+        self._thread.start()
+
+    def objects(self) -> list[object]:
+        """Return a snapshot of the cached objects."""
+        with self._condition:
+            return list(self._index.objects.values())
+
+    def find(self, matcher: Matcher) -> list[object]:
+        """Return the cached objects that satisfy matcher, looking a Match up in the indexes."""
+        with self._condition:
+            return self._index.find(matcher)
+
+    def synced(self) -> bool:
+        """Return True once the cache has been filled, raising the error of the initial list call if it failed."""
+        with self._condition:
+            if not self._synced and self._error is not None:
+                raise self._error
+            return self._synced
+
+    def subscribe(self, listener: threading.Event) -> None:
+        """Set listener whenever the cache changes or a request fails, until it is unsubscribed."""
+        with self._condition:
+            self._listeners.add(listener)
+        listener.set()
+
+    def unsubscribe(self, listener: threading.Event) -> None:
+        """Stop setting listener."""
+        with self._condition:
+            self._listeners.discard(listener)
+
+    def wait_for(self, matcher: Matcher, timeout_seconds: float = DEFAULT_TIMEOUT_SECONDS) -> bool:
+        """Return True as soon as any cached object satisfies matcher, or False if none does before the timeout.
 
-    return _matcher
+        Raise the error of the initial list call if it failed, rather than waiting for the timeout.
+        """
+        deadline = time.monotonic() + timeout_seconds
+        with self._condition:
+            while True:
+                if self.synced() and self._index.find(matcher):
+                    return True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
 
+    @property
+    def stopped(self) -> bool:
+        """Determine if the watch has been stopped, so no further list or watch requests will be made."""
+        return self._stopped.is_set()
 
-def watcher(lister: Callable, matcher: Callable[[object], bool], **kwargs) -> bool:  # noqa: ANN003
-    """Execute a watch for objects returned from call to lister, testing each found object with matcher."""
-    found_resource = False
-    watcher = kubernetes.watch.Watch()
-    for event in watcher.stream(func=lister, **kwargs):
-        if event["type"] not in ACTIONABLE_WATCHER_TYPES:  # pyright: ignore[reportArgumentType,reportOptionalSubscript]
-            continue
-        if matcher(event["object"]):  # pyright: ignore[reportArgumentType,reportOptionalSubscript]
-            watcher.stop()
-            found_resource = True
-    return found_resource
+    def stop(self) -> None:
+        """Stop the watch; it will end when the current watch request returns."""
+        self._stopped.set()
+        if self._watch is not None:
+            self._watch.stop()
+
+    def _notify(self) -> None:
+        """Wake every waiter and listener; the condition must be held."""
+        self._condition.notify_all()
+        for listener in self._listeners:
+            listener.set()
+
+    def _run(self) -> None:
+        """List and watch until stopped, resuming the watch from the last seen resource version after it ends."""
+        resource_version: str | None = None
+        while not self._stopped.is_set():
+            try:
+                if resource_version is None:
+                    resource_version = self._list()
+                resource_version = self._follow(resource_version)
+            except kubernetes.client.ApiException as e:
+                if e.status != HTTPStatus.GONE:
+                    self._failed(e)
+                resource_version = None
+            except Exception as e:  # noqa: BLE001
+                self._failed(e)
+
+    def _failed(self, error: BaseException) -> None:
+        """Record an error so that waiters fail fast if the cache was never filled, then pause before retrying."""
+        logger.warning("informer for %s failed: %s", self.lister.__name__, error)
+        with self._condition:
+            self._error = error
+            self._notify()
+        self._stopped.wait(RETRY_SECONDS)
+
+    def _list(self) -> str:
+        """Replace the cache with the result of the list function, returning its resource version."""
+        result = self.lister(_request_timeout=self.request_timeout, **self.kwargs)
+        with self._condition:
+            self._index = ObjectIndex(result.items)
+            self._synced = True
+            self._error = None
+            self.lists += 1
+            self._notify()
+        return result.metadata.resource_version
+
+    def _follow(self, resource_version: str) -> str:
+        """Apply watch events to the cache until the watch request ends, returning the last seen resource version."""
+        self._watch = kubernetes.watch.Watch()
+        for event in self._watch.stream(
+            func=self.lister,
+            resource_version=resource_version,
+            timeout_seconds=WATCH_TIMEOUT_SECONDS,
+            _request_timeout=WATCH_TIMEOUT_SECONDS + self.request_timeout,
+            **self.kwargs,
+        ):
+            event_type = event["type"]  # pyright: ignore[reportArgumentType,reportOptionalSubscript]
+            obj = event["object"]  # pyright: ignore[reportArgumentType,reportOptionalSubscript]
+            with self._condition:
+                if event_type in ACTIONABLE_WATCHER_TYPES:
+                    self._index.put(obj)
+                elif event_type == DELETED_WATCHER_TYPE:
+                    self._index.remove(object_key(obj))
+                self.events += 1
+                self._notify()
+            if self._stopped.is_set():
+                self._watch.stop()
+        return self._watch.resource_version or resource_version
+
+
+def informer(lister: Callable, request_timeout: int = DEFAULT_REQUEST_TIMEOUT, **kwargs) -> Informer:  # noqa: ANN003
+    """Return the shared Informer for lister and kwargs, starting one if this is the first request for them.
+
+    NOTE: lister must be a bound method of a Kubernetes API object, such as CoreV1Api.list_namespace; informers are
+    shared between API objects that use the same API client.
+    """
+    api_client = lister.__self__.api_client  # pyright: ignore[reportAttributeAccessIssue]
+    key = (api_client, lister.__name__, tuple(sorted(kwargs.items())))
+    with _INFORMERS_GUARD:
+        shared = _INFORMERS.get(key)
+        if shared is None:
+            shared = _INFORMERS[key] = Informer(lister=lister, request_timeout=request_timeout, **kwargs)
+        return shared
+
+
+def close_informers(client: kubernetes.client.ApiClient) -> None:
+    """Stop and forget every informer that uses client."""
+    with _INFORMERS_GUARD:
+        keys = [key for key in _INFORMERS if key[0] is client]
+        informers = [_INFORMERS.pop(key) for key in keys]
+    for shared in informers:
+        shared.stop()
+
+
+def watcher(lister: Callable, matcher: Matcher, **kwargs) -> bool:  # noqa: ANN003
+    """Wait for any object returned from call to lister to satisfy matcher, using the shared informer for lister.
+
+    The timeout_seconds and _request_timeout keyword arguments bound the wait and each list request respectively; any
+    other keyword arguments, such as namespace or label_selector, are passed to lister.
+    """
+    timeout_seconds = kwargs.pop("timeout_seconds", DEFAULT_TIMEOUT_SECONDS)
+    request_timeout = kwargs.pop("_request_timeout", DEFAULT_REQUEST_TIMEOUT)
+    return informer(lister, request_timeout=request_timeout, **kwargs).wait_for(matcher, timeout_seconds)
+
+
+@dataclass(frozen=True)
+class Expectation:
+    """Expect an object returned from call to lister with kwargs to satisfy matcher and, if given, condition.
+
+    The matcher identifies the object, and should be a Match so it can be found through the informer indexes; the
+    condition decides whether a matching object is ready.
+    """
+
+    lister: Callable
+    matcher: Matcher
+    condition: Matcher | None = None
+    kwargs: Mapping[str, Any] = field(default_factory=dict)
+    description: str = ""
+
+
+@dataclass(frozen=True)
+class Readiness:
+    """Record when an expectation was satisfied, and by which object."""
+
+    expectation: Expectation
+    key: ObjectKey | None = None
+    ready_at: float | None = None
+    elapsed: float | None = None
+
+    @property
+    def ready(self) -> bool:
+        """Determine if the expectation was satisfied."""
+        return self.key is not None
+
+
+def _satisfied(shared: Informer, expectation: Expectation) -> ObjectKey | None:
+    """Return the key of a cached object that satisfies the expectation, if there is one."""
+    if not shared.synced():
+        return None
+    condition = expectation.condition
+    for obj in shared.find(expectation.matcher):
+        if condition is None or condition(obj):
+            return object_key(obj)
+    return None
+
+
+def wait_all(
+    expectations: Iterable[Expectation],
+    timeout_seconds: float = DEFAULT_TIMEOUT_SECONDS,
+    request_timeout: int = DEFAULT_REQUEST_TIMEOUT,
+) -> list[Readiness]:
+    """Wait for every expectation at the same time over shared informers, returning their readiness in order.
+
+    Each Readiness records the wall-clock time the expectation was first seen to be satisfied and the seconds elapsed
+    since the wait started; expectations that were not satisfied before the timeout have no key or times.
+    """
+    expectations = list(expectations)
+    informers = [informer(e.lister, request_timeout=request_timeout, **e.kwargs) for e in expectations]
+    results: dict[int, Readiness] = {}
+    wake = threading.Event()
+    start = time.monotonic()
+    deadline = start + timeout_seconds
+    for shared in set(informers):
+        shared.subscribe(wake)
+    try:
+        while len(results) < len(expectations):
+            wake.clear()
+            for position, expectation in enumerate(expectations):
+                if position in results:
+                    continue
+                key = _satisfied(informers[position], expectation)
+                if key is not None:
+                    results[position] = Readiness(
+                        expectation=expectation,
+                        key=key,
+                        ready_at=time.time(),
+                        elapsed=time.monotonic() - start,
+                    )
+            remaining = deadline - time.monotonic()
+            if len(results) == len(expectations) or remaining <= 0:
+                break
+            wake.wait(remaining)
+    finally:
+        for shared in set(informers):
+            shared.unsubscribe(wake)
+    return [results.get(position, Readiness(expectation=e)) for position, e in enumerate(expectations)]
+
+
+def assert_all_ready(
+    expectations: Iterable[Expectation],
+    timeout_seconds: float = DEFAULT_TIMEOUT_SECONDS,
+    request_timeout: int = DEFAULT_REQUEST_TIMEOUT,
+) -> list[Readiness]:
+    """Raise an AssertionError naming every expectation that was not satisfied; otherwise return their readiness."""
+    readiness = wait_all(expectations, timeout_seconds=timeout_seconds, request_timeout=request_timeout)
+    missing = [r.expectation.description or repr(r.expectation.matcher) for r in readiness if not r.ready]
+    assert not missing, f"Expectations not satisfied within {timeout_seconds}s: {', '.join(missing)}"
+    return readiness
+
+
+def namespace_expectation(client: kubernetes.client.ApiClient, namespace: str) -> Expectation:
+    """Return an Expectation that the Namespace exists."""
+    assert namespace, "namespace parameter is required"
+    return Expectation(
+        lister=kubernetes.client.CoreV1Api(api_client=client).list_namespace,
+        matcher=match_metadata_name(name=namespace),
+        description=f"Namespace {namespace}",
+    )
+
+
+def labelled_service_expectation(
+    client: kubernetes.client.ApiClient,
+    namespace: str,
+    label_selector: str,
+) -> Expectation:
+    """Return an Expectation that at least one Service in the namespace matches an equality-based label selector."""
+    assert namespace, "namespace parameter is required"
+    assert label_selector, "label_selector parameter is required"
+    return Expectation(
+        lister=kubernetes.client.CoreV1Api(api_client=client).list_namespaced_service,
+        matcher=Match.selector(label_selector),
+        kwargs={"namespace": namespace},
+        description=f"Service matching {label_selector} in {namespace}",
+    )
 
 
 def assert_namespace(
     client: kubernetes.client.ApiClient,
     namespace: str,
-    timeout_seconds: int = 180,
-    request_timeout: int = 10,
+    timeout_seconds: int = DEFAULT_TIMEOUT_SECONDS,
+    request_timeout: int = DEFAULT_REQUEST_TIMEOUT,
 ) -> None:
     """Raise an AssertionError if the Namespace for the cluster is not found."""
     assert namespace, "namespace parameter is required"
@@ -68,18 +508,21 @@ def assert_any_labelled_service_exists(
     client: kubernetes.client.ApiClient,
     namespace: str,
     label_selector: str,
-    timeout_seconds: int = 180,
-    request_timeout: int = 10,
+    timeout_seconds: int = DEFAULT_TIMEOUT_SECONDS,
+    request_timeout: int = DEFAULT_REQUEST_TIMEOUT,
 ) -> None:
-    """Raise an AssertionError if no matching services are found in the namespace."""
+    """Raise an AssertionError if no matching services are found in the namespace.
+
+    NOTE: The services of the namespace are watched without a server-side selector, so that assertions on different
+    labels share one informer; label_selector must be equality-based.
+    """
     assert namespace, "namespace parameter is required"
     assert label_selector, "label_selector parameter is required"
     core_v1 = kubernetes.client.CoreV1Api(api_client=client)
     assert watcher(
         lister=core_v1.list_namespaced_service,
-        matcher=match_exists,
+        matcher=Match.selector(label_selector),
         timeout_seconds=timeout_seconds,
         _request_timeout=request_timeout,
         namespace=namespace,
-        label_selector=label_selector,
     ), "Expected at least one service to match label selector, found none"
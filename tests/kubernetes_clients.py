@@ -0,0 +1,288 @@
+"""A process-wide factory of Kubernetes API clients authenticated with Google credentials.
+
+NOTE: Credentials are loaded once and refreshed in the background shortly before they expire, CA certificates are
+written to one file per distinct certificate, and API clients are pooled by host, CA and proxy; clients and their
+informers are released when the cluster serving their host is torn down, or when the factory is closed at the end of
+the session.
+
+NOTE: Each pooled client keeps up to TEST_KUBERNETES_POOL_MAXSIZE connections alive per API server, with TCP keepalive
+probes after TEST_KUBERNETES_KEEPALIVE_SECONDS of idleness, so that requests through the bastion proxy reuse an
+established CONNECT tunnel and TLS session rather than repeating the handshakes. Pool hits and misses are logged when
+the factory is closed.
+"""
+
+import base64
+import datetime as dt
+import hashlib
+import logging
+import os
+import shutil
+import socket
+import tempfile
+import threading
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any, cast
+
+import google.auth
+import google.auth.credentials
+import google.auth.transport.requests
+import kubernetes.client
+import urllib3
+
+from .kubernetes_assertions import close_informers
+
+# Refresh credentials this long before they expire; more than the google-auth threshold for treating them as expired.
+REFRESH_MARGIN = dt.timedelta(minutes=5)
+# The delay before retrying a failed background refresh.
+RETRY_DELAY = dt.timedelta(seconds=30)
+DEFAULT_POOL_MAXSIZE = 4
+DEFAULT_KEEPALIVE_SECONDS = 30
+# The number of unanswered keepalive probes, sent every keepalive interval, before a connection is dropped.
+KEEPALIVE_PROBES = 3
+
+logger = logging.getLogger(__name__)
+
+
+def _utcnow() -> dt.datetime:
+    """Return the current time as a naive UTC datetime, matching google-auth credential expiry."""
+    return dt.datetime.now(dt.UTC).replace(tzinfo=None)
+
+
+def default_pool_maxsize() -> int:
+    """Return the number of connections kept alive per API server by each pooled client.
+
+    Preference will be given to the environment variable TEST_KUBERNETES_POOL_MAXSIZE with fallback to 4.
+    """
+    raw = os.getenv("TEST_KUBERNETES_POOL_MAXSIZE", "")
+    if raw.strip():
+        maxsize = int(raw.strip())
+        assert maxsize > 0, "TEST_KUBERNETES_POOL_MAXSIZE must be positive"
+        return maxsize
+    return DEFAULT_POOL_MAXSIZE
+
+
+def default_keepalive_seconds() -> int:
+    """Return the idle seconds before TCP keepalive probes are sent on API server connections, or 0 to disable them.
+
+    Preference will be given to the environment variable TEST_KUBERNETES_KEEPALIVE_SECONDS with fallback to 30.
+    """
+    raw = os.getenv("TEST_KUBERNETES_KEEPALIVE_SECONDS", "")
+    if raw.strip():
+        seconds = int(raw.strip())
+        assert seconds >= 0, "TEST_KUBERNETES_KEEPALIVE_SECONDS must not be negative"
+        return seconds
+    return DEFAULT_KEEPALIVE_SECONDS
+
+
+def keepalive_socket_options(idle: int) -> list[tuple[int, int, int]]:
+    """Return urllib3 socket options that add TCP keepalive, probing every idle seconds, to the urllib3 defaults."""
+    options = [*urllib3.connection.HTTPConnection.default_socket_options, (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+    for name, value in [("TCP_KEEPIDLE", idle), ("TCP_KEEPINTVL", idle), ("TCP_KEEPCNT", KEEPALIVE_PROBES)]:
+        if hasattr(socket, name):
+            options.append((socket.IPPROTO_TCP, getattr(socket, name), value))
+    return options
+
+
+@dataclass(frozen=True)
+class PoolStats:
+    """The number of requests made by an API client, and the number of connections it had to open for them."""
+
+    requests: int = 0
+    connections: int = 0
+
+    @property
+    def hits(self) -> int:
+        """Return the number of requests that reused a pooled connection."""
+        return self.requests - self.connections
+
+    @property
+    def misses(self) -> int:
+        """Return the number of requests that opened a new connection, including any proxy tunnel and TLS handshake."""
+        return self.connections
+
+
+def pool_stats(client: kubernetes.client.ApiClient) -> PoolStats:
+    """Return the connection pool statistics of an API client, summed over its urllib3 connection pools."""
+    pools = client.rest_client.pool_manager.pools
+    requests = connections = 0
+    for key in pools.keys():  # noqa: SIM118
+        pool = pools.get(key)
+        if pool is not None:
+            requests += pool.num_requests
+            connections += pool.num_connections
+    return PoolStats(requests=requests, connections=connections)
+
+
+class KubernetesClientFactory:
+    """Create, and pool, Kubernetes API clients that share one set of refreshed Google credentials."""
+
+    def __init__(
+        self,
+        credentials_loader: Callable[[], tuple[Any, Any]] = google.auth.default,
+        refresh_margin: dt.timedelta = REFRESH_MARGIN,
+        pool_maxsize: int | None = None,
+        keepalive_seconds: int | None = None,
+    ) -> None:
+        """Initialise a factory that loads credentials with credentials_loader when the first client is created.
+
+        NOTE: Pool size and keepalive default to the values of TEST_KUBERNETES_POOL_MAXSIZE and
+        TEST_KUBERNETES_KEEPALIVE_SECONDS when not given.
+        """
+        self.credentials_loader = credentials_loader
+        self.refresh_margin = refresh_margin
+        self.pool_maxsize = pool_maxsize if pool_maxsize is not None else default_pool_maxsize()
+        self.keepalive_seconds = keepalive_seconds if keepalive_seconds is not None else default_keepalive_seconds()
+        self.refreshes = 0
+        self._lock = threading.RLock()
+        self._credentials: google.auth.credentials.Credentials | None = None
+        self._timer: threading.Timer | None = None
+        self._ca_dir: str | None = None
+        self._ca_files: dict[str, str] = {}
+        self._clients: dict[tuple[str, str, str | None], kubernetes.client.ApiClient] = {}
+
+    def token(self) -> str:
+        """Return a valid access token, refreshing the credentials now only if the background refresh fell behind."""
+        with self._lock:
+            if self._credentials is None:
+                credentials, _ = self.credentials_loader()
+                self._credentials = cast("google.auth.credentials.Credentials", credentials)
+                self._refresh()
+            elif not self._credentials.valid:
+                self._refresh()
+            return cast("str", self._credentials.token)
+
+    def _refresh(self) -> None:
+        """Refresh the credentials and schedule the next background refresh; the lock must be held."""
+        credentials = cast("google.auth.credentials.Credentials", self._credentials)
+        credentials.refresh(google.auth.transport.requests.Request())
+        self.refreshes += 1
+        expiry = cast("dt.datetime | None", credentials.expiry)
+        if expiry is not None:
+            self._schedule((expiry - self.refresh_margin - _utcnow()).total_seconds())
+
+    def _schedule(self, delay: float) -> None:
+        """Schedule a background refresh after delay seconds, replacing any scheduled refresh; the lock must be held."""
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = threading.Timer(max(delay, 0.0), self._background_refresh)
+        self._timer.name = "kubernetes-credentials"
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _background_refresh(self) -> None:
+        """Refresh the credentials from the timer thread, retrying after a delay if the refresh fails."""
+        with self._lock:
+            if self._credentials is None:
+                return
+            try:
+                self._refresh()
+            except Exception:
+                logger.exception("background refresh of Kubernetes API credentials failed")
+                self._schedule(RETRY_DELAY.total_seconds())
+
+    def ca_file(self, ca: str) -> str:
+        """Return the path of a file holding the base64-encoded CA certificate, writing it once per distinct content."""
+        digest = hashlib.sha256(ca.encode("utf-8")).hexdigest()
+        with self._lock:
+            path = self._ca_files.get(digest)
+            if path is None:
+                if self._ca_dir is None:
+                    self._ca_dir = tempfile.mkdtemp(prefix="kubernetes-ca-")
+                path = f"{self._ca_dir}/{digest}.pem"
+                with open(path, "wb") as ca_cert_file:  # noqa: PTH123
+                    ca_cert_file.write(base64.standard_b64decode(ca))
+                self._ca_files[digest] = path
+            return path
+
+    def api_client(self, host: str, ca: str, proxy_url: str | None = None) -> kubernetes.client.ApiClient:
+        """Return the pooled API client for host, CA and proxy, creating it on first use."""
+        key = (host, hashlib.sha256(ca.encode("utf-8")).hexdigest(), proxy_url)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                client = self._clients[key] = kubernetes.client.ApiClient(
+                    configuration=self.configuration(host=host, ca=ca, proxy_url=proxy_url),
+                )
+            return client
+
+    def release(self, *hosts: str) -> int:
+        """Close and forget every pooled client for any of hosts, whatever its CA and proxy, and stop its informers.
+
+        Return the number of clients that were released.
+        """
+        with self._lock:
+            keys = [key for key in self._clients if key[0] in hosts]
+            clients = [self._clients.pop(key) for key in keys]
+        for client in clients:
+            close_informers(client)
+            client.close()
+        return len(clients)
+
+    def configuration(self, host: str, ca: str, proxy_url: str | None = None) -> kubernetes.client.Configuration:
+        """Return a client configuration that sets the current access token before every request."""
+        config = kubernetes.client.Configuration(
+            host=host,
+            api_key_prefix={
+                "authorization": "Bearer",
+            },
+            api_key={
+                "authorization": self.token(),
+            },
+        )
+
+        def _refresh_api_key(config: kubernetes.client.Configuration) -> None:
+            config.api_key["authorization"] = self.token()  # pyright: ignore[reportAttributeAccessIssue]
+
+        config.refresh_api_key_hook = _refresh_api_key  # pyright: ignore[reportAttributeAccessIssue]
+        config.ssl_ca_cert = self.ca_file(ca)  # pyright: ignore[reportAttributeAccessIssue]
+        config.verify_ssl = True
+        config.connection_pool_maxsize = self.pool_maxsize  # pyright: ignore[reportAttributeAccessIssue]
+        if self.keepalive_seconds:
+            config.socket_options = keepalive_socket_options(self.keepalive_seconds)  # pyright: ignore[reportAttributeAccessIssue]
+        if proxy_url:
+            config.proxy = proxy_url  # pyright: ignore[reportAttributeAccessIssue]
+        return config
+
+    def pool_stats(self) -> dict[str, PoolStats]:
+        """Return the connection pool statistics of every pooled client, keyed by host and any proxy."""
+        with self._lock:
+            clients = dict(self._clients)
+        stats: dict[str, PoolStats] = {}
+        for (host, _, proxy_url), client in clients.items():
+            label = f"{host} via {proxy_url}" if proxy_url else host
+            client_stats = pool_stats(client)
+            previous = stats.get(label, PoolStats())
+            stats[label] = PoolStats(
+                requests=previous.requests + client_stats.requests,
+                connections=previous.connections + client_stats.connections,
+            )
+        return stats
+
+    def close(self) -> None:
+        """Stop the background refresh, close every pooled client and its informers, and remove the CA files."""
+        for label, stats in self.pool_stats().items():
+            logger.info(
+                "Kubernetes API connection pool for %s: %d requests, %d hits, %d misses",
+                label,
+                stats.requests,
+                stats.hits,
+                stats.misses,
+            )
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            clients = list(self._clients.values())
+            self._clients = {}
+            self._credentials = None
+            ca_dir, self._ca_dir = self._ca_dir, None
+            self._ca_files = {}
+        for client in clients:
+            close_informers(client)
+            client.close()
+        if ca_dir is not None:
+            shutil.rmtree(ca_dir, ignore_errors=True)
+
+
+KUBERNETES_CLIENTS = KubernetesClientFactory()
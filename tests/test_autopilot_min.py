@@ -4,15 +4,17 @@ import base64
 import ipaddress
 import pathlib
 import urllib.parse
-from collections.abc import Generator
+from collections.abc import Generator, Mapping
 from typing import Any, cast
 
 import pytest
 from cryptography import x509
 from google.cloud import container_v1
 
-from .conftest import kubernetes_api_client, run_tofu_in_workspace
+from .cluster_snapshots import ClusterSnapshots
+from .conftest import kubernetes_api_client, release_kubernetes_clients
 from .gke_autopilot_assertions import (
+    ASSERTED_CLUSTER_FIELDS,
     assert_anonymous_authentication_config,
     assert_compliance_posture_config,
     assert_default_addons_config,
@@ -56,9 +58,11 @@ from .gke_autopilot_assertions import (
     assert_user_managed_keys_config,
 )
 from .kubernetes_assertions import (
-    assert_any_labelled_service_exists,
-    assert_namespace,
+    assert_all_ready,
+    labelled_service_expectation,
+    namespace_expectation,
 )
+from .tofu_harness import FixtureRegistry, FixtureSpec, provision_fixtures
 
 FIXTURE_NAME = "auto-min"
 FIXTURE_LABELS = {
@@ -79,68 +83,35 @@ def fixture_labels(labels: dict[str, str]) -> dict[str, str]:
 
 
 @pytest.fixture(scope="module")
-def sa_fixture_output(
+def fixture_outputs(
     sa_fixture_dir: pathlib.Path,
-    project_id: str,
-    fixture_name: str,
-) -> Generator[dict[str, Any], None, None]:
-    """Create a service account for the test case."""
-    with run_tofu_in_workspace(
-        fixture=sa_fixture_dir,
-        workspace=FIXTURE_NAME,
-        tfvars={
-            "project_id": project_id,
-            "name": fixture_name,
-        },
-    ) as output:
-        yield output
-
-
-@pytest.fixture(scope="module")
-def vpc_fixture_output(
     vpc_fixture_dir: pathlib.Path,
-    project_id: str,
-    fixture_name: str,
-    region: str,
-    fixture_labels: dict[str, str],
-) -> Generator[dict[str, Any], None, None]:
-    """Create a VPC and bastion for the test case."""
-    with run_tofu_in_workspace(
-        fixture=vpc_fixture_dir,
-        workspace=FIXTURE_NAME,
-        tfvars={
-            "project_id": project_id,
-            "name": fixture_name,
-            "region": region,
-            "labels": fixture_labels,
-        },
-    ) as output:
-        yield output
-
-
-@pytest.fixture(scope="module")
-def fixture_output(
     autopilot_fixture_dir: pathlib.Path,
     project_id: str,
     fixture_name: str,
     fixture_labels: dict[str, str],
-    sa_fixture_output: dict[str, Any],
-    vpc_fixture_output: dict[str, Any],
-) -> Generator[dict[str, Any], None, None]:
-    """Create GKE Autopilot cluster for test case."""
-    service_account = cast("str", sa_fixture_output["email"])
-    assert service_account
-    subnet = cast("dict[str, str]", vpc_fixture_output["subnet"])
-    assert subnet
-    subnet = subnet | {
-        "master_cidr": "192.168.0.0/28",
-    }
-    bastion_ip_address = vpc_fixture_output["bastion_ip_address"]
-    assert bastion_ip_address
-    with run_tofu_in_workspace(
-        fixture=autopilot_fixture_dir,
-        workspace=FIXTURE_NAME,
-        tfvars={
+    fixture_registry: FixtureRegistry,
+    shared_sa_tfvars: dict[str, Any],
+    shared_vpc_tfvars: dict[str, Any],
+) -> Generator[dict[str, dict[str, Any]], None, None]:
+    """Create a service account, VPC and bastion, and GKE Autopilot cluster for the test case.
+
+    NOTE: The service account and VPC are shared with other test modules, and the cluster uses a master CIDR that is
+    unique within the shared VPC. The service account and VPC do not depend on each other and are created at the same
+    time.
+    """
+
+    def cluster_tfvars(outputs: Mapping[str, dict[str, Any]]) -> dict[str, Any]:
+        service_account = cast("str", outputs["sa"]["email"])
+        assert service_account
+        subnet = cast("dict[str, str]", outputs["vpc"]["subnet"])
+        assert subnet
+        subnet = subnet | {
+            "master_cidr": "192.168.0.32/28",
+        }
+        bastion_ip_address = outputs["vpc"]["bastion_ip_address"]
+        assert bastion_ip_address
+        return {
             "project_id": project_id,
             "name": fixture_name,
             "service_account": service_account,
@@ -152,24 +123,67 @@ def fixture_output(
                 },
             ],
             "labels": fixture_labels,
-        },
-    ) as output:
-        yield output
+        }
+
+    with provision_fixtures(
+        specs=[
+            FixtureSpec(
+                name="sa",
+                fixture=sa_fixture_dir,
+                workspace=None,
+                tfvars=shared_sa_tfvars,
+                shared=True,
+            ),
+            FixtureSpec(
+                name="vpc",
+                fixture=vpc_fixture_dir,
+                workspace=None,
+                tfvars=shared_vpc_tfvars,
+                shared=True,
+            ),
+            FixtureSpec(
+                name="cluster",
+                fixture=autopilot_fixture_dir,
+                workspace=FIXTURE_NAME,
+                tfvars=cluster_tfvars,
+                depends_on=("sa", "vpc"),
+            ),
+        ],
+        registry=fixture_registry,
+    ) as outputs:
+        try:
+            yield outputs
+        finally:
+            release_kubernetes_clients(outputs["cluster"])
+
+
+@pytest.fixture(scope="module")
+def sa_fixture_output(fixture_outputs: dict[str, dict[str, Any]]) -> dict[str, Any]:
+    """Return the output of the service account fixture for the test case."""
+    return fixture_outputs["sa"]
+
+
+@pytest.fixture(scope="module")
+def vpc_fixture_output(fixture_outputs: dict[str, dict[str, Any]]) -> dict[str, Any]:
+    """Return the output of the VPC and bastion fixture for the test case."""
+    return fixture_outputs["vpc"]
+
+
+@pytest.fixture(scope="module")
+def fixture_output(fixture_outputs: dict[str, dict[str, Any]]) -> dict[str, Any]:
+    """Return the output of the GKE Autopilot cluster fixture for the test case."""
+    return fixture_outputs["cluster"]
 
 
 @pytest.fixture(scope="module")
 def cluster(
     fixture_output: dict[str, Any],
-    cluster_manager_client: container_v1.ClusterManagerClient,
+    cluster_snapshots: ClusterSnapshots,
 ) -> container_v1.Cluster:
-    """Return the GKE Cluster object matching the fixture output."""
+    """Return the GKE Cluster object matching the fixture output, projected onto the asserted fields."""
     cluster_id = fixture_output["id"]
     assert cluster_id
-    cluster = cluster_manager_client.get_cluster(
-        request=container_v1.GetClusterRequest(
-            name=cluster_id,
-        ),
-    )
+    cluster = cluster_snapshots.project(cluster_id, ASSERTED_CLUSTER_FIELDS)
     assert cluster
     return cluster
 
@@ -491,9 +505,13 @@ def test_private_api_access_via_proxy(
         ca=ca_cert,
         proxy_url=f"http://{bastion_public_ip_address}:8888",
     ) as client:
-        assert_namespace(client=client, namespace="kube-system")
-        assert_any_labelled_service_exists(
-            client=client,
-            namespace="kube-system",
-            label_selector="kubernetes.io/cluster-service=true",
+        assert_all_ready(
+            [
+                namespace_expectation(client=client, namespace="kube-system"),
+                labelled_service_expectation(
+                    client=client,
+                    namespace="kube-system",
+                    label_selector="kubernetes.io/cluster-service=true",
+                ),
+            ],
         )
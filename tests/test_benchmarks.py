@@ -0,0 +1,162 @@
+"""Benchmark provisioning of standard and Autopilot clusters, and the overhead of the tofu harness itself.
+
+NOTE: The provisioning benchmarks create real clusters, so they only run when TEST_BENCHMARKS is set; see benchmarks.py
+for the results store and regression thresholds. The ready phase of a cluster is the time from the end of apply until
+its Kubernetes API, reached through the bastion, serves kube-system and its cluster services.
+
+The harness overhead benchmarks drive copies of the same fixtures with the fake tofu executable, so they always run,
+but are only recorded and compared against the baseline when TEST_BENCHMARKS is set. Select them with
+-k harness_overhead to benchmark the harness without creating clusters.
+"""
+
+import pathlib
+from collections.abc import Generator
+from typing import Any, cast
+
+import pytest
+
+from .benchmarks import (
+    APPLY,
+    DESTROY,
+    READY,
+    BenchmarkStore,
+    PhaseStats,
+    benchmarks_enabled,
+    check_benchmark,
+    run_benchmark,
+)
+from .cassettes import REPLAY, cassette_mode
+from .conftest import kubernetes_api_client, release_kubernetes_clients
+from .fake_tofu import REPO_ROOT, copy_fixture
+from .kubernetes_assertions import assert_all_ready, labelled_service_expectation, namespace_expectation
+from .tofu_harness import FixtureRegistry, FixtureSpec, provision_fixtures
+
+# Each variant has a master CIDR that is unique within the shared VPC.
+VARIANTS = {
+    "standard": ("root", {"node_pools": {}}, "192.168.0.80/28"),
+    "autopilot": ("autopilot", {}, "192.168.0.96/28"),
+}
+READY_TIMEOUT = 1200.0
+OVERHEAD_ROUNDS = 3
+
+
+@pytest.fixture(scope="module")
+def shared_outputs(
+    sa_fixture_dir: pathlib.Path,
+    vpc_fixture_dir: pathlib.Path,
+    fixture_registry: FixtureRegistry,
+    shared_sa_tfvars: dict[str, Any],
+    shared_vpc_tfvars: dict[str, Any],
+) -> Generator[dict[str, dict[str, Any]], None, None]:
+    """Lease the shared service account, VPC and bastion that the benchmarked clusters use."""
+    with provision_fixtures(
+        specs=[
+            FixtureSpec(name="sa", fixture=sa_fixture_dir, workspace=None, tfvars=shared_sa_tfvars, shared=True),
+            FixtureSpec(name="vpc", fixture=vpc_fixture_dir, workspace=None, tfvars=shared_vpc_tfvars, shared=True),
+        ],
+        registry=fixture_registry,
+    ) as outputs:
+        yield outputs
+
+
+def wait_for_kubernetes_api(output: dict[str, Any], bastion_public_ip_address: str) -> None:
+    """Wait until the Kubernetes API of the cluster serves kube-system and its cluster services, through the bastion."""
+    try:
+        with kubernetes_api_client(
+            host=output["endpoint_url"],
+            ca=output["ca_cert"],
+            proxy_url=f"http://{bastion_public_ip_address}:8888",
+        ) as client:
+            assert_all_ready(
+                [
+                    namespace_expectation(client=client, namespace="kube-system"),
+                    labelled_service_expectation(
+                        client=client,
+                        namespace="kube-system",
+                        label_selector="kubernetes.io/cluster-service=true",
+                    ),
+                ],
+                timeout_seconds=READY_TIMEOUT,
+            )
+    finally:
+        release_kubernetes_clients(output)
+
+
+@pytest.mark.skipif(
+    not benchmarks_enabled() or cassette_mode() == REPLAY,
+    reason="provisioning benchmarks only run against live infrastructure when TEST_BENCHMARKS is set",
+)
+@pytest.mark.parametrize("variant", list(VARIANTS))
+def test_provisioning(
+    variant: str,
+    shared_outputs: dict[str, dict[str, Any]],
+    project_id: str,
+    prefix: str,
+    labels: dict[str, str],
+) -> None:
+    """Benchmark applying a cluster, waiting for its Kubernetes API, and destroying it, against the stored baseline."""
+    fixture, variant_tfvars, master_cidr = VARIANTS[variant]
+    subnet = cast("dict[str, str]", shared_outputs["vpc"]["subnet"])
+    tfvars = variant_tfvars | {
+        "project_id": project_id,
+        "name": f"{prefix}-bench-{variant}",
+        "service_account": shared_outputs["sa"]["email"],
+        "subnet": subnet | {"master_cidr": master_cidr},
+        "master_authorized_networks": [
+            {"cidr_block": f"{shared_outputs['vpc']['bastion_ip_address']}/32", "display_name": "bastion"},
+        ],
+        "labels": {"fixture": f"bench-{variant}"} | labels,
+    }
+    stats = run_benchmark(
+        benchmark=f"provision-{variant}",
+        fixture=REPO_ROOT.joinpath("tests/fixtures", fixture),
+        workspace=f"bench-{variant}",
+        tfvars=tfvars,
+        ready=lambda output: wait_for_kubernetes_api(output, shared_outputs["vpc"]["bastion_public_ip_address"]),
+    )
+    assert {stat.phase for stat in stats} >= {APPLY, READY}
+    regressions = check_benchmark(stats)
+    assert not regressions, "; ".join(str(regression) for regression in regressions)
+
+
+@pytest.mark.parametrize("variant", list(VARIANTS))
+def test_harness_overhead(fake_tofu: pathlib.Path, variant: str, tmp_path: pathlib.Path) -> None:
+    """Benchmark the harness driving a fixture variant with the fake tofu executable, against the stored baseline."""
+    assert fake_tofu.exists()
+    fixture, variant_tfvars, _ = VARIANTS[variant]
+    stats = run_benchmark(
+        benchmark=f"harness-{variant}",
+        fixture=copy_fixture(REPO_ROOT.joinpath("tests/fixtures", fixture), tmp_path / "repo"),
+        workspace=f"bench-{variant}",
+        tfvars=variant_tfvars | {"name": f"bench-{variant}"},
+        rounds=OVERHEAD_ROUNDS,
+    )
+    assert [(stat.phase, len(stat.rounds)) for stat in stats] == [(APPLY, OVERHEAD_ROUNDS), (DESTROY, OVERHEAD_ROUNDS)]
+    if not benchmarks_enabled():
+        return
+    regressions = check_benchmark(stats)
+    assert not regressions, "; ".join(str(regression) for regression in regressions)
+
+
+def test_benchmark_store(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Verify results are appended, baselines are only saved when asked, and regressions respect the threshold."""
+    store = BenchmarkStore(directory=tmp_path)
+    baseline = [PhaseStats("provision-standard", APPLY, [600.0, 620.0, 580.0]), PhaseStats("other", APPLY, [1.0])]
+    assert not check_benchmark(baseline, store=store, threshold=0.1)
+    assert store.baseline() == {}
+    monkeypatch.setenv("TEST_BENCHMARK_SAVE_BASELINE", "true")
+    assert not check_benchmark(baseline, store=store, threshold=0.1)
+    assert store.baseline() == {"other": {APPLY: 1.0}, "provision-standard": {APPLY: 600.0}}
+    monkeypatch.delenv("TEST_BENCHMARK_SAVE_BASELINE")
+    slower = [PhaseStats("provision-standard", APPLY, [700.0]), PhaseStats("provision-standard", DESTROY, [900.0])]
+    regressions = check_benchmark(slower, store=store, threshold=0.1)
+    assert [str(regression) for regression in regressions] == [
+        "provision-standard apply: median 700.000s is 17% slower than baseline 600.000s",
+    ]
+    assert not check_benchmark(slower, store=store, threshold=0.2)
+    monkeypatch.setenv("TEST_BENCHMARK_THRESHOLD", "0.15")
+    assert check_benchmark(slower, store=store) == regressions
+    results = store.results()
+    assert len(results) == 10  # noqa: PLR2004
+    assert results[0]["rounds"] == [600.0, 620.0, 580.0]
+    assert results[0]["median"] == 600.0  # noqa: PLR2004
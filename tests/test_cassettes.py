@@ -0,0 +1,98 @@
+"""Offline tests for recording and replaying Google Cloud API calls and tofu outputs."""
+
+import base64
+import pathlib
+from collections.abc import Generator
+from typing import cast
+
+import grpc
+import pytest
+from google.cloud import container_v1, resourcemanager_v3
+from google.iam.v1 import iam_policy_pb2, policy_pb2
+
+from .cassettes import (
+    Cassette,
+    CassetteMissError,
+    ReplayChannel,
+    _RecordingInterceptor,  # pyright: ignore[reportPrivateUsage]
+    cassette,
+    cassette_client,
+    digest,
+    fixture_key,
+    serialize,
+)
+from .tofu_harness import run_tofu_in_workspace
+
+CLUSTER_ID = "projects/test/locations/us-west1/clusters/test"
+GET_CLUSTER = "/google.container.v1.ClusterManager/GetCluster"
+GET_IAM_POLICY = "/google.cloud.resourcemanager.v3.Projects/GetIamPolicy"
+
+
+@pytest.fixture
+def cassette_dir(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch) -> Generator[pathlib.Path, None, None]:
+    """Point the session cassettes at a temporary directory in replay mode."""
+    monkeypatch.setenv("TEST_CASSETTE_DIR", str(tmp_path))
+    monkeypatch.setenv("TEST_CASSETTE_MODE", "replay")
+    cassette.cache_clear()
+    yield tmp_path
+    cassette.cache_clear()
+
+
+def test_replay_and_record(cassette_dir: pathlib.Path) -> None:
+    """Verify a replayed client is served from the cassette, and calls through a recording channel are recorded."""
+    cluster = container_v1.Cluster(name="test", release_channel={"channel": "STABLE"})
+    cassette("container").record(
+        method=GET_CLUSTER,
+        key=digest(serialize(container_v1.GetClusterRequest(name=CLUSTER_ID))),
+        response=base64.b64encode(serialize(cluster)).decode("ascii"),
+    )
+    client = cassette_client(container_v1.ClusterManagerClient, "container")
+    assert client.get_cluster(request=container_v1.GetClusterRequest(name=CLUSTER_ID)) == cluster
+    with pytest.raises(CassetteMissError):
+        client.get_cluster(request=container_v1.GetClusterRequest(name=f"{CLUSTER_ID}-missing"))
+
+    recording = Cassette(cassette_dir.joinpath("recorded.json"))
+    channel = grpc.intercept_channel(ReplayChannel(cassette("container")), _RecordingInterceptor(recording))
+    transport_class = container_v1.ClusterManagerClient.get_transport_class("grpc")
+    recorder = container_v1.ClusterManagerClient(transport=transport_class(channel=channel))
+    recorder.get_cluster(request=container_v1.GetClusterRequest(name=CLUSTER_ID))
+    assert Cassette(recording.path).interactions == cassette("container").interactions
+
+
+def test_replay_unrecorded_call_kinds(cassette_dir: pathlib.Path) -> None:
+    """Verify asynchronous and streaming calls fail with an UNIMPLEMENTED status that names the cassette."""
+    channel = ReplayChannel(cassette("container"))
+    calls = [
+        lambda: channel.unary_unary(GET_CLUSTER).future(container_v1.GetClusterRequest(name=CLUSTER_ID)),
+        lambda: channel.unary_stream("/test.Service/Watch")(b""),
+        lambda: channel.stream_stream("/test.Service/Chat")(iter([b""])),
+    ]
+    for call in calls:
+        with pytest.raises(grpc.RpcError) as excinfo:
+            call()
+        error = cast("grpc.Call", excinfo.value)
+        assert error.code() == grpc.StatusCode.UNIMPLEMENTED
+        assert str(cassette_dir.joinpath("container.json")) in error.details()
+
+
+def test_replay_iam_policy(cassette_dir: pathlib.Path) -> None:  # noqa: ARG001
+    """Verify a client whose methods use raw protobuf messages is served from the cassette."""
+    policy = policy_pb2.Policy(bindings=[policy_pb2.Binding(role="roles/viewer", members=["user:test@example.com"])])
+    cassette("resourcemanager").record(
+        method=GET_IAM_POLICY,
+        key=digest(serialize(iam_policy_pb2.GetIamPolicyRequest(resource="projects/test"))),
+        response=base64.b64encode(serialize(policy)).decode("ascii"),
+    )
+    client = cassette_client(resourcemanager_v3.ProjectsClient, "resourcemanager")
+    assert client.get_iam_policy(resource="projects/test") == policy
+
+
+def test_replay_tofu_output(cassette_dir: pathlib.Path) -> None:
+    """Verify a recorded tofu output is replayed without executing tofu."""
+    fixture = cassette_dir.joinpath("sa")
+    tfvars = {"name": "test"}
+    with pytest.raises(CassetteMissError), run_tofu_in_workspace(fixture=fixture, workspace="test", tfvars=tfvars):
+        pass
+    cassette("tofu").record(method="output", key=fixture_key(fixture, tfvars), response={"email": "test@example.com"})
+    with run_tofu_in_workspace(fixture=fixture, workspace="test", tfvars=tfvars) as output:
+        assert output == {"email": "test@example.com"}
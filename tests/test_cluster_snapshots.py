@@ -0,0 +1,132 @@
+"""Offline tests for the GKE Cluster snapshot cache."""
+
+import os
+import pathlib
+import time
+from typing import cast
+
+import pytest
+from google.cloud import container_v1
+
+from .cluster_snapshots import ClusterSnapshots
+from .gke_standard_assertions import ASSERTED_CLUSTER_FIELDS
+
+CLUSTER_ID = "projects/test/locations/us-west1/clusters/test"
+
+
+class FakeClusterManagerClient:
+    """Return a fixed Cluster from get_cluster, counting the requests."""
+
+    def __init__(self) -> None:
+        """Initialise the request counter."""
+        self.requests: list[container_v1.GetClusterRequest] = []
+
+    def get_cluster(self, request: container_v1.GetClusterRequest) -> container_v1.Cluster:
+        """Return a Cluster named after the request."""
+        self.requests.append(request)
+        return container_v1.Cluster(
+            name=request.name.rsplit("/", maxsplit=1)[-1],
+            release_channel=container_v1.ReleaseChannel(channel=container_v1.ReleaseChannel.Channel.STABLE),
+            private_cluster_config=container_v1.PrivateClusterConfig(master_ipv4_cidr_block="192.168.0.0/28"),
+            node_pools=[container_v1.NodePool(name=f"pool{index}") for index in range(3)],
+        )
+
+
+def snapshots(
+    client: FakeClusterManagerClient,
+    ttl: float = 300.0,
+    directory: pathlib.Path | None = None,
+) -> ClusterSnapshots:
+    """Return a snapshot cache that uses the fake client."""
+    return ClusterSnapshots(
+        client=cast("container_v1.ClusterManagerClient", client),
+        ttl=ttl,
+        directory=directory,
+    )
+
+
+def test_get_is_cached_until_refreshed() -> None:
+    """Verify a snapshot is fetched once, and again only when a refresh is requested or the TTL has expired."""
+    client = FakeClusterManagerClient()
+    cache = snapshots(client)
+    cluster = cache.get(CLUSTER_ID)
+    assert cluster.name == "test"
+    assert cache.get(CLUSTER_ID) == cluster
+    assert len(client.requests) == 1
+    assert cache.get(CLUSTER_ID, refresh=True) == cluster
+    assert len(client.requests) == 2  # noqa: PLR2004
+    cache.ttl = 0
+    cache.get(CLUSTER_ID)
+    assert len(client.requests) == 3  # noqa: PLR2004
+    assert cache.hits == 1
+
+
+def test_snapshot_persisted_between_sessions(tmp_path: pathlib.Path) -> None:
+    """Verify a persisted snapshot is used by a new cache until it is older than the TTL."""
+    first = FakeClusterManagerClient()
+    snapshots(first, directory=tmp_path).get(CLUSTER_ID)
+    assert len(first.requests) == 1
+    second = FakeClusterManagerClient()
+    assert snapshots(second, directory=tmp_path).get(CLUSTER_ID).release_channel.channel == (
+        container_v1.ReleaseChannel.Channel.STABLE
+    )
+    assert not second.requests
+    (snapshot,) = tmp_path.iterdir()
+    stale = time.time() - 600
+    os.utime(snapshot, (stale, stale))
+    snapshots(second, directory=tmp_path).get(CLUSTER_ID)
+    assert len(second.requests) == 1
+
+
+def test_invalidate_removes_persisted_snapshot(tmp_path: pathlib.Path) -> None:
+    """Verify an invalidated snapshot is fetched again."""
+    client = FakeClusterManagerClient()
+    cache = snapshots(client, directory=tmp_path)
+    cache.get(CLUSTER_ID)
+    cache.invalidate(CLUSTER_ID)
+    assert not list(tmp_path.iterdir())
+    cache.get(CLUSTER_ID)
+    assert len(client.requests) == 2  # noqa: PLR2004
+
+
+def test_project() -> None:
+    """Verify a projection only holds the requested fields."""
+    cache = snapshots(FakeClusterManagerClient())
+    cluster = cache.project(CLUSTER_ID, ["name", "private_cluster_config.master_ipv4_cidr_block"])
+    assert cluster.name == "test"
+    assert cluster.private_cluster_config.master_ipv4_cidr_block == "192.168.0.0/28"
+    assert "release_channel" not in cluster
+    assert not cluster.node_pools
+    with pytest.raises(ValueError, match="invalid Cluster field mask"):
+        cache.project(CLUSTER_ID, ["no_such_field"])
+
+
+def test_project_is_cached() -> None:
+    """Verify a projection is built once per set of paths, whatever their order, until the snapshot is refreshed."""
+    client = FakeClusterManagerClient()
+    cache = snapshots(client)
+    cluster = cache.project(CLUSTER_ID, ["release_channel", "name"])
+    assert cache.project(CLUSTER_ID, ["name", "release_channel", "name"]) == cluster
+    assert len(cache.snapshots[CLUSTER_ID].projections) == 1
+    assert cache.project(CLUSTER_ID, ASSERTED_CLUSTER_FIELDS).node_pools
+    assert len(cache.snapshots[CLUSTER_ID].projections) == 2  # noqa: PLR2004
+    cache.get(CLUSTER_ID, refresh=True)
+    assert not cache.snapshots[CLUSTER_ID].projections
+    assert len(client.requests) == 2  # noqa: PLR2004
+
+
+def test_returned_clusters_are_copies() -> None:
+    """Verify modifying a returned Cluster does not change the snapshot seen by later callers."""
+    cache = snapshots(FakeClusterManagerClient())
+    cluster = cache.get(CLUSTER_ID)
+    cluster.name = "modified"
+    cluster.node_pools.pop()
+    projection = cache.project(CLUSTER_ID, ["name", "node_pools"])
+    projection.release_channel.channel = container_v1.ReleaseChannel.Channel.RAPID
+    projection.node_pools.clear()
+    assert cache.get(CLUSTER_ID).name == "test"
+    assert len(cache.get(CLUSTER_ID).node_pools) == 3  # noqa: PLR2004
+    projection = cache.project(CLUSTER_ID, ["name", "node_pools"])
+    assert projection.name == "test"
+    assert len(projection.node_pools) == 3  # noqa: PLR2004
+    assert "release_channel" not in projection
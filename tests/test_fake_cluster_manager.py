@@ -0,0 +1,84 @@
+"""Offline tests for the fake Cluster Manager service."""
+
+import time
+from collections.abc import Generator
+
+import pytest
+from google.api_core import exceptions
+from google.cloud import container_v1
+
+from .benchmarks import BenchmarkStore, PhaseStats, benchmarks_enabled, check_benchmark
+from .fake_cluster_manager import FakeClusterManager, fake_cluster_manager_client
+from .gke_standard_assertions import assert_default_release_channel
+from .tofu_documents import plan_document
+
+PROJECT_ID = "fake"
+LOCATION = "us-west1"
+CALLS = 1000
+THROUGHPUT_ROUNDS = 3
+# Sequential calls from one client reach about 1000 per second; the floor leaves headroom for a busy benchmark host.
+MIN_CALLS_PER_SECOND = 500
+
+
+@pytest.fixture(scope="module")
+def fake() -> FakeClusterManager:
+    """Return a fake seeded with a cluster translated from a plan, with two node pools."""
+    manager = FakeClusterManager()
+    manager.add_from_json(plan_document(node_pool_count=2), project_id=PROJECT_ID, location=LOCATION)
+    return manager
+
+
+@pytest.fixture(scope="module")
+def client(fake: FakeClusterManager) -> Generator[container_v1.ClusterManagerClient, None, None]:
+    """Yield a Cluster Manager client that calls the fake."""
+    with fake.serve() as endpoint:
+        yield fake_cluster_manager_client(endpoint)
+
+
+def test_get_cluster(client: container_v1.ClusterManagerClient) -> None:
+    """Verify a stored cluster can be verified with the assertions used for a live cluster."""
+    name = f"projects/{PROJECT_ID}/locations/{LOCATION}/clusters/test"
+    cluster = client.get_cluster(request=container_v1.GetClusterRequest(name=name))
+    assert cluster.name == "test"
+    assert cluster.status == container_v1.Cluster.Status.RUNNING
+    assert cluster.self_link == f"https://container.googleapis.com/v1/{name}"
+    assert_default_release_channel(cluster.release_channel)
+    with pytest.raises(exceptions.NotFound):
+        client.get_cluster(request=container_v1.GetClusterRequest(name=f"{name}-missing"))
+
+
+def test_node_pools(client: container_v1.ClusterManagerClient) -> None:
+    """Verify node pools of a stored cluster can be listed and fetched by name."""
+    parent = f"projects/{PROJECT_ID}/locations/{LOCATION}/clusters/test"
+    node_pools = client.list_node_pools(request=container_v1.ListNodePoolsRequest(parent=parent)).node_pools
+    assert [node_pool.name for node_pool in node_pools] == ["pool0-", "pool1-"]
+    node_pool = client.get_node_pool(request=container_v1.GetNodePoolRequest(name=f"{parent}/nodePools/pool1-"))
+    assert node_pool.name == "pool1-"
+    assert node_pool.status == container_v1.NodePool.Status.RUNNING
+    clusters = client.list_clusters(parent=f"projects/{PROJECT_ID}/locations/-").clusters
+    assert [cluster.name for cluster in clusters] == ["test"]
+
+
+@pytest.mark.skipif(not benchmarks_enabled(), reason="throughput is only benchmarked when TEST_BENCHMARKS is set")
+@pytest.mark.parametrize("rpc", ["get_cluster", "list_node_pools"])
+def test_throughput(fake: FakeClusterManager, client: container_v1.ClusterManagerClient, rpc: str) -> None:
+    """Benchmark the fake serving one RPC, so it does not silently become the bottleneck of a load test.
+
+    The slowest round must reach MIN_CALLS_PER_SECOND, and the rounds are compared against the stored baseline.
+    """
+    name = f"projects/{PROJECT_ID}/locations/{LOCATION}/clusters/test"
+    call = {
+        "get_cluster": lambda: client.get_cluster(request=container_v1.GetClusterRequest(name=name)),
+        "list_node_pools": lambda: client.list_node_pools(request=container_v1.ListNodePoolsRequest(parent=name)),
+    }[rpc]
+    before = fake.calls.get(name, 0)
+    stats = PhaseStats(benchmark="fake-cluster-manager", phase=rpc)
+    for _ in range(THROUGHPUT_ROUNDS):
+        start = time.perf_counter()
+        for _ in range(CALLS):
+            call()
+        stats.rounds.append(time.perf_counter() - start)
+    assert fake.calls[name] - before == CALLS * THROUGHPUT_ROUNDS
+    assert CALLS / stats.maximum > MIN_CALLS_PER_SECOND, f"{rpc}: {CALLS / stats.maximum:.0f} calls per second"
+    regressions = check_benchmark([stats], store=BenchmarkStore())
+    assert not regressions, "; ".join(str(regression) for regression in regressions)
@@ -0,0 +1,144 @@
+"""Offline tests of the fake tofu executable, and of the harness driving it through every fixture."""
+
+import json
+import os
+import pathlib
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from typing import Any
+
+import pytest
+
+from . import tofu_harness
+from .fake_tofu import FAKE_TOFU, PLAN_HAS_CHANGES, REPO_ROOT, copy_fixture, read_calls
+from .tofu_resource_timings import parse_ui_messages
+
+FIXTURES = sorted(path.name for path in REPO_ROOT.joinpath("tests/fixtures").iterdir() if path.is_dir())
+PARALLEL_WORKSPACES = 16
+
+
+def tofu(fixture: pathlib.Path, *args: str, **env: str) -> subprocess.CompletedProcess[str]:
+    """Run the fake tofu executable in the fixture directory, returning the completed process."""
+    return subprocess.run(  # noqa: PLW1510
+        [str(FAKE_TOFU), f"-chdir={fixture}", *args],
+        capture_output=True,
+        text=True,
+        env=os.environ | env,
+    )
+
+
+def test_commands(fake_tofu: pathlib.Path, tmp_path: pathlib.Path) -> None:
+    """Verify the workspace, plan, apply, output and destroy commands behave as tofu does for the local backend."""
+    assert fake_tofu.exists()
+    fixture = copy_fixture(REPO_ROOT / "tests/fixtures/sa", tmp_path / "repo")
+    var_file = tmp_path / "tfvars.json"
+    var_file.write_text(json.dumps({"project_id": "test-project", "name": "test"}), encoding="utf-8")
+    assert "run tofu init" in tofu(fixture, "apply", "-auto-approve", f"-var-file={var_file}").stderr
+    assert tofu(fixture, "init", "-no-color").returncode == 0
+    assert "doesn't exist" in tofu(fixture, "workspace", "select", "test").stderr
+    assert tofu(fixture, "workspace", "select", "-or-create", "test").returncode == 0
+    assert tofu(fixture, "workspace", "show").stdout == "test\n"
+    assert tofu(fixture, "plan", "-detailed-exitcode", f"-var-file={var_file}").returncode == PLAN_HAS_CHANGES
+    applied = tofu(fixture, "apply", "-json", "-auto-approve", f"-var-file={var_file}")
+    assert applied.returncode == 0
+    assert [timing.address for timing in parse_ui_messages(applied.stdout.encode())] == ["module.test"]
+    assert tofu(fixture, "plan", "-detailed-exitcode", f"-var-file={var_file}").returncode == 0
+    outputs = json.loads(tofu(fixture, "output", "-json").stdout)
+    assert {name: output["value"] for name, output in outputs.items()} == {
+        "id": "projects/test-project/locations/fake/test",
+        "email": "test@test-project.iam.gserviceaccount.com",
+        "member": "serviceAccount:test@test-project.iam.gserviceaccount.com",
+    }
+    assert fixture.joinpath("terraform.tfstate.d/test/terraform.tfstate").exists()
+    assert json.loads(tofu(fixture, "output", "-json", TF_WORKSPACE="other").stdout) == {}
+    assert "overridden" in tofu(fixture, "workspace", "select", "default", TF_WORKSPACE="other").stderr
+    assert tofu(fixture, "destroy", "-auto-approve", f"-var-file={var_file}").returncode == 0
+    assert not fixture.joinpath("terraform.tfstate.d/test/terraform.tfstate").exists()
+    assert tofu(fixture, "workspace", "list").stdout.splitlines() == ["  default", "* test"]
+    assert "not implemented" in tofu(fixture, "import", "a.b", "c").stderr
+    calls = read_calls(fixture)
+    assert [args[0] for args in calls[:3]] == ["apply", "init", "workspace"]
+    assert calls[-1] == ["import", "a.b", "c"]
+
+
+@pytest.mark.parametrize("fixture", FIXTURES)
+def test_harness_lifecycle(fake_tofu: pathlib.Path, tmp_path: pathlib.Path, fixture: str) -> None:
+    """Verify the harness applies, outputs and destroys every fixture, with outputs synthesised from outputs.tf."""
+    assert fake_tofu.exists()
+    copied = copy_fixture(REPO_ROOT.joinpath("tests/fixtures", fixture), tmp_path / "repo")
+    tfvars = {"project_id": "test-project", "name": f"test-{fixture}"}
+    with tofu_harness.run_tofu_in_workspace(fixture=copied, workspace="test", tfvars=tfvars) as output:
+        assert output
+        assert copied.joinpath("terraform.tfstate.d/test/terraform.tfstate").exists()
+    assert not copied.joinpath("terraform.tfstate.d/test/terraform.tfstate").exists()
+    assert tofu(copied, "workspace", "show").stdout == "default\n"
+    if fixture == "vpc":
+        assert output["subnet"]["pods_range_name"] == "pods"
+        assert output["bastion_ip_address"] == "192.0.2.1"
+    if fixture == "root":
+        assert output["name"] == "test-root-name"
+        assert output["endpoint_url"] == "https://192.0.2.1"
+
+
+def test_configured_failures_and_latency(
+    fake_tofu: pathlib.Path,
+    tmp_path: pathlib.Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Verify failures can be injected per command and fixture, and apply latency is spread over the resources."""
+    assert fake_tofu.exists()
+    fixture = copy_fixture(REPO_ROOT / "tests/fixtures/vpc", tmp_path / "repo")
+    monkeypatch.setenv("TEST_FAKE_TOFU_FAIL", "apply@root,destroy@vpc")
+    monkeypatch.setenv("TEST_FAKE_TOFU_LATENCY", "apply=0.3,*=0")
+    with (
+        pytest.raises(subprocess.CalledProcessError) as excinfo,
+        tofu_harness.run_tofu_in_workspace(fixture=fixture, workspace="test", tfvars={"name": "test"}),
+    ):
+        pass
+    assert excinfo.value.cmd[2] == "destroy"
+    assert b"destroy failed, as requested by TEST_FAKE_TOFU_FAIL" in excinfo.value.stderr
+    monkeypatch.setenv("TEST_FAKE_TOFU_FAIL", "")
+    applied = tofu(fixture, "apply", "-json", "-auto-approve", TF_DATA_DIR=str(tofu_harness.data_dir(fixture)))
+    timings = parse_ui_messages(applied.stdout.encode())
+    assert len(timings) == 4  # noqa: PLR2004
+    assert all(timing.elapsed_seconds >= 0.3 / 4 for timing in timings)
+
+
+def test_parallel_workspaces(fake_tofu: pathlib.Path, tmp_path: pathlib.Path) -> None:
+    """Verify many workspaces of one fixture can be driven at the same time without clobbering each other."""
+    assert fake_tofu.exists()
+    fixture = copy_fixture(REPO_ROOT / "tests/fixtures/sa", tmp_path / "repo")
+
+    def lifecycle(n: int) -> dict[str, Any]:
+        tfvars = {"project_id": "test-project", "name": f"test-{n}"}
+        with tofu_harness.run_tofu_in_workspace(fixture=fixture, workspace=f"test-{n}", tfvars=tfvars) as output:
+            return output
+
+    with ThreadPoolExecutor(max_workers=PARALLEL_WORKSPACES) as executor:
+        outputs = list(executor.map(lifecycle, range(PARALLEL_WORKSPACES)))
+    assert [output["email"] for output in outputs] == [
+        f"test-{n}@test-project.iam.gserviceaccount.com" for n in range(PARALLEL_WORKSPACES)
+    ]
+    workspaces = tofu(fixture, "workspace", "list").stdout.split()
+    assert len(workspaces) == PARALLEL_WORKSPACES + 2
+
+
+def test_worker_isolation(fake_tofu: pathlib.Path, tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Verify pytest-xdist workers initialise their own data directory and never select a workspace of the fixture."""
+    assert fake_tofu.exists()
+    fixture = copy_fixture(REPO_ROOT / "tests/fixtures/sa", tmp_path / "repo")
+    workers = ["gw0", "gw1"]
+    with ExitStack() as stack:
+        emails = []
+        for worker in workers:
+            monkeypatch.setenv("PYTEST_XDIST_WORKER", worker)
+            tfvars = {"project_id": "test-project", "name": worker}
+            lifecycle = tofu_harness.run_tofu_in_workspace(fixture=fixture, workspace=worker, tfvars=tfvars)
+            emails.append(stack.enter_context(lifecycle)["email"])
+        assert emails == [f"{worker}@test-project.iam.gserviceaccount.com" for worker in workers]
+        for worker in workers:
+            assert fixture.joinpath(".terraform/workers", worker, "providers").is_dir()
+            assert fixture.joinpath("terraform.tfstate.d", worker, "terraform.tfstate").exists()
+    assert not list(fixture.joinpath(".terraform").rglob("environment"))
+    assert tofu(fixture, "workspace", "list").stdout.splitlines() == ["* default", "  gw0", "  gw1"]
@@ -0,0 +1,166 @@
+"""Offline tests for the IAM policy index and verifier."""
+
+import threading
+from typing import TYPE_CHECKING, Any, cast
+
+import pytest
+from google.iam.v1 import policy_pb2
+from google.type import expr_pb2
+
+from .iam_policy import IamVerifier, PolicyIndex, RoleExpectation, assert_member_roles
+
+if TYPE_CHECKING:
+    from google.cloud import artifactregistry_v1, iam_admin_v1, resourcemanager_v3
+
+SA_MEMBER = "serviceAccount:test@fake.iam.gserviceaccount.com"
+EXPECTED_ROLES = ["roles/container.defaultNodeServiceAccount", "roles/stackdriver.resourceMetadata.writer"]
+PROJECT = "projects/fake"
+REPOSITORY = "projects/fake/locations/us-west1/repositories/fake"
+
+
+def shared_project_policy(bindings: int = 2000) -> policy_pb2.Policy:
+    """Return a policy like that of a shared CI project, with the service account among thousands of bindings."""
+    policy = policy_pb2.Policy(
+        etag=b"etag",
+        bindings=[
+            policy_pb2.Binding(role=f"roles/custom.role{n}", members=[f"user:user{n}@example.com", f"group:g{n % 7}"])
+            for n in range(bindings)
+        ],
+    )
+    for role in EXPECTED_ROLES:
+        policy.bindings.append(policy_pb2.Binding(role=role, members=[SA_MEMBER, "user:owner@example.com"]))
+    return policy
+
+
+def test_policy_index() -> None:
+    """Verify membership lookups in both directions."""
+    index = PolicyIndex(shared_project_policy())
+    assert index.etag == b"etag"
+    assert index.has_role(SA_MEMBER, EXPECTED_ROLES[0])
+    assert not index.has_role(SA_MEMBER, "roles/custom.role1")
+    assert not index.has_role("user:missing@example.com", EXPECTED_ROLES[0])
+    assert index.roles(SA_MEMBER) == frozenset(EXPECTED_ROLES)
+    assert index.members(EXPECTED_ROLES[1]) == {SA_MEMBER, "user:owner@example.com"}
+    assert len(index.roles("group:g3")) == 286  # noqa: PLR2004
+    assert index.binding_count(EXPECTED_ROLES[0]) == 1
+    assert index.binding_count("roles/unbound") == 0
+
+
+def test_role_diff() -> None:
+    """Verify missing and unexpected roles are reported for a member."""
+    index = PolicyIndex(shared_project_policy(bindings=10))
+    assert index.diff(SA_MEMBER, EXPECTED_ROLES).ok
+    diff = index.diff(SA_MEMBER, [EXPECTED_ROLES[0], "roles/artifactregistry.reader"])
+    assert diff.missing == {"roles/artifactregistry.reader"}
+    assert diff.unexpected == {EXPECTED_ROLES[1]}
+    assert_member_roles(index, SA_MEMBER, EXPECTED_ROLES)
+    with pytest.raises(AssertionError, match=r"missing roles \['roles/artifactregistry.reader'\]"):
+        assert_member_roles(index, SA_MEMBER, [*EXPECTED_ROLES, "roles/artifactregistry.reader"])
+
+
+def test_conditional_bindings() -> None:
+    """Verify a role that is also bound under a condition is reported as having more than one binding."""
+    policy = shared_project_policy(bindings=10)
+    policy.bindings.append(
+        policy_pb2.Binding(
+            role=EXPECTED_ROLES[0],
+            members=[SA_MEMBER],
+            condition=expr_pb2.Expr(title="expiring", expression='request.time < timestamp("2030-01-01T00:00:00Z")'),
+        ),
+    )
+    index = PolicyIndex(policy)
+    assert index.binding_count(EXPECTED_ROLES[0]) == 2  # noqa: PLR2004
+    with pytest.raises(AssertionError, match="more than one binding"):
+        assert_member_roles(index, SA_MEMBER, EXPECTED_ROLES)
+
+
+class StandInPolicyClient:
+    """Return the policies of resources from get_iam_policy, counting the calls and the most made concurrently."""
+
+    def __init__(self, policies: dict[str, policy_pb2.Policy], delay: float = 0.0) -> None:
+        """Serve policies, blocking each call for delay seconds."""
+        self.policies = policies
+        self.delay = delay
+        self.calls: list[str] = []
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+    def get_iam_policy(self, resource: str | None = None, request: dict[str, Any] | None = None) -> policy_pb2.Policy:
+        """Return the policy of the resource named by either calling convention of the Google Cloud clients."""
+        name = resource or cast("dict[str, str]", request)["resource"]
+        with self.lock:
+            self.calls.append(name)
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        threading.Event().wait(self.delay)
+        with self.lock:
+            self.active -= 1
+        return self.policies[name]
+
+
+def stand_in_verifier(projects: StandInPolicyClient, repositories: StandInPolicyClient) -> IamVerifier:
+    """Return a verifier that fetches policies from the stand-in clients."""
+    return IamVerifier(
+        projects_client=cast("resourcemanager_v3.ProjectsClient", projects),
+        gar_client=cast("artifactregistry_v1.ArtifactRegistryClient", repositories),
+        iam_client=cast("iam_admin_v1.IAMClient", None),
+    )
+
+
+def fleet_policies(accounts: int) -> tuple[StandInPolicyClient, StandInPolicyClient, list[RoleExpectation]]:
+    """Return stand-in clients for a project and one repository per node service account, with the expected roles."""
+    project = shared_project_policy(bindings=100)
+    repositories: dict[str, policy_pb2.Policy] = {}
+    expectations: list[RoleExpectation] = []
+    for n in range(accounts):
+        member = f"serviceAccount:node{n}@fake.iam.gserviceaccount.com"
+        repository = f"{REPOSITORY}{n}"
+        for binding in project.bindings:
+            if binding.role in EXPECTED_ROLES:
+                binding.members.append(member)
+                expectations.append(RoleExpectation(member=member, resource=PROJECT, role=binding.role))
+        repositories[repository] = policy_pb2.Policy(
+            bindings=[policy_pb2.Binding(role="roles/artifactregistry.reader", members=[member])],
+        )
+        expectations.append(RoleExpectation(member=member, resource=repository, role="roles/artifactregistry.reader"))
+    return StandInPolicyClient({PROJECT: project}), StandInPolicyClient(repositories, delay=0.05), expectations
+
+
+def test_verify_fleet() -> None:
+    """Verify every expectation of a fleet is checked with one fetch per resource, made concurrently."""
+    projects, repositories, expectations = fleet_policies(accounts=20)
+    verifier = stand_in_verifier(projects, repositories)
+    checks = verifier.assert_granted(expectations)
+    assert len(checks) == len(expectations)
+    assert all(check.granted for check in checks)
+    assert projects.calls == [PROJECT]
+    assert sorted(repositories.calls) == sorted({e.resource for e in expectations} - {PROJECT})
+    assert repositories.max_active > 1
+    assert verifier.fetches == 21  # noqa: PLR2004
+    verifier.assert_granted(expectations)
+    verifier.assert_member_roles(PROJECT, SA_MEMBER, EXPECTED_ROLES)
+    assert verifier.fetches == 21  # noqa: PLR2004
+    assert verifier.hits == 21 + 1
+
+
+def test_verify_refetches_stale_policy() -> None:
+    """Verify a cached policy that does not grant an expected role is fetched once more before failing."""
+    projects = StandInPolicyClient({PROJECT: policy_pb2.Policy()})
+    verifier = stand_in_verifier(projects, StandInPolicyClient({}))
+    assert not verifier.policy(PROJECT).has_role(SA_MEMBER, EXPECTED_ROLES[0])
+    projects.policies[PROJECT] = shared_project_policy(bindings=10)
+    verifier.assert_granted([RoleExpectation(member=SA_MEMBER, resource=PROJECT, role=EXPECTED_ROLES[0])])
+    verifier.assert_member_roles(PROJECT, SA_MEMBER, EXPECTED_ROLES)
+    assert projects.calls == [PROJECT, PROJECT]
+    missing = RoleExpectation(member=SA_MEMBER, resource=PROJECT, role="roles/owner")
+    with pytest.raises(AssertionError, match="lacks roles/owner on projects/fake"):
+        verifier.assert_granted([missing])
+    with pytest.raises(AssertionError, match=r"missing roles \['roles/owner'\]"):
+        verifier.assert_member_roles(PROJECT, SA_MEMBER, [*EXPECTED_ROLES, "roles/owner"])
+    assert len(projects.calls) == 4  # noqa: PLR2004
+    verifier.invalidate(PROJECT)
+    verifier.policy(PROJECT)
+    assert len(projects.calls) == 5  # noqa: PLR2004
+    with pytest.raises(ValueError, match="unsupported IAM resource: organizations/1"):
+        verifier.policy("organizations/1")
@@ -3,19 +3,22 @@
 NOTE: The cluster is deployed with public and private endpoints so many variations of the module can be tested.
 """
 
+import base64
 import pathlib
-import re
-import subprocess
 import tempfile
-from collections.abc import Callable, Generator
+from collections.abc import Callable, Generator, Mapping
 from contextlib import _GeneratorContextManager, contextmanager
 from typing import Any, cast
 
 import kubernetes.client
 import pytest
+import urllib3
 
-from .conftest import kubernetes_api_client, run_tofu_in_workspace
+from .conftest import kubernetes_api_client, release_kubernetes_clients
+from .kubeconfig_combinations import LIVE_DIMENSIONS, LIVE_SEEDS, KubeconfigInputs, covering_array
+from .kubeconfig_verifier import assert_kubeconfig
 from .kubernetes_assertions import watcher
+from .tofu_harness import FixtureRegistry, FixtureSpec, provision_fixtures, run_tofu_in_workspace
 
 FIXTURE_NAME = "kubeconfig"
 FIXTURE_LABELS = {
@@ -36,70 +39,37 @@ def fixture_labels(labels: dict[str, str]) -> dict[str, str]:
 
 
 @pytest.fixture(scope="module")
-def sa_fixture_output(
+def fixture_outputs(
     sa_fixture_dir: pathlib.Path,
-    project_id: str,
-    fixture_name: str,
-) -> Generator[dict[str, Any], None, None]:
-    """Create a service account for the test case."""
-    with run_tofu_in_workspace(
-        fixture=sa_fixture_dir,
-        workspace=FIXTURE_NAME,
-        tfvars={
-            "project_id": project_id,
-            "name": fixture_name,
-        },
-    ) as output:
-        yield output
-
-
-@pytest.fixture(scope="module")
-def vpc_fixture_output(
     vpc_fixture_dir: pathlib.Path,
-    project_id: str,
-    fixture_name: str,
-    region: str,
-    fixture_labels: dict[str, str],
-) -> Generator[dict[str, Any], None, None]:
-    """Create a VPC and bastion for the test case."""
-    with run_tofu_in_workspace(
-        fixture=vpc_fixture_dir,
-        workspace=FIXTURE_NAME,
-        tfvars={
-            "project_id": project_id,
-            "name": fixture_name,
-            "region": region,
-            "labels": fixture_labels,
-        },
-    ) as output:
-        yield output
-
-
-@pytest.fixture(scope="module")
-def autopilot_fixture_output(
     autopilot_fixture_dir: pathlib.Path,
     project_id: str,
     fixture_name: str,
     fixture_labels: dict[str, str],
-    sa_fixture_output: dict[str, Any],
-    vpc_fixture_output: dict[str, Any],
-) -> Generator[dict[str, Any], None, None]:
-    """Create GKE Autopilot cluster for test case."""
-    service_account = cast("str", sa_fixture_output["email"])
-    assert service_account
-    subnet = cast("dict[str, str]", vpc_fixture_output["subnet"])
-    assert subnet
-    subnet = subnet | {
-        "master_cidr": "192.168.0.0/28",
-    }
-    my_address = vpc_fixture_output["my_address"]
-    assert my_address
-    bastion_ip_address = vpc_fixture_output["bastion_ip_address"]
-    assert bastion_ip_address
-    with run_tofu_in_workspace(
-        fixture=autopilot_fixture_dir,
-        workspace=FIXTURE_NAME,
-        tfvars={
+    fixture_registry: FixtureRegistry,
+    shared_sa_tfvars: dict[str, Any],
+    shared_vpc_tfvars: dict[str, Any],
+) -> Generator[dict[str, dict[str, Any]], None, None]:
+    """Create a service account, VPC and bastion, and GKE Autopilot cluster for the test case.
+
+    NOTE: The service account and VPC are shared with other test modules, and the cluster uses a master CIDR that is
+    unique within the shared VPC. The service account and VPC do not depend on each other and are created at the same
+    time.
+    """
+
+    def cluster_tfvars(outputs: Mapping[str, dict[str, Any]]) -> dict[str, Any]:
+        service_account = cast("str", outputs["sa"]["email"])
+        assert service_account
+        subnet = cast("dict[str, str]", outputs["vpc"]["subnet"])
+        assert subnet
+        subnet = subnet | {
+            "master_cidr": "192.168.0.64/28",
+        }
+        my_address = outputs["vpc"]["my_address"]
+        assert my_address
+        bastion_ip_address = outputs["vpc"]["bastion_ip_address"]
+        assert bastion_ip_address
+        return {
             "project_id": project_id,
             "name": fixture_name,
             "service_account": service_account,
@@ -123,9 +93,56 @@ def autopilot_fixture_output(
                 "default_snat": True,
                 "deletion_protection": False,
             },
-        },
-    ) as output:
-        yield output
+        }
+
+    with provision_fixtures(
+        specs=[
+            FixtureSpec(
+                name="sa",
+                fixture=sa_fixture_dir,
+                workspace=None,
+                tfvars=shared_sa_tfvars,
+                shared=True,
+            ),
+            FixtureSpec(
+                name="vpc",
+                fixture=vpc_fixture_dir,
+                workspace=None,
+                tfvars=shared_vpc_tfvars,
+                shared=True,
+            ),
+            FixtureSpec(
+                name="cluster",
+                fixture=autopilot_fixture_dir,
+                workspace=FIXTURE_NAME,
+                tfvars=cluster_tfvars,
+                depends_on=("sa", "vpc"),
+            ),
+        ],
+        registry=fixture_registry,
+    ) as outputs:
+        try:
+            yield outputs
+        finally:
+            release_kubernetes_clients(outputs["cluster"])
+
+
+@pytest.fixture(scope="module")
+def sa_fixture_output(fixture_outputs: dict[str, dict[str, Any]]) -> dict[str, Any]:
+    """Return the output of the service account fixture for the test case."""
+    return fixture_outputs["sa"]
+
+
+@pytest.fixture(scope="module")
+def vpc_fixture_output(fixture_outputs: dict[str, dict[str, Any]]) -> dict[str, Any]:
+    """Return the output of the VPC and bastion fixture for the test case."""
+    return fixture_outputs["vpc"]
+
+
+@pytest.fixture(scope="module")
+def autopilot_fixture_output(fixture_outputs: dict[str, dict[str, Any]]) -> dict[str, Any]:
+    """Return the output of the GKE Autopilot cluster fixture for the test case."""
+    return fixture_outputs["cluster"]
 
 
 @pytest.fixture(scope="module")
@@ -159,65 +176,6 @@ def kubeconfig_builder(
     return _builder
 
 
-def exec_kubectl(kubeconfig: pathlib.Path, cluster_arg: str | None = None, context_arg: str | None = None) -> None:
-    """Run the kubectl commands to verify connectivity to cluster.
-
-    Verify the kube-system namespace exists, then look for any cluster services in it.
-    """
-    watch_namespace_args = [
-        "kubectl",
-        "--kubeconfig",
-        f"{kubeconfig!s}",
-        "--request-timeout",
-        "10s",
-    ]
-    if cluster_arg:
-        watch_namespace_args.extend(
-            [
-                "--cluster",
-                cluster_arg,
-            ],
-        )
-    if context_arg:
-        watch_namespace_args.extend(
-            [
-                "--context",
-                context_arg,
-            ],
-        )
-    watch_services_args = watch_namespace_args[:]
-    watch_namespace_args.extend(
-        [
-            "wait",
-            "--for",
-            "jsonpath={.status.phase}=Active",
-            "namespace",
-            "kube-system",
-        ],
-    )
-    watch_services_args.extend(
-        [
-            "wait",
-            "--for",
-            "jsonpath={.status.loadBalancer}",
-            "services",
-            "--namespace",
-            "kube-system",
-            "--selector",
-            "kubernetes.io/cluster-service=true",
-        ],
-    )
-    process = subprocess.run(watch_namespace_args, check=True, capture_output=True)
-    assert re.search(pattern=r"^namespace/kube-system condition met", string=process.stdout.decode("utf-8"))
-    process = subprocess.run(watch_services_args, check=True, capture_output=True)
-    matches = re.search(
-        pattern=r"^service/.*condition met",
-        string=process.stdout.decode("utf-8"),
-        flags=re.MULTILINE,
-    )
-    assert matches
-
-
 def test_minimal(
     kubeconfig_builder: Callable[[str, dict[str, Any]], _GeneratorContextManager[pathlib.Path, None, None]],
     autopilot_fixture_output: dict[str, Any],
@@ -231,9 +189,9 @@ def test_minimal(
     }
     with (
         kubeconfig_builder(workspace, tfvars) as kubeconfig,
-        pytest.raises(subprocess.CalledProcessError),
+        pytest.raises(urllib3.exceptions.HTTPError),
     ):
-        exec_kubectl(kubeconfig=kubeconfig)
+        assert_kubeconfig(kubeconfig=kubeconfig)
 
 
 def test_minimal_with_proxy_url(
@@ -252,7 +210,7 @@ def test_minimal_with_proxy_url(
         "proxy_url": f"http://{bastion_public_ip_address}:8888",
     }
     with kubeconfig_builder(workspace, tfvars) as kubeconfig:
-        exec_kubectl(kubeconfig=kubeconfig)
+        assert_kubeconfig(kubeconfig=kubeconfig)
 
 
 def test_public_endpoint(
@@ -268,7 +226,7 @@ def test_public_endpoint(
         "use_private_endpoint": False,
     }
     with kubeconfig_builder(workspace, tfvars) as kubeconfig:
-        exec_kubectl(kubeconfig=kubeconfig)
+        assert_kubeconfig(kubeconfig=kubeconfig)
 
 
 def test_public_with_cluster_name(
@@ -285,7 +243,7 @@ def test_public_with_cluster_name(
         "cluster_name": "test-cluster",
     }
     with kubeconfig_builder(workspace, tfvars) as kubeconfig:
-        exec_kubectl(kubeconfig=kubeconfig, cluster_arg="test-cluster")
+        assert_kubeconfig(kubeconfig=kubeconfig, cluster="test-cluster")
 
 
 def test_public_with_context_name(
@@ -302,7 +260,7 @@ def test_public_with_context_name(
         "context_name": "test-context",
     }
     with kubeconfig_builder(workspace, tfvars) as kubeconfig:
-        exec_kubectl(kubeconfig=kubeconfig, context_arg="test-context")
+        assert_kubeconfig(kubeconfig=kubeconfig, context="test-context")
 
 
 @contextmanager
@@ -458,47 +416,86 @@ def cluster_role_binding(
         )
 
 
-def test_sa_access(
-    kubeconfig_builder: Callable[[str, dict[str, Any]], _GeneratorContextManager[pathlib.Path, None, None]],
-    autopilot_fixture_output: dict[str, Any],
-    fixture_name: str,
-) -> None:
-    """Create a token-based authentication Kubeconfig for a service account in the cluster, verify it.
+def cluster_token_name(fixture_name: str) -> str:
+    """Return the name of the service account, and its secret and role, that the cluster token belongs to."""
+    return f"{fixture_name}-token"
 
-    This is a common scenario when using F5XC Service Discovery, for example.
-    """
-    cluster_id = autopilot_fixture_output["id"]
-    assert cluster_id
+
+@pytest.fixture(scope="module")
+def cluster_token(autopilot_fixture_output: dict[str, Any], fixture_name: str) -> Generator[str, None, None]:
+    """Yield the token of a service account in the cluster that can list namespaces and services, deleted after use."""
     endpoint_url = autopilot_fixture_output["public_endpoint_url"]
     assert endpoint_url
     ca_cert = autopilot_fixture_output["ca_cert"]
     assert ca_cert
-    name = f"{fixture_name}-sa"
+    name = cluster_token_name(fixture_name)
     with (
         kubernetes_api_client(host=endpoint_url, ca=ca_cert) as client,
         service_account(api_client=client, name=name) as sa,
         service_account_token_secret(api_client=client, name=name, service_account=sa) as secret,
         cluster_role(api_client=client, name=name) as role,
-        cluster_role_binding(
-            api_client=client,
-            name=name,
-            cluster_role=role,
-            service_account=sa,
-        ) as binding,
+        cluster_role_binding(api_client=client, name=name, cluster_role=role, service_account=sa),
     ):
-        assert binding
-        assert secret
         assert secret.data
         token = secret.data["token"]
         assert token
-        workspace = name
-        tfvars = {
-            "cluster_id": cluster_id,
-            "use_private_endpoint": False,
-            "user": {
-                "name": sa.metadata.name,  # pyright: ignore[reportOptionalMemberAccess]
-                "token": token,
-            },
-        }
-        with kubeconfig_builder(workspace, tfvars) as kubeconfig:
-            exec_kubectl(kubeconfig=kubeconfig)
+        yield base64.b64decode(token).decode("utf-8")
+
+
+def test_sa_access(
+    kubeconfig_builder: Callable[[str, dict[str, Any]], _GeneratorContextManager[pathlib.Path, None, None]],
+    autopilot_fixture_output: dict[str, Any],
+    fixture_name: str,
+    cluster_token: str,
+) -> None:
+    """Create a token-based authentication Kubeconfig for a service account in the cluster, verify it.
+
+    This is a common scenario when using F5XC Service Discovery, for example.
+    """
+    cluster_id = autopilot_fixture_output["id"]
+    assert cluster_id
+    workspace = f"{fixture_name}-sa"
+    tfvars = {
+        "cluster_id": cluster_id,
+        "use_private_endpoint": False,
+        "user": {
+            "name": cluster_token_name(fixture_name),
+            "token": cluster_token,
+        },
+    }
+    with kubeconfig_builder(workspace, tfvars) as kubeconfig:
+        assert_kubeconfig(kubeconfig=kubeconfig)
+
+
+@pytest.mark.parametrize(
+    "inputs",
+    covering_array(seeds=LIVE_SEEDS, dimensions=LIVE_DIMENSIONS)[len(LIVE_SEEDS) :],
+    ids=lambda inputs: inputs.id,
+)
+def test_covering_array(
+    kubeconfig_builder: Callable[[str, dict[str, Any]], _GeneratorContextManager[pathlib.Path, None, None]],
+    autopilot_fixture_output: dict[str, Any],
+    vpc_fixture_output: dict[str, Any],
+    cluster_token: str,
+    inputs: KubeconfigInputs,
+) -> None:
+    """Create a Kubeconfig for a combination of inputs that completes pairwise coverage of the hand-picked tests above.
+
+    Verify that it can connect to API if the endpoint is reachable, and that it cannot otherwise. Token users
+    authenticate as a service account of the cluster, so no Google credential is written to tofu state or cassettes.
+    """
+    cluster_id = autopilot_fixture_output["id"]
+    assert cluster_id
+    bastion_public_ip_address = vpc_fixture_output["bastion_public_ip_address"]
+    assert bastion_public_ip_address
+    workspace = f"{FIXTURE_NAME}-{inputs.id}"
+    tfvars = {
+        "cluster_id": cluster_id,
+        **inputs.module_inputs(bastion=bastion_public_ip_address, token=cluster_token),
+    }
+    with kubeconfig_builder(workspace, tfvars) as kubeconfig:
+        if inputs.reachable:
+            assert_kubeconfig(kubeconfig=kubeconfig, cluster=inputs.cluster_name, context=inputs.context_name)
+        else:
+            with pytest.raises(urllib3.exceptions.HTTPError):
+                assert_kubeconfig(kubeconfig=kubeconfig)
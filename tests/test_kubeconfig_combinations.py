@@ -0,0 +1,61 @@
+"""Offline tests for the kubeconfig input combinations and their covering arrays."""
+
+import itertools
+from dataclasses import asdict
+
+import pytest
+
+from .kubeconfig_combinations import (
+    DIMENSIONS,
+    LIVE_DIMENSIONS,
+    LIVE_SEEDS,
+    TOKEN_USER,
+    TOKEN_USER_NAME,
+    KubeconfigInputs,
+    all_inputs,
+    covering_array,
+    render_all,
+)
+from .kubeconfig_template import OFFLINE_CLUSTER
+from .kubeconfig_verifier import select
+
+
+def test_render_all_inputs() -> None:
+    """Verify every combination of inputs renders a valid kubeconfig that reflects it."""
+    combinations = all_inputs()
+    assert len(combinations) == len(set(combinations)) == 48  # noqa: PLR2004
+    assert len({inputs.id for inputs in combinations}) == len(combinations)
+    for inputs, config in render_all(combinations, cluster=OFFLINE_CLUSTER, bastion="192.0.2.1", token="sa-token"):
+        _, selection = select(config, token=lambda: "adc-token")
+        assert selection.cluster == (inputs.cluster_name or OFFLINE_CLUSTER.name)
+        assert selection.context == (inputs.context_name or OFFLINE_CLUSTER.name)
+        assert selection.server.endswith("10.0.0.2" if inputs.use_private_endpoint else "203.0.113.10")
+        assert selection.proxy_url == ("http://192.0.2.1:8888" if inputs.proxy_url else None)
+        assert selection.user == (TOKEN_USER_NAME if inputs.user == TOKEN_USER else OFFLINE_CLUSTER.name)
+        assert inputs.reachable == (not inputs.use_private_endpoint or selection.proxy_url is not None)
+
+
+@pytest.mark.parametrize("strength", [1, 2, 3])
+def test_covering_array(strength: int) -> None:
+    """Verify a covering array starts with its seeds and covers every interaction of strength values."""
+    chosen = covering_array(seeds=LIVE_SEEDS, strength=strength)
+    assert chosen[: len(LIVE_SEEDS)] == LIVE_SEEDS
+    assert chosen == covering_array(seeds=LIVE_SEEDS, strength=strength)
+    covered = {
+        interaction
+        for inputs in chosen
+        for interaction in itertools.combinations(sorted(asdict(inputs).items()), strength)
+    }
+    for names in itertools.combinations(sorted(DIMENSIONS), strength):
+        for values in itertools.product(*(DIMENSIONS[name] for name in names)):
+            assert tuple(zip(names, values, strict=True)) in covered
+    assert len(covering_array(strength=len(DIMENSIONS))) == len(all_inputs())
+
+
+def test_live_covering_array() -> None:
+    """Verify the live tier needs only a few combinations beyond the hand-picked ones to cover every pair of inputs."""
+    chosen = covering_array(seeds=LIVE_SEEDS, dimensions=LIVE_DIMENSIONS)
+    assert len(chosen) - len(LIVE_SEEDS) <= 3  # noqa: PLR2004
+    assert len(chosen) < len(all_inputs(LIVE_DIMENSIONS)) / 2
+    assert KubeconfigInputs() in chosen
+    assert {inputs.proxy_url for inputs in chosen} == set(LIVE_DIMENSIONS["proxy_url"])
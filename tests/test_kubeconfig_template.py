@@ -0,0 +1,110 @@
+"""Offline tests for the kubeconfig module template, rendered for every combination of module inputs."""
+
+import itertools
+from typing import Any
+
+import pytest
+import yaml
+
+from .kubeconfig_template import (
+    OFFLINE_CLUSTER,
+    evaluate,
+    kubeconfig_errors,
+    render_kubeconfig,
+    render_template,
+    validate_kubeconfig,
+)
+from .kubeconfig_verifier import GKE_AUTH_PLUGIN, select
+
+CLUSTER_NAMES = [None, "test-cluster"]
+CONTEXT_NAMES = [None, "test-context"]
+USE_PRIVATE_ENDPOINTS = [True, False]
+PROXY_URLS = [None, "", "http://192.0.2.1:8888"]
+USERS: list[dict[str, str] | None] = [None, {"name": "", "token": ""}, {"name": "sa", "token": "sa-token"}]
+
+
+def test_expressions() -> None:
+    """Verify template expressions are evaluated with tofu semantics."""
+    variables = {"empty": "", "missing": None, "value": "set"}
+    assert evaluate('coalesce(missing, empty, "fallback")', variables) == "fallback"
+    assert evaluate('coalesce(value, "fallback") != "fallback"', variables) is True
+    assert evaluate('!(value == "set") || missing == null && true', variables) is True
+    assert evaluate('"a \\"quoted\\" value"', variables) == 'a "quoted" value'
+    with pytest.raises(ValueError, match="no non-null"):
+        evaluate("coalesce(missing, empty)", variables)
+    with pytest.raises(ValueError, match="vars map does not contain key 'unknown'"):
+        evaluate("unknown", variables)
+    with pytest.raises(ValueError, match="unsupported function 'upper'"):
+        evaluate("upper(value)", variables)
+
+
+def test_template_directives() -> None:
+    """Verify interpolation, if directives, escapes and strip markers render as templatefile would."""
+    template = (
+        "a: ${value}\n%{ if flag ~}\n  b: $${literal}\n%{ else ~}\n  c: %%{literal}\n%{ endif ~}\nd: ${~ value}\n"
+    )
+    assert render_template(template, {"value": "x", "flag": True}) == "a: x\n  b: ${literal}\nd:x\n"
+    assert render_template(template, {"value": "x", "flag": False}) == "a: x\n  c: %{literal}\nd:x\n"
+    assert render_template("%{ if flag }  yes  %{ endif }", {"flag": True}) == "  yes  "
+    assert render_template("%{ if flag ~}  yes  %{~ endif }", {"flag": True}) == "yes"
+    with pytest.raises(ValueError, match="is null"):
+        render_template("${value}", {"value": None})
+    with pytest.raises(ValueError, match="without endif"):
+        render_template("%{ if true }", {})
+    with pytest.raises(ValueError, match="unsupported template directive"):
+        render_template("%{ for x in xs }${x}%{ endfor }", {"xs": []})
+
+
+@pytest.mark.parametrize(
+    ("cluster_name", "context_name", "use_private_endpoint", "proxy_url", "user"),
+    list(itertools.product(CLUSTER_NAMES, CONTEXT_NAMES, USE_PRIVATE_ENDPOINTS, PROXY_URLS, USERS)),
+)
+def test_render_kubeconfig(
+    cluster_name: str | None,
+    context_name: str | None,
+    use_private_endpoint: bool,  # noqa: FBT001
+    proxy_url: str | None,
+    user: dict[str, str] | None,
+) -> None:
+    """Verify the module template renders a valid kubeconfig that reflects every module input."""
+    config = validate_kubeconfig(
+        render_kubeconfig(
+            OFFLINE_CLUSTER,
+            cluster_name=cluster_name,
+            context_name=context_name,
+            use_private_endpoint=use_private_endpoint,
+            proxy_url=proxy_url,
+            user=user,
+        ),
+    )
+    _, selection = select(config, token=lambda: "adc-token")
+    assert selection.cluster == (cluster_name or OFFLINE_CLUSTER.name)
+    assert selection.context == (context_name or OFFLINE_CLUSTER.name)
+    assert selection.server == f"https://{'10.0.0.2' if use_private_endpoint else '203.0.113.10'}"
+    assert selection.proxy_url == (proxy_url or None)
+    assert selection.user == ((user or {}).get("name") or OFFLINE_CLUSTER.name)
+    credentials = config["users"][0]["user"]
+    if user and user["token"]:
+        assert credentials == {"token": user["token"]}
+    else:
+        assert credentials["exec"]["command"] == GKE_AUTH_PLUGIN
+
+
+def test_schema_errors() -> None:
+    """Verify every schema violation of a kubeconfig is reported."""
+    config: dict[str, Any] = yaml.safe_load(render_kubeconfig(OFFLINE_CLUSTER, proxy_url="http://192.0.2.1:8888"))
+    assert not kubeconfig_errors(config)
+    config["clusters"][0]["cluster"]["proxy-url"] = "ftp://proxy"
+    config["clusters"][0]["cluster"]["server"] = "http://10.0.0.2"
+    config["users"][0]["user"]["token"] = "both"
+    config["contexts"][0]["context"]["cluster"] = "other"
+    config["current-context"] = "missing"
+    assert kubeconfig_errors(config) == [
+        "cluster 'test' server must be a https URL, not 'http://10.0.0.2'",
+        "cluster 'test' proxy-url must be a http/https/socks5 URL, not 'ftp://proxy'",
+        "user 'test' must have exactly one of token or exec",
+        "context 'test' refers to unknown cluster 'other'",
+        "current-context 'missing' is not a context",
+    ]
+    with pytest.raises(ValueError, match="invalid kubeconfig: apiVersion must be v1; kind must be Config"):
+        validate_kubeconfig("clusters: []\n")
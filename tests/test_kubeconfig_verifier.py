@@ -0,0 +1,127 @@
+"""Offline tests for the in-process kubeconfig verifier, against a fake Kubernetes API."""
+
+import pathlib
+from collections.abc import Generator
+from typing import Any
+
+import kubernetes.config
+import pytest
+import urllib3
+import yaml
+
+from .fake_kubernetes_api import FakeKubernetesApi
+from .kubeconfig_verifier import GKE_AUTH_PLUGIN, assert_kubeconfig, select, verify_kubeconfig
+
+UNREACHABLE_SERVER = "http://127.0.0.1:9"
+
+
+def kubeconfig_document(server: str, user: dict[str, Any]) -> dict[str, Any]:
+    """Return a kubeconfig shaped like the module template, with an extra cluster and context for the fake server."""
+    return {
+        "apiVersion": "v1",
+        "kind": "Config",
+        "current-context": "private",
+        "preferences": {},
+        "clusters": [
+            {"name": "private", "cluster": {"server": UNREACHABLE_SERVER, "proxy-url": "http://192.0.2.1:8888"}},
+            {"name": "test-cluster", "cluster": {"server": server}},
+        ],
+        "contexts": [
+            {"name": "private", "context": {"cluster": "private", "user": "user"}},
+            {"name": "test-context", "context": {"cluster": "test-cluster", "user": "user"}},
+        ],
+        "users": [{"name": "user", "user": user}],
+    }
+
+
+@pytest.fixture(autouse=True)
+def live_cassettes(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Run against the fake whatever the cassette mode of the session, since the verifier skips when replaying."""
+    monkeypatch.delenv("TEST_CASSETTE_MODE", raising=False)
+
+
+@pytest.fixture
+def fake() -> FakeKubernetesApi:
+    """Return a fake Kubernetes API with an Active kube-system namespace and a cluster service."""
+    fake = FakeKubernetesApi()
+    fake.put("/api/v1/namespaces", {"metadata": {"name": "kube-system"}, "status": {"phase": "Active"}})
+    fake.put(
+        "/api/v1/namespaces/kube-system/services",
+        {
+            "metadata": {
+                "name": "kube-dns",
+                "namespace": "kube-system",
+                "labels": {"kubernetes.io/cluster-service": "true"},
+            },
+            "status": {"loadBalancer": {}},
+        },
+    )
+    return fake
+
+
+@pytest.fixture
+def server(fake: FakeKubernetesApi) -> Generator[str, None, None]:
+    """Yield the base URL of the fake."""
+    with fake.serve() as host:
+        yield host
+
+
+def write_kubeconfig(tmp_path: pathlib.Path, server: str, user: dict[str, Any]) -> pathlib.Path:
+    """Write a kubeconfig for the fake server and return its path."""
+    kubeconfig = tmp_path / "kubeconfig.yaml"
+    kubeconfig.write_text(yaml.safe_dump(kubeconfig_document(server=server, user=user)), encoding="utf-8")
+    return kubeconfig
+
+
+def test_select() -> None:
+    """Verify --cluster and --context selections, and replacement of the GKE auth plugin, match kubectl."""
+    document = kubeconfig_document(server="http://fake", user={"exec": {"command": GKE_AUTH_PLUGIN}})
+    config, selection = select(document, token=lambda: "adc-token")
+    assert (selection.context, selection.cluster, selection.server) == ("private", "private", UNREACHABLE_SERVER)
+    assert selection.proxy_url == "http://192.0.2.1:8888"
+    assert config["users"][0]["user"] == {"token": "adc-token"}
+    assert document["users"][0]["user"] == {"exec": {"command": GKE_AUTH_PLUGIN}}
+    _, selection = select(document, cluster="test-cluster", token=lambda: "adc-token")
+    assert (selection.context, selection.cluster, selection.server) == ("private", "test-cluster", "http://fake")
+    config, selection = select(document, context="test-context", token=lambda: "adc-token")
+    assert (selection.context, selection.cluster) == ("test-context", "test-cluster")
+    assert config["current-context"] == "test-context"
+    for kwargs in [{"cluster": "missing"}, {"context": "missing"}]:
+        with pytest.raises(kubernetes.config.ConfigException, match="'missing' not found"):
+            select(document, token=lambda: "adc-token", **kwargs)
+
+
+def test_verify_with_cluster_and_context(tmp_path: pathlib.Path, server: str) -> None:
+    """Verify a kubeconfig through the selected cluster or context, with structured results for each check."""
+    kubeconfig = write_kubeconfig(tmp_path, server=server, user={"token": "sa-token"})
+    verification = assert_kubeconfig(kubeconfig=kubeconfig, cluster="test-cluster", timeout_seconds=5)
+    assert [r.key for r in verification.readiness] == [(None, "kube-system"), ("kube-system", "kube-dns")]
+    verification = assert_kubeconfig(kubeconfig=kubeconfig, context="test-context", timeout_seconds=5)
+    assert verification.selection.context == "test-context"
+
+
+def test_verify_reports_failures(fake: FakeKubernetesApi, tmp_path: pathlib.Path, server: str) -> None:
+    """Verify checks that are not satisfied are reported, and an unreachable cluster raises the request error."""
+    fake.put("/api/v1/namespaces", {"metadata": {"name": "kube-system"}, "status": {"phase": "Terminating"}})
+    kubeconfig = write_kubeconfig(tmp_path, server=server, user={"exec": {"command": GKE_AUTH_PLUGIN}})
+    verification = verify_kubeconfig(
+        kubeconfig=kubeconfig,
+        context="test-context",
+        timeout_seconds=0.5,
+        token=lambda: "adc-token",
+    )
+    assert not verification.ok
+    assert verification.failures() == ["Namespace kube-system is Active"]
+    with pytest.raises(AssertionError, match="kubeconfig test-context not verified"):
+        assert_kubeconfig(kubeconfig=kubeconfig, context="test-context", timeout_seconds=0.5, token=lambda: "token")
+    unreachable = write_kubeconfig(tmp_path, server=UNREACHABLE_SERVER, user={"token": "sa-token"})
+    with pytest.raises(urllib3.exceptions.HTTPError):
+        verify_kubeconfig(kubeconfig=unreachable, context="test-context", timeout_seconds=5)
+
+
+def test_verify_skipped_when_replaying(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Verify the calling test is skipped, before any API request is made, when cassettes are replayed."""
+    monkeypatch.setenv("TEST_CASSETTE_MODE", "replay")
+    kubeconfig = write_kubeconfig(tmp_path, server=UNREACHABLE_SERVER, user={"token": "sa-token"})
+    with pytest.raises(pytest.skip.Exception, match="cannot be replayed from cassettes"):
+        verify_kubeconfig(kubeconfig=kubeconfig, context="test-context", timeout_seconds=5)
@@ -0,0 +1,201 @@
+"""Offline tests for the Kubernetes assertions, against a fake Kubernetes API."""
+
+import threading
+import time
+from collections.abc import Generator
+from typing import cast
+
+import kubernetes.client
+import pytest
+
+from .fake_kubernetes_api import FakeKubernetesApi
+from .kubernetes_assertions import (
+    Expectation,
+    Match,
+    ObjectIndex,
+    assert_all_ready,
+    assert_any_labelled_service_exists,
+    assert_namespace,
+    close_informers,
+    informer,
+    labelled_service_expectation,
+    match_metadata_name,
+    namespace_expectation,
+    parse_label_selector,
+    wait_all,
+    watcher,
+)
+
+NAMESPACES = "/api/v1/namespaces"
+SERVICES = "/api/v1/namespaces/kube-system/services"
+
+
+@pytest.fixture
+def fake() -> FakeKubernetesApi:
+    """Return a fake Kubernetes API with the kube-system namespace and a labelled service."""
+    fake = FakeKubernetesApi()
+    fake.put(NAMESPACES, {"metadata": {"name": "default"}})
+    fake.put(NAMESPACES, {"metadata": {"name": "kube-system"}})
+    fake.put(
+        SERVICES,
+        {
+            "metadata": {
+                "name": "kube-dns",
+                "namespace": "kube-system",
+                "labels": {"k8s-app": "kube-dns", "kubernetes.io/name": "KubeDNS"},
+            },
+        },
+    )
+    return fake
+
+
+@pytest.fixture
+def api_client(fake: FakeKubernetesApi) -> Generator[kubernetes.client.ApiClient, None, None]:
+    """Yield an API client for the fake, stopping its informers afterwards."""
+    with fake.serve() as host:
+        client = kubernetes.client.ApiClient(configuration=kubernetes.client.Configuration(host=host))
+        try:
+            yield client
+        finally:
+            close_informers(client)
+
+
+def list_requests(fake: FakeKubernetesApi, path: str) -> int:
+    """Return the number of list requests, rather than watch requests, made for path."""
+    return sum(1 for request_path, query in fake.requests if request_path == path and "watch" not in query)
+
+
+def service(name: str, labels: dict[str, str], cluster_ip: str | None = None) -> kubernetes.client.V1Service:
+    """Return a Service model in the kube-system namespace."""
+    return kubernetes.client.V1Service(
+        metadata=kubernetes.client.V1ObjectMeta(name=name, namespace="kube-system", labels=labels),
+        spec=kubernetes.client.V1ServiceSpec(
+            cluster_ip=cluster_ip,
+            ports=[kubernetes.client.V1ServicePort(port=53)],
+        ),
+    )
+
+
+def test_match() -> None:
+    """Verify every criterion of a Match must hold."""
+    dns = service("kube-dns", {"k8s-app": "kube-dns"}, cluster_ip="10.0.0.10")
+    assert Match()(dns)
+    assert Match(name="kube-dns", namespace="kube-system")(dns)
+    assert not Match(name="kube-dns", namespace="default")(dns)
+    assert Match.selector("k8s-app==kube-dns")(dns)
+    assert not Match.selector("k8s-app=metrics-server")(dns)
+    assert Match(field_path="spec.cluster_ip")(dns)
+    assert Match(field_path="spec.ports[0].port", field_value=53)(dns)
+    assert not Match(field_path="spec.ports[1].port")(dns)
+    assert not Match(field_path="spec.cluster_ip")(service("headless", {}))
+    assert parse_label_selector("app = dns, tier=backend") == {"app": "dns", "tier": "backend"}
+    for unsupported in ["app!=dns", "app in (dns)", "!app"]:
+        with pytest.raises(ValueError, match="unsupported label selector"):
+            parse_label_selector(unsupported)
+
+
+def test_object_index() -> None:
+    """Verify a Match is answered from the name and label indexes among hundreds of objects."""
+    index = ObjectIndex(service(f"svc-{n}", {"app": f"app-{n % 10}", "shard": str(n)}) for n in range(500))
+    assert len(index.candidates(Match.selector("app=app-3"))) == 50  # noqa: PLR2004
+    assert list(index.candidates(Match.selector("app=app-3,shard=13"))) == [("kube-system", "svc-13")]
+    assert [obj.metadata.name for obj in index.find(Match(name="svc-42"))] == ["svc-42"]  # pyright: ignore[reportAttributeAccessIssue]
+    index.put(service("svc-42", {"app": "moved"}))
+    assert not index.find(Match.selector("app=app-2,shard=42"))
+    assert len(index.find(Match.selector("app=moved"))) == 1
+    index.remove(("kube-system", "svc-42"))
+    assert not index.find(Match(name="svc-42"))
+    assert len(index.find(lambda obj: obj.metadata.name.endswith("7"))) == 50  # noqa: PLR2004  # pyright: ignore[reportAttributeAccessIssue]
+
+
+def test_assertions_share_one_list(fake: FakeKubernetesApi, api_client: kubernetes.client.ApiClient) -> None:
+    """Verify repeated assertions are served from one list call per resource kind and selector."""
+    for _ in range(5):
+        assert_namespace(client=api_client, namespace="kube-system", timeout_seconds=5)
+        assert_any_labelled_service_exists(
+            client=api_client,
+            namespace="kube-system",
+            label_selector="k8s-app=kube-dns",
+            timeout_seconds=5,
+        )
+        assert_any_labelled_service_exists(
+            client=api_client,
+            namespace="kube-system",
+            label_selector="kubernetes.io/name=KubeDNS",
+            timeout_seconds=5,
+        )
+    assert list_requests(fake, NAMESPACES) == 1
+    assert list_requests(fake, SERVICES) == 1
+
+
+def test_informer_follows_watch(fake: FakeKubernetesApi, api_client: kubernetes.client.ApiClient) -> None:
+    """Verify objects added or deleted after the initial list are seen through the watch."""
+    core_v1 = kubernetes.client.CoreV1Api(api_client=api_client)
+    assert not watcher(lister=core_v1.list_namespace, matcher=match_metadata_name("test"), timeout_seconds=0.2)
+    threading.Timer(0.2, fake.put, args=(NAMESPACES, {"metadata": {"name": "test"}})).start()
+    assert watcher(lister=core_v1.list_namespace, matcher=match_metadata_name("test"), timeout_seconds=5)
+    fake.delete(NAMESPACES, "default")
+    shared = informer(core_v1.list_namespace)
+    assert not shared.wait_for(match_metadata_name("test-missing"), timeout_seconds=0.2)
+    assert sorted(obj.metadata.name for obj in shared.objects()) == ["kube-system", "test"]  # pyright: ignore[reportAttributeAccessIssue]
+    assert shared.lists == 1
+
+
+def test_assert_namespace_missing(api_client: kubernetes.client.ApiClient) -> None:
+    """Verify a missing namespace fails the assertion when the timeout expires."""
+    with pytest.raises(AssertionError, match="Namespace missing not found"):
+        assert_namespace(client=api_client, namespace="missing", timeout_seconds=1)
+
+
+def test_wait_all(fake: FakeKubernetesApi, api_client: kubernetes.client.ApiClient) -> None:
+    """Verify expectations are waited on at the same time, and each records when it was satisfied."""
+    core_v1 = kubernetes.client.CoreV1Api(api_client=api_client)
+    late_service = {"metadata": {"name": "late", "namespace": "kube-system", "labels": {"app": "late"}}}
+    threading.Timer(0.3, fake.put, args=(SERVICES, late_service)).start()
+    threading.Timer(0.6, fake.put, args=(NAMESPACES, {"metadata": {"name": "later"}})).start()
+    start = time.monotonic()
+    readiness = assert_all_ready(
+        [
+            namespace_expectation(client=api_client, namespace="kube-system"),
+            labelled_service_expectation(client=api_client, namespace="kube-system", label_selector="app=late"),
+            namespace_expectation(client=api_client, namespace="later"),
+            Expectation(
+                lister=core_v1.list_namespaced_service,
+                matcher=Match(name="kube-dns"),
+                condition=Match(field_path="metadata.labels"),
+                kwargs={"namespace": "kube-system"},
+            ),
+        ],
+        timeout_seconds=5,
+    )
+    elapsed = time.monotonic() - start
+    assert [r.key for r in readiness] == [
+        (None, "kube-system"),
+        ("kube-system", "late"),
+        (None, "later"),
+        ("kube-system", "kube-dns"),
+    ]
+    immediate, late, later, dns = (cast("float", r.elapsed) for r in readiness)
+    assert max(immediate, dns) < late < later <= elapsed
+    assert elapsed < 2  # noqa: PLR2004
+
+
+def test_wait_all_reports_unsatisfied(api_client: kubernetes.client.ApiClient) -> None:
+    """Verify unsatisfied expectations are reported together when the timeout expires."""
+    readiness = wait_all(
+        [
+            namespace_expectation(client=api_client, namespace="kube-system"),
+            namespace_expectation(client=api_client, namespace="missing"),
+        ],
+        timeout_seconds=0.3,
+    )
+    assert [r.ready for r in readiness] == [True, False]
+    assert readiness[1].ready_at is None
+    with pytest.raises(AssertionError, match="Namespace missing, Service matching app=missing in kube-system"):
+        assert_all_ready(
+            [
+                namespace_expectation(client=api_client, namespace="missing"),
+                labelled_service_expectation(client=api_client, namespace="kube-system", label_selector="app=missing"),
+            ],
+            timeout_seconds=0.3,
+        )
@@ -0,0 +1,161 @@
+"""Offline tests for the Kubernetes API client factory, with stand-in credentials and a fake Kubernetes API."""
+
+import base64
+import datetime as dt
+import pathlib
+import socket
+import time
+from collections.abc import Generator
+from typing import Any
+
+import kubernetes.client
+import pytest
+
+from .fake_kubernetes_api import FakeKubernetesApi
+from .kubernetes_assertions import informer
+from .kubernetes_clients import KubernetesClientFactory, default_keepalive_seconds, default_pool_maxsize
+
+CA = base64.standard_b64encode(b"-----BEGIN CERTIFICATE-----\nfake\n-----END CERTIFICATE-----\n").decode()
+OTHER_CA = base64.standard_b64encode(b"-----BEGIN CERTIFICATE-----\nother\n-----END CERTIFICATE-----\n").decode()
+
+
+class StandInCredentials:
+    """Issue a new numbered token that is valid for lifetime on every refresh, like google-auth credentials."""
+
+    def __init__(self, lifetime: dt.timedelta) -> None:
+        """Initialise credentials that have not been refreshed."""
+        self.lifetime = lifetime
+        self.refreshes = 0
+        self.token: str | None = None
+        self.expiry: dt.datetime | None = None
+
+    @property
+    def valid(self) -> bool:
+        """Determine if the token has been issued and has not expired."""
+        return self.expiry is not None and dt.datetime.now(dt.UTC).replace(tzinfo=None) < self.expiry
+
+    def refresh(self, request: Any) -> None:  # noqa: ANN401, ARG002
+        """Issue a new token."""
+        self.refreshes += 1
+        self.token = f"token-{self.refreshes}"
+        self.expiry = dt.datetime.now(dt.UTC).replace(tzinfo=None) + self.lifetime
+
+
+@pytest.fixture
+def credentials() -> StandInCredentials:
+    """Return credentials with tokens that are valid for an hour."""
+    return StandInCredentials(lifetime=dt.timedelta(hours=1))
+
+
+@pytest.fixture
+def factory(credentials: StandInCredentials) -> Generator[KubernetesClientFactory, None, None]:
+    """Yield a factory that loads the stand-in credentials, closing it afterwards."""
+    factory = KubernetesClientFactory(credentials_loader=lambda: (credentials, "fake"))
+    try:
+        yield factory
+    finally:
+        factory.close()
+
+
+def test_pooled_clients(credentials: StandInCredentials, factory: KubernetesClientFactory) -> None:
+    """Verify clients are pooled by host, CA and proxy, and share credentials and CA files."""
+    client = factory.api_client(host="https://192.0.2.1", ca=CA)
+    assert factory.api_client(host="https://192.0.2.1", ca=CA) is client
+    assert factory.api_client(host="https://192.0.2.2", ca=CA) is not client
+    assert factory.api_client(host="https://192.0.2.1", ca=OTHER_CA) is not client
+    proxied = factory.api_client(host="https://192.0.2.1", ca=CA, proxy_url="http://localhost:8888")
+    assert proxied is not client
+    assert proxied.configuration.proxy == "http://localhost:8888"
+    assert credentials.refreshes == 1
+    assert client.configuration.get_api_key_with_prefix("authorization") == "Bearer token-1"
+    ca_file = pathlib.Path(client.configuration.ssl_ca_cert)
+    assert ca_file.read_bytes() == base64.standard_b64decode(CA)
+    assert factory.ca_file(CA) == str(ca_file)
+    assert factory.ca_file(OTHER_CA) != str(ca_file)
+    factory.close()
+    assert not ca_file.exists()
+    assert factory.api_client(host="https://192.0.2.1", ca=CA) is not client
+
+
+def test_expired_token_is_refreshed(credentials: StandInCredentials, factory: KubernetesClientFactory) -> None:
+    """Verify each request uses a valid token, refreshing in the foreground if the background refresh fell behind."""
+    client = factory.api_client(host="https://192.0.2.1", ca=CA)
+    assert client.configuration.get_api_key_with_prefix("authorization") == "Bearer token-1"
+    credentials.expiry = dt.datetime.now(dt.UTC).replace(tzinfo=None) - dt.timedelta(seconds=1)
+    assert client.configuration.get_api_key_with_prefix("authorization") == "Bearer token-2"
+    assert client.configuration.get_api_key_with_prefix("authorization") == "Bearer token-2"
+    assert factory.refreshes == credentials.refreshes == 2  # noqa: PLR2004
+
+
+def test_background_refresh() -> None:
+    """Verify credentials are refreshed in the background before they expire."""
+    credentials = StandInCredentials(lifetime=dt.timedelta(seconds=1))
+    factory = KubernetesClientFactory(
+        credentials_loader=lambda: (credentials, "fake"),
+        refresh_margin=dt.timedelta(seconds=0.9),
+    )
+    try:
+        client = factory.api_client(host="https://192.0.2.1", ca=CA)
+        deadline = time.monotonic() + 5
+        while credentials.refreshes < 3 and time.monotonic() < deadline:  # noqa: PLR2004
+            time.sleep(0.05)
+        assert credentials.refreshes >= 3  # noqa: PLR2004
+        assert client.configuration.get_api_key_with_prefix("authorization") == f"Bearer {credentials.token}"
+    finally:
+        factory.close()
+    refreshes = credentials.refreshes
+    time.sleep(0.3)
+    assert credentials.refreshes == refreshes
+
+
+def test_client_reuses_connections(factory: KubernetesClientFactory) -> None:
+    """Verify a pooled client makes Kubernetes API calls over one kept-alive connection."""
+    fake = FakeKubernetesApi()
+    fake.put("/api/v1/namespaces", {"metadata": {"name": "kube-system"}})
+    with fake.serve() as host:
+        core_v1 = kubernetes.client.CoreV1Api(api_client=factory.api_client(host=host, ca=CA))
+        for _ in range(5):
+            assert [ns.metadata.name for ns in core_v1.list_namespace().items] == ["kube-system"]
+        stats = factory.pool_stats()[host]
+    assert (stats.requests, stats.hits, stats.misses) == (5, 4, 1)
+
+
+def test_release_stops_informers(factory: KubernetesClientFactory) -> None:
+    """Verify releasing a host closes its pooled clients and stops their informers, leaving other hosts pooled."""
+    fake = FakeKubernetesApi()
+    fake.put("/api/v1/namespaces", {"metadata": {"name": "kube-system"}})
+    with fake.serve() as host:
+        client = factory.api_client(host=host, ca=CA)
+        proxied = factory.api_client(host=host, ca=CA, proxy_url="http://localhost:8888")
+        other = factory.api_client(host="https://192.0.2.1", ca=CA)
+        namespaces = informer(kubernetes.client.CoreV1Api(api_client=client).list_namespace)
+        assert namespaces.wait_for(lambda ns: ns.metadata.name == "kube-system", timeout_seconds=5)
+        assert factory.release(host) == 2  # noqa: PLR2004
+        assert namespaces.stopped
+    assert factory.api_client(host=host, ca=CA) is not client
+    assert factory.api_client(host=host, ca=CA, proxy_url="http://localhost:8888") is not proxied
+    assert factory.api_client(host="https://192.0.2.1", ca=CA) is other
+    assert factory.release("https://192.0.2.3") == 0
+
+
+def test_transport_settings(monkeypatch: pytest.MonkeyPatch, credentials: StandInCredentials) -> None:
+    """Verify pool size and TCP keepalive are applied to client configuration, and can be set from the environment."""
+    factory = KubernetesClientFactory(
+        credentials_loader=lambda: (credentials, "fake"),
+        pool_maxsize=2,
+        keepalive_seconds=15,
+    )
+    config = factory.configuration(host="https://192.0.2.1", ca=CA)
+    assert config.connection_pool_maxsize == 2  # noqa: PLR2004
+    assert (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1) in config.socket_options
+    if hasattr(socket, "TCP_KEEPIDLE"):
+        assert (socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, 15) in config.socket_options
+    factory.close()
+    monkeypatch.setenv("TEST_KUBERNETES_POOL_MAXSIZE", "8")
+    monkeypatch.setenv("TEST_KUBERNETES_KEEPALIVE_SECONDS", "0")
+    assert (default_pool_maxsize(), default_keepalive_seconds()) == (8, 0)
+    factory = KubernetesClientFactory(credentials_loader=lambda: (credentials, "fake"))
+    config = factory.configuration(host="https://192.0.2.1", ca=CA)
+    assert config.connection_pool_maxsize == 8  # noqa: PLR2004
+    assert config.socket_options is None
+    factory.close()
@@ -0,0 +1,251 @@
+"""Offline plan-only tests for standard and autopilot GKE clusters, using mocked Google providers.
+
+NOTE: These tests need a tofu executable, but do not create any resources or need Google Cloud credentials. Only the
+assertions that depend on module configuration, rather than values computed by GKE, are verified.
+"""
+
+import asyncio
+import os
+import pathlib
+import shutil
+from typing import Any
+
+import pytest
+from google.cloud import container_v1
+
+from . import gke_autopilot_assertions, gke_standard_assertions
+from .fixture_inputs import FIXED_NODE_POOL_CONFIG
+from .tofu_harness import tofu_test_plan
+from .tofu_translator import cluster_from_json
+
+# These must match the mocked google_compute_subnetwork data source in the fixture plan.tftest.hcl files.
+PLAN_REGION = "us-west1"
+PLAN_NETWORK = "https://www.googleapis.com/compute/v1/projects/offline/global/networks/offline"
+PLAN_PROJECT_ID = "offline"
+PLAN_LABELS = {
+    "fixture": "plan",
+}
+PLAN_SUBNET = {
+    "self_link": f"https://www.googleapis.com/compute/v1/projects/{PLAN_PROJECT_ID}/regions/{PLAN_REGION}/subnetworks/offline",
+    "pods_range_name": "pods",
+    "services_range_name": "services",
+    "master_cidr": "192.168.0.0/28",
+}
+# Map of test case name to the fixture and the tfvars that differ from the minimal configuration.
+PLAN_CASES: dict[str, tuple[str, dict[str, Any]]] = {
+    "root-min": ("root", {"node_pools": {}}),
+    "root-fixed-pool": ("root", {"node_pools": {"fixed": FIXED_NODE_POOL_CONFIG}}),
+    "autopilot-min": ("autopilot", {}),
+    "autopilot-pub": (
+        "autopilot",
+        {
+            "options": {
+                "release_channel": "STABLE",
+                "master_global_access": True,
+                "etcd_kms": None,
+                "private_endpoint": False,
+                "default_snat": True,
+                "deletion_protection": False,
+            },
+        },
+    ),
+}
+STANDARD_CASES = [name for name, (fixture, _) in PLAN_CASES.items() if fixture == "root"]
+AUTOPILOT_CASES = [name for name, (fixture, _) in PLAN_CASES.items() if fixture == "autopilot"]
+
+pytestmark = pytest.mark.skipif(
+    shutil.which(os.getenv("TEST_TF_COMMAND", "tofu")) is None,
+    reason="plan-only tests need a tofu executable",
+)
+
+
+def plan_tfvars(name: str, overrides: dict[str, Any]) -> dict[str, Any]:
+    """Return the tfvars for a planned cluster, with overrides applied to the minimal configuration."""
+    return {
+        "project_id": PLAN_PROJECT_ID,
+        "name": f"pgke-{name}",
+        "service_account": f"pgke-plan@{PLAN_PROJECT_ID}.iam.gserviceaccount.com",
+        "subnet": PLAN_SUBNET,
+        "master_authorized_networks": [
+            {
+                "cidr_block": "10.0.0.2/32",
+                "display_name": "bastion",
+            },
+        ],
+        "labels": PLAN_LABELS,
+    } | overrides
+
+
+@pytest.fixture(scope="module")
+def planned_clusters(
+    root_fixture_dir: pathlib.Path,
+    autopilot_fixture_dir: pathlib.Path,
+) -> dict[str, container_v1.Cluster]:
+    """Plan every test case at the same time, returning the planned Cluster for each."""
+    fixture_dirs = {
+        "root": root_fixture_dir,
+        "autopilot": autopilot_fixture_dir,
+    }
+
+    async def plan_all() -> list[dict[str, Any]]:
+        return await asyncio.gather(
+            *[
+                tofu_test_plan(fixture=fixture_dirs[fixture], tfvars=plan_tfvars(name, overrides))
+                for name, (fixture, overrides) in PLAN_CASES.items()
+            ],
+        )
+
+    plans = asyncio.run(plan_all())
+    return {name: cluster_from_json(plan) for name, plan in zip(PLAN_CASES, plans, strict=True)}
+
+
+@pytest.mark.parametrize("case", PLAN_CASES)
+def test_base_config(planned_clusters: dict[str, container_v1.Cluster], case: str) -> None:
+    """Verify the planned cluster name and location meet expectations."""
+    cluster = planned_clusters[case]
+    assert cluster.name == f"pgke-{case}"
+    assert cluster.location == PLAN_REGION
+
+
+@pytest.mark.parametrize("case", PLAN_CASES)
+def test_resource_labels(planned_clusters: dict[str, container_v1.Cluster], case: str) -> None:
+    """Verify the planned resource labels meet expectations."""
+    gke_standard_assertions.assert_default_resource_labels(
+        resource_labels=planned_clusters[case].resource_labels,
+        expected_labels=PLAN_LABELS | {"cluster_name": f"pgke-{case}"},
+    )
+
+
+@pytest.mark.parametrize("case", PLAN_CASES)
+def test_legacy_abac_config(planned_clusters: dict[str, container_v1.Cluster], case: str) -> None:
+    """Verify the planned legacy ABAC configuration meets expectations."""
+    gke_standard_assertions.assert_default_legacy_abac(planned_clusters[case].legacy_abac)
+
+
+@pytest.mark.parametrize("case", PLAN_CASES)
+def test_network_policy_config(planned_clusters: dict[str, container_v1.Cluster], case: str) -> None:
+    """Verify the planned network policy configuration meets expectations."""
+    gke_standard_assertions.assert_default_network_policy(planned_clusters[case].network_policy)
+
+
+@pytest.mark.parametrize("case", PLAN_CASES)
+def test_default_ip_allocation_policy(planned_clusters: dict[str, container_v1.Cluster], case: str) -> None:
+    """Verify the planned IP allocation policy meets expectations."""
+    gke_standard_assertions.assert_default_ip_allocation_policy(
+        planned_clusters[case].ip_allocation_policy,
+        cluster_range_name=PLAN_SUBNET["pods_range_name"],
+        services_range_name=PLAN_SUBNET["services_range_name"],
+    )
+
+
+@pytest.mark.parametrize("case", PLAN_CASES)
+def test_maintenance_policy(planned_clusters: dict[str, container_v1.Cluster], case: str) -> None:
+    """Verify the planned maintenance policy meets expectations."""
+    gke_standard_assertions.assert_default_maintenance_policy(planned_clusters[case].maintenance_policy)
+
+
+@pytest.mark.parametrize("case", PLAN_CASES)
+def test_binary_authorization(planned_clusters: dict[str, container_v1.Cluster], case: str) -> None:
+    """Verify the planned binary authorization configuration meets expectations."""
+    gke_standard_assertions.assert_default_binary_authorization(planned_clusters[case].binary_authorization)
+
+
+@pytest.mark.parametrize("case", PLAN_CASES)
+def test_database_encryption(planned_clusters: dict[str, container_v1.Cluster], case: str) -> None:
+    """Verify the planned database encryption meets expectations."""
+    gke_standard_assertions.assert_default_database_encryption(planned_clusters[case].database_encryption)
+
+
+@pytest.mark.parametrize("case", PLAN_CASES)
+def test_release_channel(planned_clusters: dict[str, container_v1.Cluster], case: str) -> None:
+    """Verify the planned release channel meets expectations."""
+    gke_standard_assertions.assert_default_release_channel(planned_clusters[case].release_channel)
+
+
+@pytest.mark.parametrize("case", PLAN_CASES)
+def test_cost_management_config(planned_clusters: dict[str, container_v1.Cluster], case: str) -> None:
+    """Verify the planned cost management config meets expectations."""
+    gke_standard_assertions.assert_default_cost_management_config(planned_clusters[case].cost_management_config)
+
+
+@pytest.mark.parametrize("case", PLAN_CASES)
+def test_confidential_nodes(planned_clusters: dict[str, container_v1.Cluster], case: str) -> None:
+    """Verify the planned confidential nodes config meets expectations."""
+    gke_standard_assertions.assert_default_confidential_nodes(planned_clusters[case].confidential_nodes)
+
+
+@pytest.mark.parametrize("case", PLAN_CASES)
+def test_identity_service_config(planned_clusters: dict[str, container_v1.Cluster], case: str) -> None:
+    """Verify the planned identity service config meets expectations."""
+    gke_standard_assertions.assert_default_identity_service_config(planned_clusters[case].identity_service_config)
+
+
+def test_standard_node_pools(planned_clusters: dict[str, container_v1.Cluster]) -> None:
+    """Verify the planned standard cluster node pools meet expectations."""
+    gke_standard_assertions.assert_default_node_pools(planned_clusters["root-min"].node_pools)
+
+
+def test_standard_fixed_node_pool(planned_clusters: dict[str, container_v1.Cluster]) -> None:
+    """Verify the planned fixed node pool meets expectations."""
+    node_pools = planned_clusters["root-fixed-pool"].node_pools
+    assert len(node_pools) == 1
+    node_pool = node_pools[0]
+    assert node_pool.name == "fixed-"
+    assert node_pool.config.metadata["node_pool"] == "fixed"
+    assert node_pool.config.labels["cluster_name"] == "pgke-root-fixed-pool"
+    gke_standard_assertions.assert_node_config(config=node_pool.config, settings=FIXED_NODE_POOL_CONFIG)
+    assert node_pool.initial_node_count == 1
+    assert not node_pool.autoscaling.enabled
+    assert node_pool.management.auto_repair
+    assert node_pool.management.auto_upgrade
+
+
+@pytest.mark.parametrize("case", STANDARD_CASES)
+def test_standard_shielded_nodes(planned_clusters: dict[str, container_v1.Cluster], case: str) -> None:
+    """Verify the planned standard cluster shielded nodes config meets expectations."""
+    gke_standard_assertions.assert_default_shielded_nodes(planned_clusters[case].shielded_nodes)
+
+
+@pytest.mark.parametrize("case", STANDARD_CASES)
+def test_standard_workload_identity_config(planned_clusters: dict[str, container_v1.Cluster], case: str) -> None:
+    """Verify the planned standard cluster workload identity config meets expectations."""
+    gke_standard_assertions.assert_default_workload_identity_config(
+        workload_identity_config=planned_clusters[case].workload_identity_config,
+        project_id=PLAN_PROJECT_ID,
+    )
+
+
+@pytest.mark.parametrize("case", STANDARD_CASES)
+def test_standard_mesh_certificates(planned_clusters: dict[str, container_v1.Cluster], case: str) -> None:
+    """Verify the planned standard cluster mesh certificates config meets expectations."""
+    gke_standard_assertions.assert_default_mesh_certificates(planned_clusters[case].mesh_certificates)
+
+
+@pytest.mark.parametrize("case", STANDARD_CASES)
+def test_standard_vertical_pod_autoscaling(planned_clusters: dict[str, container_v1.Cluster], case: str) -> None:
+    """Verify the planned standard cluster vertical pod autoscaling meets expectations."""
+    gke_standard_assertions.assert_default_vertical_pod_autoscaling(planned_clusters[case].vertical_pod_autoscaling)
+
+
+@pytest.mark.parametrize("case", STANDARD_CASES)
+def test_standard_autopilot(planned_clusters: dict[str, container_v1.Cluster], case: str) -> None:
+    """Verify the planned standard cluster autopilot config meets expectations."""
+    gke_standard_assertions.assert_default_autopilot(planned_clusters[case].autopilot)
+
+
+@pytest.mark.parametrize("case", AUTOPILOT_CASES)
+def test_autopilot_node_pools(planned_clusters: dict[str, container_v1.Cluster], case: str) -> None:
+    """Verify the planned autopilot cluster node pools meet expectations."""
+    gke_autopilot_assertions.assert_default_node_pools(planned_clusters[case].node_pools)
+
+
+@pytest.mark.parametrize("case", AUTOPILOT_CASES)
+def test_autopilot_vertical_pod_autoscaling(planned_clusters: dict[str, container_v1.Cluster], case: str) -> None:
+    """Verify the planned autopilot cluster vertical pod autoscaling meets expectations."""
+    gke_autopilot_assertions.assert_default_vertical_pod_autoscaling(planned_clusters[case].vertical_pod_autoscaling)
+
+
+@pytest.mark.parametrize("case", AUTOPILOT_CASES)
+def test_autopilot_autopilot(planned_clusters: dict[str, container_v1.Cluster], case: str) -> None:
+    """Verify the planned autopilot cluster autopilot config meets expectations."""
+    gke_autopilot_assertions.assert_default_autopilot(planned_clusters[case].autopilot)
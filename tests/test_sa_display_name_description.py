@@ -6,9 +6,9 @@ from collections.abc import Generator
 from typing import Any
 
 import pytest
-from google.cloud import iam_admin_v1, resourcemanager_v3
 
-from .conftest import run_tofu_in_workspace
+from .iam_policy import IamVerifier
+from .tofu_harness import run_tofu_in_workspace
 
 FIXTURE_NAME = "sa-nm-desc"
 EXPECTED_DISPLAY_NAME = "A GKE ready test account from tofu"
@@ -58,37 +58,19 @@ def test_output_values(fixture_output: dict[str, Any], project_id: str, fixture_
     assert re.match(pattern=f"serviceAccount:{fixture_name}@", string=member)
 
 
-def test_service_account(iam_client: iam_admin_v1.IAMClient, fixture_output: dict[str, Any]) -> None:
+def test_service_account(iam_verifier: IamVerifier, fixture_output: dict[str, Any]) -> None:
     """Verify the service account meets expectations."""
-    service_account = iam_client.get_service_account(
-        request=iam_admin_v1.GetServiceAccountRequest(
-            name=fixture_output["id"],
-        ),
-    )
+    service_account = iam_verifier.service_account(fixture_output["id"])
     assert service_account
     assert service_account.email == fixture_output["email"]
     assert service_account.display_name == EXPECTED_DISPLAY_NAME
     assert service_account.description == EXPECTED_DESCRIPTION
 
 
-def test_project_roles(
-    projects_client: resourcemanager_v3.ProjectsClient,
-    fixture_output: dict[str, Any],
-    project_id: str,
-) -> None:
+def test_project_roles(iam_verifier: IamVerifier, fixture_output: dict[str, Any], project_id: str) -> None:
     """Verify the service account has expected project roles."""
-    sa_member = fixture_output["member"]
-    policy = projects_client.get_iam_policy(
+    iam_verifier.assert_member_roles(
         resource=f"projects/{project_id}",
+        member=fixture_output["member"],
+        expected_roles=EXPECTED_PROJECT_ROLES,
     )
-    assert policy
-    bindings = policy.bindings
-    assert bindings
-    assert len(bindings) > 0
-    for role in EXPECTED_PROJECT_ROLES:
-        sa_bindings = [binding for binding in bindings if binding.role == role]
-        assert sa_bindings
-        assert len(sa_bindings) == 1
-        for binding in sa_bindings:
-            assert binding
-            assert sa_member in binding.members
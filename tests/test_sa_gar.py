@@ -2,13 +2,14 @@
 
 import pathlib
 import re
-from collections.abc import Generator
+from collections.abc import Generator, Mapping
 from typing import Any
 
 import pytest
-from google.cloud import artifactregistry_v1, iam_admin_v1, resourcemanager_v3
+from google.cloud import artifactregistry_v1
 
-from .conftest import run_tofu_in_workspace
+from .iam_policy import IamVerifier
+from .tofu_harness import FixtureSpec, provision_fixtures
 
 FIXTURE_NAME = "sa-gar"
 FIXTURE_LABELS = {
@@ -20,6 +21,9 @@ EXPECTED_PROJECT_ROLES = [
     "roles/container.defaultNodeServiceAccount",
     "roles/stackdriver.resourceMetadata.writer",
 ]
+EXPECTED_REPOSITORY_ROLES = [
+    "roles/artifactregistry.reader",
+]
 
 
 @pytest.fixture(scope="module")
@@ -35,41 +39,20 @@ def fixture_labels(labels: dict[str, str]) -> dict[str, str]:
 
 
 @pytest.fixture(scope="module")
-def gar_fixture_output(
+def fixture_outputs(
     gar_fixture_dir: pathlib.Path,
+    sa_fixture_dir: pathlib.Path,
     project_id: str,
     fixture_name: str,
     fixture_labels: dict[str, str],
     region: str,
-) -> Generator[dict[str, Any], None, None]:
-    """Create Google Artifact Registry for test case."""
-    with run_tofu_in_workspace(
-        fixture=gar_fixture_dir,
-        workspace=FIXTURE_NAME,
-        tfvars={
-            "project_id": project_id,
-            "name": fixture_name,
-            "region": region,
-            "labels": fixture_labels,
-        },
-    ) as output:
-        yield output
-
+) -> Generator[dict[str, dict[str, Any]], None, None]:
+    """Create Google Artifact Registry and a service account with access to it for test case."""
 
-@pytest.fixture(scope="module")
-def fixture_output(
-    gar_fixture_output: dict[str, Any],
-    sa_fixture_dir: pathlib.Path,
-    project_id: str,
-    fixture_name: str,
-) -> Generator[dict[str, Any], None, None]:
-    """Create service account for test case."""
-    repo = gar_fixture_output["repo"]
-    assert repo
-    with run_tofu_in_workspace(
-        fixture=sa_fixture_dir,
-        workspace=FIXTURE_NAME,
-        tfvars={
+    def sa_tfvars(outputs: Mapping[str, dict[str, Any]]) -> dict[str, Any]:
+        repo = outputs["gar"]["repo"]
+        assert repo
+        return {
             "project_id": project_id,
             "name": fixture_name,
             "display_name": EXPECTED_DISPLAY_NAME,
@@ -77,9 +60,67 @@ def fixture_output(
             "repositories": [
                 repo,
             ],
-        },
-    ) as output:
-        yield output
+        }
+
+    with provision_fixtures(
+        specs=[
+            FixtureSpec(
+                name="gar",
+                fixture=gar_fixture_dir,
+                workspace=FIXTURE_NAME,
+                tfvars={
+                    "project_id": project_id,
+                    "name": fixture_name,
+                    "region": region,
+                    "labels": fixture_labels,
+                },
+            ),
+            FixtureSpec(
+                name="sa",
+                fixture=sa_fixture_dir,
+                workspace=FIXTURE_NAME,
+                tfvars=sa_tfvars,
+                depends_on=("gar",),
+            ),
+        ],
+    ) as outputs:
+        yield outputs
+
+
+@pytest.fixture(scope="module")
+def gar_fixture_output(fixture_outputs: dict[str, dict[str, Any]]) -> dict[str, Any]:
+    """Return the output of the Google Artifact Registry fixture for the test case."""
+    return fixture_outputs["gar"]
+
+
+@pytest.fixture(scope="module")
+def fixture_output(fixture_outputs: dict[str, dict[str, Any]]) -> dict[str, Any]:
+    """Return the output of the service account fixture for the test case."""
+    return fixture_outputs["sa"]
+
+
+@pytest.fixture(scope="module")
+def repository_resource(gar_fixture_output: dict[str, Any]) -> str:
+    """Return the resource name of the Google Artifact Registry repository created for the test case."""
+    repo_components = re.match(
+        r"^(?P<location>[a-z]{2,}(?:-[a-z]+[1-9])?)-docker\.pkg\.dev/(?P<project>[^/]+)/(?P<repository>[^/]+)",
+        gar_fixture_output["repo"],
+    )
+    assert repo_components
+    return artifactregistry_v1.ArtifactRegistryClient.repository_path(**repo_components.groupdict())
+
+
+@pytest.fixture(scope="module")
+def iam_policies(
+    iam_verifier: IamVerifier,
+    fixture_output: dict[str, Any],
+    project_id: str,
+    repository_resource: str,
+) -> IamVerifier:
+    """Fetch the project and repository IAM policies concurrently once the service account has been created."""
+    assert fixture_output
+    iam_verifier.prefetch([f"projects/{project_id}", repository_resource])
+    return iam_verifier
 
 
 def test_output_values(fixture_output: dict[str, Any], project_id: str, fixture_name: str) -> None:
@@ -95,72 +136,28 @@ def test_output_values(fixture_output: dict[str, Any], project_id: str, fixture_
     assert re.match(pattern=f"serviceAccount:{fixture_name}@", string=member)
 
 
-def test_service_account(iam_client: iam_admin_v1.IAMClient, fixture_output: dict[str, Any]) -> None:
+def test_service_account(iam_verifier: IamVerifier, fixture_output: dict[str, Any]) -> None:
     """Verify the service account meets expectations."""
-    service_account = iam_client.get_service_account(
-        request=iam_admin_v1.GetServiceAccountRequest(
-            name=fixture_output["id"],
-        ),
-    )
+    service_account = iam_verifier.service_account(fixture_output["id"])
     assert service_account
     assert service_account.email == fixture_output["email"]
     assert service_account.display_name == EXPECTED_DISPLAY_NAME
     assert service_account.description == EXPECTED_DESCRIPTION
 
 
-def test_project_roles(
-    projects_client: resourcemanager_v3.ProjectsClient,
-    fixture_output: dict[str, Any],
-    project_id: str,
-) -> None:
+def test_project_roles(iam_policies: IamVerifier, fixture_output: dict[str, Any], project_id: str) -> None:
     """Verify the service account has expected project roles."""
-    sa_member = fixture_output["member"]
-    policy = projects_client.get_iam_policy(
+    iam_policies.assert_member_roles(
         resource=f"projects/{project_id}",
+        member=fixture_output["member"],
+        expected_roles=EXPECTED_PROJECT_ROLES,
     )
-    assert policy
-    bindings = policy.bindings
-    assert bindings
-    assert len(bindings) > 0
-    for role in EXPECTED_PROJECT_ROLES:
-        sa_bindings = [binding for binding in bindings if binding.role == role]
-        assert sa_bindings
-        assert len(sa_bindings) == 1
-        for binding in sa_bindings:
-            assert binding
-            assert sa_member in binding.members
-
-
-def test_gar_roles(
-    gar_client: artifactregistry_v1.ArtifactRegistryClient,
-    fixture_output: dict[str, Any],
-    gar_fixture_output: dict[str, Any],
-) -> None:
-    """Verify the service account has expected project roles."""
-    sa_member = fixture_output["member"]
-    repo = gar_fixture_output["repo"]
-    repo_components = re.match(
-        r"^(?P<location>[a-z]{2,}(?:-[a-z]+[1-9])?)-docker\.pkg\.dev/(?P<project>[^/]+)/(?P<repository>[^/]+)",
-        repo,
-    )
-    assert repo_components
-    repo_components = repo_components.groupdict()
-    policy = gar_client.get_iam_policy(
-        request={
-            "resource": gar_client.repository_path(
-                project=repo_components["project"],
-                location=repo_components["location"],
-                repository=repo_components["repository"],
-            ),
-        },
+
+
+def test_gar_roles(iam_policies: IamVerifier, fixture_output: dict[str, Any], repository_resource: str) -> None:
+    """Verify the service account has expected repository roles."""
+    iam_policies.assert_member_roles(
+        resource=repository_resource,
+        member=fixture_output["member"],
+        expected_roles=EXPECTED_REPOSITORY_ROLES,
     )
-    assert policy
-    bindings = policy.bindings
-    assert bindings
-    assert len(bindings) > 0
-    sa_bindings = [binding for binding in bindings if binding.role == "roles/artifactregistry.reader"]
-    assert sa_bindings
-    assert len(sa_bindings) == 1
-    for binding in sa_bindings:
-        assert binding
-        assert sa_member in binding.members
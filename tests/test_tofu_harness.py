@@ -0,0 +1,375 @@
+"""Offline tests for the tofu harness helpers; no tofu binary or Google Cloud credentials are required."""
+
+import asyncio
+import json
+import logging
+import pathlib
+import subprocess
+import threading
+from collections.abc import Generator
+from contextlib import contextmanager
+from typing import Any
+
+import pytest
+
+from . import tofu_harness
+from .fake_tofu import read_calls
+from .tofu_harness import FixtureRegistry, FixtureSpec, InitCache, provision_fixtures
+from .tofu_tracing import Tracer
+
+
+class FakeLifecycle:
+    """Record the order of apply and destroy calls made by the provisioning engine."""
+
+    def __init__(self, fail: set[str] | None = None) -> None:
+        """Initialise the recorder, with an optional set of fixture directory names that will fail to apply."""
+        self.fail = fail or set()
+        self.events: list[tuple[str, str]] = []
+        self.tfvars: dict[str, dict[str, Any] | None] = {}
+        self.raised: list[BaseException] = []
+        self.barrier: threading.Barrier | None = None
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def __call__(
+        self,
+        fixture: pathlib.Path,
+        workspace: str | None,
+        tfvars: dict[str, Any] | None,
+    ) -> Generator[dict[str, Any], None, None]:
+        """Pretend to apply the fixture, yielding an output that identifies it."""
+        assert workspace
+        name = fixture.name
+        if self.barrier and name in {"sa", "vpc"}:
+            # Both independent fixtures must be applied at the same time for this barrier to be passed.
+            self.barrier.wait()
+        if name in self.fail:
+            msg = f"apply {name} failed"
+            raise RuntimeError(msg)
+        with self.lock:
+            self.events.append(("apply", name))
+            self.tfvars[name] = tfvars
+        try:
+            yield {"name": name}
+        except BaseException as e:
+            with self.lock:
+                self.raised.append(e)
+            raise
+        with self.lock:
+            self.events.append(("destroy", name))
+
+
+@pytest.fixture
+def lifecycle(monkeypatch: pytest.MonkeyPatch) -> FakeLifecycle:
+    """Replace the tofu lifecycle used by the provisioning engine with a recorder."""
+    lifecycle = FakeLifecycle()
+    monkeypatch.setattr(tofu_harness, "run_tofu_in_workspace", lifecycle)
+    return lifecycle
+
+
+def cluster_graph(tmp_path: pathlib.Path) -> list[FixtureSpec]:
+    """Return a graph similar to the cluster test modules, where sa and vpc feed the cluster."""
+    return [
+        FixtureSpec(name="sa", fixture=tmp_path / "sa", workspace="test", tfvars={"name": "sa"}),
+        FixtureSpec(name="vpc", fixture=tmp_path / "vpc", workspace="test", tfvars={"name": "vpc"}),
+        FixtureSpec(
+            name="cluster",
+            fixture=tmp_path / "cluster",
+            workspace="test",
+            tfvars=lambda outputs: {"sa": outputs["sa"]["name"], "vpc": outputs["vpc"]["name"]},
+            depends_on=("sa", "vpc"),
+        ),
+    ]
+
+
+def test_provision_fixtures_order(lifecycle: FakeLifecycle, tmp_path: pathlib.Path) -> None:
+    """Verify independent fixtures are applied together, and dependents are applied after and destroyed before."""
+    lifecycle.barrier = threading.Barrier(2, timeout=5)
+    with provision_fixtures(specs=cluster_graph(tmp_path), workers=2) as outputs:
+        assert outputs == {"sa": {"name": "sa"}, "vpc": {"name": "vpc"}, "cluster": {"name": "cluster"}}
+        assert lifecycle.events[-1] == ("apply", "cluster")
+        assert lifecycle.tfvars["cluster"] == {"sa": "sa", "vpc": "vpc"}
+    assert lifecycle.events[3] == ("destroy", "cluster")
+    assert sorted(lifecycle.events[4:]) == [("destroy", "sa"), ("destroy", "vpc")]
+
+
+def test_provision_fixtures_apply_failure(lifecycle: FakeLifecycle, tmp_path: pathlib.Path) -> None:
+    """Verify a failed apply destroys the fixtures that were applied and skips their dependents."""
+    lifecycle.fail = {"vpc"}
+    lifecycle.barrier = threading.Barrier(2, timeout=5)
+    with (
+        pytest.raises(RuntimeError, match="apply vpc failed"),
+        provision_fixtures(specs=cluster_graph(tmp_path), workers=2),
+    ):
+        pytest.fail("provision_fixtures should not yield")
+    assert lifecycle.events == [("apply", "sa"), ("destroy", "sa")]
+
+
+@pytest.mark.parametrize(
+    ("specs", "message"),
+    [
+        (
+            [FixtureSpec(name="a", fixture=pathlib.Path("a"), workspace="test", depends_on=("b",))],
+            "unknown fixture b",
+        ),
+        (
+            [
+                FixtureSpec(name="a", fixture=pathlib.Path("a"), workspace="test", depends_on=("b",)),
+                FixtureSpec(name="b", fixture=pathlib.Path("b"), workspace="test", depends_on=("a",)),
+            ],
+            "cycle",
+        ),
+        (
+            [FixtureSpec(name="a", fixture=pathlib.Path("a"), workspace=None, shared=True)],
+            "no registry",
+        ),
+    ],
+)
+def test_provision_fixtures_invalid_graph(
+    lifecycle: FakeLifecycle,
+    specs: list[FixtureSpec],
+    message: str,
+) -> None:
+    """Verify an invalid dependency graph is rejected before anything is applied."""
+    with pytest.raises(ValueError, match=message), provision_fixtures(specs=specs):
+        pytest.fail("provision_fixtures should not yield")
+    assert not lifecycle.events
+
+
+def test_provision_fixtures_shared_depends_on_unshared(lifecycle: FakeLifecycle, tmp_path: pathlib.Path) -> None:
+    """Verify a shared fixture cannot outlive an unshared fixture it depends on."""
+    specs = [
+        FixtureSpec(name="gar", fixture=tmp_path / "gar", workspace="test"),
+        FixtureSpec(name="sa", fixture=tmp_path / "sa", workspace=None, depends_on=("gar",), shared=True),
+    ]
+    with (
+        pytest.raises(ValueError, match="cannot depend on unshared"),
+        provision_fixtures(specs=specs, registry=FixtureRegistry()),
+    ):
+        pytest.fail("provision_fixtures should not yield")
+    assert not lifecycle.events
+
+
+def test_provision_fixtures_consumer_failure(
+    lifecycle: FakeLifecycle,
+    tmp_path: pathlib.Path,
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    """Verify a failing consumer keeps every fixture, without its error being logged or raised again at teardown."""
+    registry = FixtureRegistry()
+    specs = [
+        FixtureSpec(name="sa", fixture=tmp_path / "sa", workspace=None, tfvars={"name": "sa"}, shared=True),
+        FixtureSpec(name="cluster", fixture=tmp_path / "cluster", workspace="test", depends_on=("sa",)),
+    ]
+    msg = "consumer failed"
+    with (
+        caplog.at_level(logging.INFO, logger=tofu_harness.__name__),
+        pytest.raises(RuntimeError, match=msg),
+        provision_fixtures(specs=specs, registry=registry),
+    ):
+        raise RuntimeError(msg)
+    registry.close()
+    assert lifecycle.events == [("apply", "sa"), ("apply", "cluster")]
+    assert len(lifecycle.raised) == 2  # noqa: PLR2004
+    assert not [error for error in lifecycle.raised if str(error) == msg]
+    assert not [record for record in caplog.records if record.levelno >= logging.ERROR]
+
+
+def test_fixture_registry_shares_identical_requests(lifecycle: FakeLifecycle, tmp_path: pathlib.Path) -> None:
+    """Verify identical shared fixtures are applied once, and destroyed once after the last consumer has finished."""
+    registry = FixtureRegistry()
+    for cluster in ["one", "two"]:
+        specs = [
+            FixtureSpec(name="sa", fixture=tmp_path / "sa", workspace=None, tfvars={"name": "sa"}, shared=True),
+            FixtureSpec(name="vpc", fixture=tmp_path / "vpc", workspace=None, tfvars={"name": "vpc"}, shared=True),
+            FixtureSpec(name="cluster", fixture=tmp_path / cluster, workspace="test", depends_on=("sa", "vpc")),
+        ]
+        with provision_fixtures(specs=specs, registry=registry) as outputs:
+            key = FixtureRegistry.key(fixture=tmp_path / "vpc", tfvars={"name": "vpc"})
+            assert registry.references(key) == 1
+            assert outputs["vpc"] == {"name": "vpc"}
+        assert registry.references(key) == 0
+    with registry.lease(fixture=tmp_path / "sa", tfvars={"name": "other"}):
+        pass
+    assert sorted(lifecycle.events[:3]) == [("apply", "one"), ("apply", "sa"), ("apply", "vpc")]
+    assert lifecycle.events[3:] == [("destroy", "one"), ("apply", "two"), ("destroy", "two"), ("apply", "sa")]
+    registry.close()
+    assert sorted(lifecycle.events[7:]) == [("destroy", "sa"), ("destroy", "sa"), ("destroy", "vpc")]
+
+
+def test_fixture_registry_close_while_leased(lifecycle: FakeLifecycle, tmp_path: pathlib.Path) -> None:
+    """Verify closing a registry destroys unleased fixtures, and keeps leased fixtures and what they require."""
+    registry = FixtureRegistry()
+    sa_key = FixtureRegistry.key(fixture=tmp_path / "sa", tfvars=None)
+    for fixture in ["other", "sa"]:
+        with registry.lease(fixture=tmp_path / fixture, tfvars=None):
+            pass
+    with (
+        registry.lease(fixture=tmp_path / "vpc", tfvars=None, requires=[sa_key]),
+        pytest.raises(RuntimeError, match="still leased"),
+    ):
+        registry.close()
+    assert sorted(lifecycle.events) == [("apply", "other"), ("apply", "sa"), ("apply", "vpc"), ("destroy", "other")]
+    registry.close()
+    assert lifecycle.events[4:] == [("destroy", "vpc"), ("destroy", "sa")]
+
+
+def make_fixture(directory: pathlib.Path) -> pathlib.Path:
+    """Create a fixture for the fake tofu executable that declares one resource and outputs the directory name."""
+    directory.mkdir()
+    directory.joinpath("main.tf").write_text(f'resource "null_resource" "{directory.name}" {{}}\n', encoding="utf-8")
+    directory.joinpath("outputs.tf").write_text(
+        f'output "name" {{\n  value = "{directory.name}"\n}}\n',
+        encoding="utf-8",
+    )
+    return directory
+
+
+def commands(fixture: pathlib.Path) -> list[str]:
+    """Return the tofu commands that were executed in the fixture directory, in order."""
+    return [args[0] for args in read_calls(fixture)]
+
+
+def test_init_cache_memoises_init(fake_tofu: pathlib.Path, tmp_path: pathlib.Path) -> None:
+    """Verify tofu init is executed once per fixture directory, and again when the dependency lock file changes."""
+    fixture = make_fixture(tmp_path / "fixture")
+    env = tofu_harness.tofu_env(fixture)
+    init_cache = InitCache()
+    assert asyncio.run(init_cache.init(tf_command=str(fake_tofu), fixture=fixture, env=env))
+    assert not asyncio.run(init_cache.init(tf_command=str(fake_tofu), fixture=fixture, env=env))
+    assert (init_cache.runs, init_cache.hits) == (1, 1)
+    assert commands(fixture) == ["init"]
+    fixture.joinpath(".terraform.lock.hcl").write_text("# changed", encoding="utf-8")
+    assert asyncio.run(init_cache.init(tf_command=str(fake_tofu), fixture=fixture, env=env))
+    assert (init_cache.runs, init_cache.hits) == (2, 1)
+    assert commands(fixture) == ["init", "init"]
+
+
+def test_tofu_lifecycle_streams_output(
+    fake_tofu: pathlib.Path,
+    tmp_path: pathlib.Path,
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    """Verify many workspaces can be applied from one event loop, with tofu output logged as it is written."""
+    assert fake_tofu.exists()
+    fixtures = [make_fixture(tmp_path / "one"), make_fixture(tmp_path / "two")]
+
+    async def apply_all() -> list[dict[str, Any]]:
+        async with (
+            tofu_harness.tofu_lifecycle(fixture=fixtures[0], workspace="test", tfvars=None) as one,
+            tofu_harness.tofu_lifecycle(fixture=fixtures[1], workspace="test", tfvars=None) as two,
+        ):
+            return [one, two]
+
+    with caplog.at_level(logging.INFO, logger=tofu_harness.__name__):
+        assert asyncio.run(apply_all()) == [{"name": "one"}, {"name": "two"}]
+    assert "[one:test] null_resource.one: Creating..." in caplog.messages
+    assert "[two:test] null_resource.two: Destruction complete" in caplog.messages
+    assert commands(fixtures[0]) == ["init", "apply", "output", "destroy"]
+
+
+def test_run_tofu_in_workspace_raises_on_failure(
+    fake_tofu: pathlib.Path,
+    tmp_path: pathlib.Path,
+    monkeypatch: pytest.MonkeyPatch,
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    """Verify the synchronous wrapper surfaces a failed tofu command, with its standard error logged as a warning."""
+    assert fake_tofu.exists()
+    monkeypatch.setenv("TEST_FAKE_TOFU_FAIL", "apply@fixture")
+    fixture = make_fixture(tmp_path / "fixture")
+    with (
+        caplog.at_level(logging.INFO, logger=tofu_harness.__name__),
+        pytest.raises(subprocess.CalledProcessError) as excinfo,
+        tofu_harness.run_tofu_in_workspace(fixture=fixture, workspace="test", tfvars=None),
+    ):
+        pytest.fail("run_tofu_in_workspace should not yield")
+    assert excinfo.value.cmd[2] == "apply"
+    assert excinfo.value.stderr == b"Error: apply failed, as requested by TEST_FAKE_TOFU_FAIL\n"
+    message = "[fixture:test] Error: apply failed, as requested by TEST_FAKE_TOFU_FAIL"
+    assert ("tests.tofu_harness", logging.WARNING, message) in caplog.record_tuples
+    assert commands(fixture) == ["init", "apply"]
+
+
+def test_run_tofu_in_workspace_reuses_unchanged_workspace(
+    fake_tofu: pathlib.Path,
+    tmp_path: pathlib.Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Verify apply is skipped only when the recorded digest matches and a plan reports no changes."""
+    assert fake_tofu.exists()
+    monkeypatch.setenv("TEST_TF_REUSE_WORKSPACES", "true")
+    monkeypatch.setenv("TEST_SKIP_DESTROY_PHASE", "true")
+    fixture = make_fixture(tmp_path / "fixture")
+    state_file = fixture.joinpath("terraform.tfstate.d/test/terraform.tfstate")
+
+    def lifecycle(tfvars: dict[str, Any]) -> list[str]:
+        executed = len(read_calls(fixture))
+        with tofu_harness.run_tofu_in_workspace(fixture=fixture, workspace="test", tfvars=tfvars) as output:
+            assert output == {"name": "fixture"}
+        return commands(fixture)[executed:]
+
+    assert lifecycle({"name": "one"}) == ["init", "apply", "output"]
+    assert lifecycle({"name": "one"}) == ["plan", "output"]
+    # Drift the state away from the tfvars, as a change made outside tofu would, so that the plan reports changes.
+    state = json.loads(state_file.read_text(encoding="utf-8"))
+    state_file.write_text(json.dumps(state | {"tfvars": {"name": "drifted"}}), encoding="utf-8")
+    assert lifecycle({"name": "one"}) == ["plan", "apply", "output"]
+    assert lifecycle({"name": "two"}) == ["apply", "output"]
+    fixture.joinpath("main.tf").write_text("# changed", encoding="utf-8")
+    assert lifecycle({"name": "two"}) == ["apply", "output"]
+    assert tofu_harness.recorded_digest(fixture, "test") == tofu_harness.workspace_digest(fixture, {"name": "two"})
+
+
+def test_tofu_lifecycle_traces_phases(
+    fake_tofu: pathlib.Path,
+    tmp_path: pathlib.Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Verify each lifecycle phase is recorded as a span of its fixture and workspace, with its exit code and output."""
+    assert fake_tofu.exists()
+    tracer = Tracer()
+    monkeypatch.setattr(tofu_harness, "TRACER", tracer)
+    fixture = make_fixture(tmp_path / "fixture")
+    with tofu_harness.run_tofu_in_workspace(fixture=fixture, workspace="test", tfvars=None):
+        pass
+    spans = tracer.finished()
+    provision, teardown = (span for span in spans if span.parent_id is None)
+    assert (provision.name, teardown.name) == ("provision", "teardown")
+    assert provision.track != teardown.track
+    children = [span.name for span in spans if span.parent_id == provision.span_id]
+    assert children == ["lock", "init", "apply", "output"]
+    for span in spans:
+        assert span.attributes["fixture"] == "fixture"
+        assert span.attributes["workspace"] == "test"
+        assert span.end_ns is not None
+        assert span.end_ns >= span.start_ns
+    apply = next(span for span in spans if span.name == "apply")
+    assert apply.attributes["exit_code"] == 0
+    assert apply.attributes["stdout_bytes"] > 0
+    assert apply.attributes["stderr_bytes"] == 0
+    assert apply.attributes["command"] == "apply -json"
+
+
+def test_tofu_lifecycle_records_resource_timings(
+    fake_tofu: pathlib.Path,
+    tmp_path: pathlib.Path,
+    monkeypatch: pytest.MonkeyPatch,
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    """Verify apply and destroy write JSON UI messages that are logged as text and timed per resource."""
+    assert fake_tofu.exists()
+    monkeypatch.setenv("TEST_TF_TIMINGS_DIR", str(tmp_path / "timings"))
+    fixture = make_fixture(tmp_path / "fixture")
+    with (
+        caplog.at_level(logging.INFO, logger=tofu_harness.__name__),
+        tofu_harness.run_tofu_in_workspace(fixture=fixture, workspace="test", tfvars=None),
+    ):
+        pass
+    assert "[fixture:test] null_resource.fixture: Creating..." in caplog.messages
+    assert "[fixture:test] Destroy complete!" in caplog.messages
+    phases = [args[:2] for args in read_calls(fixture) if args[0] in ["apply", "destroy"]]
+    assert phases == [["apply", "-json"], ["destroy", "-json"]]
+    for phase, action in [("apply", "create"), ("destroy", "delete")]:
+        table = tmp_path.joinpath("timings", f"fixture-test-{phase}.txt").read_text(encoding="utf-8")
+        assert table.splitlines()[2].split() == ["0.0", "-", action, "complete", "null_resource.fixture"]
@@ -0,0 +1,101 @@
+"""Offline tests for the per-resource latency breakdown of tofu apply and destroy."""
+
+import json
+import pathlib
+from typing import Any
+
+import pytest
+
+from .tofu_resource_timings import (
+    COMPLETE,
+    ERRORED,
+    HISTORY_FILE,
+    INCOMPLETE,
+    ResourceTiming,
+    format_table,
+    parse_ui_messages,
+    read_history,
+    record_timings,
+)
+
+CLUSTER = "module.test.google_container_cluster.cluster"
+POOL = 'module.test.google_container_node_pool.pools["default"]'
+SA = "module.sa.google_service_account.sa"
+
+
+def ui_message(kind: str, address: str, timestamp: str, action: str = "create", **hook: Any) -> str:  # noqa: ANN401
+    """Return a JSON UI message of tofu for a resource hook."""
+    return json.dumps(
+        {
+            "@level": "info",
+            "@message": f"{address}: {kind}",
+            "@timestamp": f"2026-10-18T10:{timestamp}.000000Z",
+            "type": kind,
+            "hook": {"resource": {"addr": address}, "action": action, **hook},
+        },
+    )
+
+
+APPLY_OUTPUT = "\n".join(
+    [
+        json.dumps({"@level": "info", "@message": "OpenTofu 1.8.0", "type": "version"}),
+        ui_message("apply_start", SA, "00:00"),
+        ui_message("apply_start", CLUSTER, "00:01"),
+        ui_message("apply_complete", SA, "00:02", elapsed_seconds=2),
+        ui_message("apply_progress", CLUSTER, "05:01", elapsed_seconds=300),
+        ui_message("apply_complete", CLUSTER, "09:31.500000", elapsed_seconds=570),
+        ui_message("apply_start", POOL, "09:32"),
+        ui_message("apply_errored", POOL, "29:32", elapsed_seconds=1200),
+        "not a JSON message",
+    ],
+).encode()
+
+
+def test_parse_ui_messages() -> None:
+    """Verify each resource is timed from its start to its completion or error, in the order they started."""
+    assert parse_ui_messages(APPLY_OUTPUT) == [
+        ResourceTiming(SA, "create", 2.0, COMPLETE),
+        ResourceTiming(CLUSTER, "create", 570.5, COMPLETE),
+        ResourceTiming(POOL, "create", 1200.0, ERRORED),
+    ]
+
+
+def test_parse_interrupted_apply() -> None:
+    """Verify a resource that never completes is reported as incomplete with the time until the last message."""
+    output = "\n".join(
+        [
+            ui_message("apply_start", POOL, "00:00", action="delete"),
+            ui_message("apply_progress", POOL, "00:30", action="delete", elapsed_seconds=30),
+        ],
+    ).encode()
+    assert parse_ui_messages(output) == [ResourceTiming(POOL, "delete", 30.0, INCOMPLETE)]
+    assert parse_ui_messages(b"") == []
+
+
+def test_record_timings_history(tmp_path: pathlib.Path, caplog: pytest.LogCaptureFixture) -> None:
+    """Verify the latency table is written per fixture, compared with earlier runs, and appended to the history."""
+    for _ in range(2):
+        record_timings(fixture="root", workspace="min", phase="apply", output=APPLY_OUTPUT, directory=tmp_path)
+    history = read_history(tmp_path / HISTORY_FILE)
+    assert len(history) == 6  # noqa: PLR2004
+    assert {record["fixture"] for record in history} == {"root"}
+    assert history[1]["address"] == CLUSTER
+    assert history[1]["elapsed_seconds"] == 570.5  # noqa: PLR2004
+    slower = APPLY_OUTPUT.replace(b"10:09:31.5", b"10:19:31.5")
+    with caplog.at_level("INFO"):
+        record_timings(fixture="root", workspace="min", phase="apply", output=slower, directory=tmp_path)
+    table = tmp_path.joinpath("root-min-apply.txt").read_text(encoding="utf-8")
+    assert table in caplog.text
+    lines = table.splitlines()
+    assert lines[0] == "root:min apply"
+    assert lines[1].split() == ["seconds", "median", "action", "status", "address"]
+    assert lines[2].split() == ["1200.0", "-", "create", "errored", POOL]
+    assert lines[3].split() == ["1170.5", "!", "570.5", "create", "complete", CLUSTER]
+    assert lines[4].split() == ["2.0", "2.0", "create", "complete", SA]
+
+
+def test_format_table_without_history() -> None:
+    """Verify the table lists the slowest resource first when there is no history to compare with."""
+    timings = [ResourceTiming(SA, "delete", 1.0), ResourceTiming(CLUSTER, "delete", 9.0)]
+    table = format_table("root:min", "destroy", timings)
+    assert [line.split()[-1] for line in table.splitlines()[2:]] == [CLUSTER, SA]
@@ -0,0 +1,98 @@
+"""Offline tests for the tofu phase tracer and its exports."""
+
+import asyncio
+import json
+import pathlib
+
+import pytest
+
+from .tofu_tracing import CHROME, OTEL, Tracer, trace_file
+
+
+def traced_session(tracer: Tracer) -> None:
+    """Record two fixtures provisioned concurrently from one event loop, one of which fails to apply."""
+
+    async def provision(fixture: str, *, fail: bool) -> None:
+        with tracer.span("provision", fixture=fixture, workspace="test"):
+            with tracer.span("init", exit_code=0):
+                await asyncio.sleep(0.01)
+            with tracer.span("apply") as span:
+                await asyncio.sleep(0.01)
+                span.attributes["exit_code"] = 1 if fail else 0
+                if fail:
+                    msg = "apply failed"
+                    raise RuntimeError(msg)
+
+    async def provision_all() -> None:
+        await asyncio.gather(provision("one", fail=False), provision("two", fail=True), return_exceptions=True)
+
+    asyncio.run(provision_all())
+
+
+def test_spans() -> None:
+    """Verify spans nest within the task that opened them, inherit fixture and workspace, and record errors."""
+    tracer = Tracer()
+    traced_session(tracer)
+    spans = tracer.finished()
+    assert len(spans) == 6  # noqa: PLR2004
+    roots = {span.attributes["fixture"]: span for span in spans if span.parent_id is None}
+    assert set(roots) == {"one", "two"}
+    assert roots["one"].track != roots["two"].track
+    for span in spans:
+        root = roots[span.attributes["fixture"]]
+        assert span.track == root.track
+        assert span.attributes["workspace"] == "test"
+        if span is not root:
+            assert span.parent_id == root.span_id
+            assert root.start_ns <= span.start_ns <= (span.end_ns or 0) <= (root.end_ns or 0)
+    failed = [span.name for span in spans if span.error]
+    assert sorted(failed) == ["apply", "provision"]
+    assert roots["two"].error == "RuntimeError: apply failed"
+    assert tracer.current.get() is None
+
+
+def test_otel_export(tmp_path: pathlib.Path) -> None:
+    """Verify the OpenTelemetry export is an OTLP/JSON request with one span per phase."""
+    tracer = Tracer()
+    traced_session(tracer)
+    path = tmp_path / "trace.json"
+    tracer.export(path, trace_format=OTEL)
+    request = json.loads(path.read_text(encoding="utf-8"))
+    spans = request["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert len(spans) == 6  # noqa: PLR2004
+    assert {span["traceId"] for span in spans} == {tracer.trace_id}
+    ids = {span["spanId"] for span in spans}
+    assert all(span["parentSpanId"] in ids for span in spans if "parentSpanId" in span)
+    apply = next(span for span in spans if span["name"] == "apply" and span["status"]["code"] == 2)  # noqa: PLR2004
+    assert apply["status"]["message"] == "RuntimeError: apply failed"
+    assert {"key": "exit_code", "value": {"intValue": "1"}} in apply["attributes"]
+    assert {"key": "fixture", "value": {"stringValue": "two"}} in apply["attributes"]
+    assert int(apply["endTimeUnixNano"]) > int(apply["startTimeUnixNano"])
+
+
+def test_chrome_export(tmp_path: pathlib.Path) -> None:
+    """Verify the Chrome export has a named track per fixture with a complete event per phase."""
+    tracer = Tracer()
+    traced_session(tracer)
+    path = tmp_path / "trace.json"
+    tracer.export(path, trace_format=CHROME)
+    events = json.loads(path.read_text(encoding="utf-8"))["traceEvents"]
+    tracks = {event["args"]["name"]: event["tid"] for event in events if event["name"] == "thread_name"}
+    assert set(tracks) == {"one test", "two test"}
+    complete = [event for event in events if event["ph"] == "X"]
+    assert len(complete) == 6  # noqa: PLR2004
+    for event in complete:
+        assert event["tid"] == tracks[f"{event['args']['fixture']} test"]
+        assert event["dur"] > 0
+    with pytest.raises(ValueError, match="unsupported trace format: svg"):
+        tracer.export(path, trace_format="svg")
+
+
+def test_trace_file(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Verify the trace is only written when TEST_TF_TRACE is set, to a separate file for each pytest-xdist worker."""
+    monkeypatch.delenv("TEST_TF_TRACE", raising=False)
+    assert trace_file() is None
+    assert trace_file(worker="gw0") is None
+    monkeypatch.setenv("TEST_TF_TRACE", str(tmp_path / "trace.json"))
+    assert trace_file() == tmp_path / "trace.json"
+    assert trace_file(worker="gw0") == tmp_path / "trace-gw0.json"
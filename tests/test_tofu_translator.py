@@ -0,0 +1,94 @@
+"""Offline tests for the translation of tofu JSON plans and state to GKE Cluster and NodePool messages."""
+
+import copy
+import time
+
+from google.cloud import container_v1
+
+from .gke_standard_assertions import (
+    assert_default_binary_authorization,
+    assert_default_database_encryption,
+    assert_default_ip_allocation_policy,
+    assert_default_maintenance_policy,
+    assert_default_network_policy,
+    assert_default_release_channel,
+    assert_node_config,
+)
+from .tofu_documents import CLUSTER_VALUES, NODE_POOL_VALUES, plan_document
+from .tofu_translator import cluster_from_json, clusters_from_json
+
+NODE_POOL_SETTINGS = {
+    "machine_type": "e2-medium",
+    "disk_size": 20,
+    "disk_type": "pd-standard",
+    "image_type": "COS_CONTAINERD",
+    "local_ssd_count": 0,
+    "enable_integrity_monitoring": True,
+}
+
+
+def test_cluster_from_plan() -> None:
+    """Verify a planned cluster can be verified with the assertions used for a live cluster."""
+    cluster = cluster_from_json(plan_document(node_pool_count=1))
+    assert cluster.name == "test"
+    assert cluster.network == "test"
+    assert cluster.network_config.network == "projects/test/global/networks/test"
+    assert cluster.network_config.subnetwork == "projects/test/regions/us-west1/subnetworks/test"
+    assert cluster.network_config.datapath_provider == container_v1.DatapathProvider.ADVANCED_DATAPATH
+    assert cluster.default_max_pods_constraint.max_pods_per_node == 110  # noqa: PLR2004
+    assert_default_binary_authorization(cluster.binary_authorization)
+    assert_default_database_encryption(cluster.database_encryption)
+    assert_default_ip_allocation_policy(cluster.ip_allocation_policy)
+    assert_default_maintenance_policy(cluster.maintenance_policy)
+    assert_default_network_policy(cluster.network_policy)
+    assert_default_release_channel(cluster.release_channel)
+    exclusion = cluster.maintenance_policy.window.maintenance_exclusions["holidays"]
+    assert exclusion.maintenance_exclusion_options.scope == container_v1.MaintenanceExclusionOptions.Scope.NO_UPGRADES
+    assert exclusion.start_time.isoformat() == "2026-12-24T00:00:00+00:00"
+    assert len(cluster.node_pools) == 1
+    node_pool = cluster.node_pools[0]
+    assert node_pool.name == "pool0-"
+    assert node_pool.management.auto_repair
+    assert not node_pool.autoscaling.enabled
+    assert node_pool.upgrade_settings.strategy == container_v1.NodePoolUpdateStrategy.SURGE
+    assert_node_config(config=node_pool.config, settings=NODE_POOL_SETTINGS)
+
+
+def test_clusters_from_state() -> None:
+    """Verify node pools in state are matched to their cluster by name, and repeated blocks are translated."""
+    other = copy.deepcopy(CLUSTER_VALUES) | {"name": "other"}
+    node_pool = copy.deepcopy(NODE_POOL_VALUES) | {"name": "fixed-1234", "autoscaling": [{"max_node_count": 3}]}
+    node_pool["node_config"][0]["taint"] = [{"key": "dedicated", "value": "test", "effect": "NO_SCHEDULE"}]
+    state = {
+        "values": {
+            "root_module": {
+                "resources": [
+                    {"mode": "managed", "type": "google_container_cluster", "values": CLUSTER_VALUES},
+                    {"mode": "managed", "type": "google_container_cluster", "values": other},
+                    {
+                        "mode": "managed",
+                        "type": "google_container_node_pool",
+                        "values": node_pool,
+                    },
+                ],
+            },
+        },
+    }
+    test, other_cluster = clusters_from_json(state)
+    assert [node_pool.name for node_pool in test.node_pools] == ["fixed-1234"]
+    assert test.node_pools[0].autoscaling.enabled
+    assert test.node_pools[0].autoscaling.max_node_count == 3  # noqa: PLR2004
+    assert list(test.node_pools[0].config.taints) == [
+        container_v1.NodeTaint(key="dedicated", value="test", effect=container_v1.NodeTaint.Effect.NO_SCHEDULE),
+    ]
+    assert not other_cluster.node_pools
+
+
+def test_cluster_from_plan_with_many_node_pools() -> None:
+    """Verify a cluster with dozens of node pools is translated in milliseconds, not seconds."""
+    document = plan_document(node_pool_count=50)
+    start = time.perf_counter()
+    cluster = cluster_from_json(document)
+    elapsed = time.perf_counter() - start
+    assert len(cluster.node_pools) == 50  # noqa: PLR2004
+    assert elapsed < 0.5  # noqa: PLR2004
@@ -0,0 +1,85 @@
+"""Tofu JSON plans and state values shaped like those of the root fixture, for offline tests."""
+
+from typing import Any
+
+CLUSTER_VALUES: dict[str, Any] = {
+    "name": "test",
+    "location": "us-west1",
+    "networking_mode": "VPC_NATIVE",
+    "network": "https://www.googleapis.com/compute/v1/projects/test/global/networks/test",
+    "subnetwork": "https://www.googleapis.com/compute/v1/projects/test/regions/us-west1/subnetworks/test",
+    "datapath_provider": "ADVANCED_DATAPATH",
+    "enable_l4_ilb_subsetting": True,
+    "default_max_pods_per_node": 110,
+    "binary_authorization": [{"enabled": None, "evaluation_mode": "DISABLED"}],
+    "database_encryption": [{"key_name": "", "state": "DECRYPTED"}],
+    "default_snat_status": [{"disabled": False}],
+    "ip_allocation_policy": [
+        {"cluster_secondary_range_name": "pods", "services_secondary_range_name": "services", "stack_type": "IPV4"},
+    ],
+    "maintenance_policy": [
+        {
+            "daily_maintenance_window": [{"start_time": "05:00"}],
+            "maintenance_exclusion": [
+                {
+                    "exclusion_name": "holidays",
+                    "start_time": "2026-12-24T00:00:00Z",
+                    "end_time": "2026-12-27T00:00:00Z",
+                    "exclusion_options": [{"scope": "NO_UPGRADES"}],
+                },
+            ],
+            "recurring_window": [],
+        },
+    ],
+    "network_policy": [{"enabled": False, "provider": None}],
+    "release_channel": [{"channel": "STABLE"}],
+}
+NODE_POOL_VALUES: dict[str, Any] = {
+    "cluster": "test",
+    "name_prefix": "fixed-",
+    "initial_node_count": 1,
+    "management": [{"auto_repair": True, "auto_upgrade": True}],
+    "node_config": [
+        {
+            "machine_type": "e2-medium",
+            "disk_size_gb": 20,
+            "disk_type": "pd-standard",
+            "image_type": "COS_CONTAINERD",
+            "local_ssd_count": 0,
+            "oauth_scopes": ["https://www.googleapis.com/auth/cloud-platform"],
+            "metadata": {"disable-legacy-endpoints": "true"},
+            "preemptible": True,
+            "shielded_instance_config": [{"enable_integrity_monitoring": True, "enable_secure_boot": False}],
+            "workload_metadata_config": [{"mode": "GKE_METADATA"}],
+        },
+    ],
+    "upgrade_settings": [{"max_surge": 1, "max_unavailable": 0, "strategy": "SURGE"}],
+}
+
+
+def plan_document(node_pool_count: int) -> dict[str, Any]:
+    """Return a JSON plan with a cluster and node pools in a child module, like the root fixture."""
+    node_pools = [
+        {
+            "mode": "managed",
+            "type": "google_container_node_pool",
+            "values": NODE_POOL_VALUES | {"name_prefix": f"pool{index}-"},
+        }
+        for index in range(node_pool_count)
+    ]
+    return {
+        "planned_values": {
+            "root_module": {
+                "child_modules": [
+                    {
+                        "address": "module.test",
+                        "resources": [
+                            {"mode": "data", "type": "google_compute_subnetwork", "values": {}},
+                            {"mode": "managed", "type": "google_container_cluster", "values": CLUSTER_VALUES},
+                            *node_pools,
+                        ],
+                    },
+                ],
+            },
+        },
+    }
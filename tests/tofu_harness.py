@@ -0,0 +1,868 @@
+"""Helpers to drive tofu fixtures through their init/apply/destroy lifecycle.
+
+NOTE: Test modules that need more than one fixture should describe them as a dependency graph of FixtureSpec objects and
+use provision_fixtures, so that fixtures without a dependency on each other are applied and destroyed at the same time.
+
+Every tofu command runs with its workspace in TF_WORKSPACE and a data directory private to the pytest-xdist worker in
+TF_DATA_DIR, so workers and threads never change the workspace selected in a shared fixture directory. Run with
+-n auto --dist loadfile so that the module-scoped fixtures of a test module are applied by a single worker.
+"""
+
+import asyncio
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import pathlib
+import re
+import subprocess
+import tempfile
+import threading
+from collections.abc import AsyncGenerator, Callable, Generator, Iterable, Mapping
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import AbstractContextManager, ExitStack, asynccontextmanager, contextmanager, suppress
+from dataclasses import dataclass, field
+from typing import Any, cast
+
+from .cassettes import RECORD, REPLAY, TOFU_CASSETTE, TOFU_OUTPUT_METHOD, cassette, cassette_mode, fixture_key
+from .tofu_resource_timings import record_timings
+from .tofu_tracing import TRACER
+
+DEFAULT_MAX_WORKERS = 4
+# Allow for long lines, such as single-line JSON outputs, when streaming tofu output.
+STREAM_LIMIT = 2**20
+# The exit code of tofu plan -detailed-exitcode when the plan contains changes.
+PLAN_HAS_CHANGES = 2
+LOCAL_MODULE_SOURCE = re.compile(r'^\s*source\s*=\s*"(\.{1,2}/[^"]*)"', re.MULTILINE)
+DEFAULT_WORKSPACE = "default"
+DEFAULT_WORKER = "main"
+INIT_LOCK_FILE = ".init.lock"
+
+logger = logging.getLogger(__name__)
+
+
+def skip_destroy_phase() -> bool:
+    """Determine if tofu destroy phase should be skipped for successful fixtures."""
+    return os.getenv("TEST_SKIP_DESTROY_PHASE", "False").lower() in ["true", "t", "yes", "y", "1"]
+
+
+def reuse_workspaces() -> bool:
+    """Determine if apply should be skipped for workspaces whose state already matches the sources and tfvars."""
+    return os.getenv("TEST_TF_REUSE_WORKSPACES", "False").lower() in ["true", "t", "yes", "y", "1"]
+
+
+def max_workers() -> int:
+    """Return the maximum number of tofu fixtures that can be applied or destroyed at the same time.
+
+    Preference will be given to the environment variable TEST_TF_MAX_WORKERS with fallback to 4.
+    """
+    raw = os.getenv("TEST_TF_MAX_WORKERS", "")
+    if raw.strip():
+        workers = int(raw.strip())
+        assert workers > 0, "TEST_TF_MAX_WORKERS must be a positive integer"
+        return workers
+    return DEFAULT_MAX_WORKERS
+
+
+def worker_id() -> str:
+    """Return the name of the pytest-xdist worker running this process, or main if tests are not distributed."""
+    return os.getenv("PYTEST_XDIST_WORKER", "").strip() or DEFAULT_WORKER
+
+
+def data_dir(fixture: pathlib.Path) -> pathlib.Path:
+    """Return the tofu data directory of this worker in the fixture directory.
+
+    NOTE: The data directory holds the installed modules and providers, and the workspace selected by tofu workspace
+    select, so each worker initialises its own rather than sharing .terraform with every other worker.
+    """
+    return fixture.resolve().joinpath(".terraform", "workers", worker_id())
+
+
+async def run_tofu(
+    tf_command: str,
+    fixture: pathlib.Path,
+    *args: str,
+    env: Mapping[str, str] | None = None,
+    prefix: str | None = None,
+    log_stdout: bool = True,
+    json_log: bool = False,
+) -> bytes:
+    """Execute a tofu command in the fixture directory, logging each line of stdout and stderr as it is written.
+
+    Log records are prefixed with the fixture name, or prefix if given. Return the captured stdout, raising a
+    CalledProcessError if the command fails. The command is recorded as a span named for its subcommand, with its exit
+    code and the number of bytes it wrote.
+
+    NOTE: Set log_stdout to False for commands that write sensitive values, such as tofu output. Set json_log to True
+    for commands run with -json, so that the human-readable message of each JSON UI message is logged.
+    """
+    cmd = [tf_command, f"-chdir={fixture!s}", *args]
+    if prefix is None:
+        prefix = fixture.name
+    with TRACER.span(args[0] if args else tf_command, fixture=fixture.name, command=" ".join(args[:2])) as span:
+        process = await asyncio.create_subprocess_exec(
+            *cmd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            env=env,
+            limit=STREAM_LIMIT,
+        )
+        stdout, stderr = await asyncio.gather(
+            _stream_lines(
+                cast("asyncio.StreamReader", process.stdout),
+                prefix,
+                logging.INFO if log_stdout else None,
+                json_log=json_log,
+            ),
+            _stream_lines(cast("asyncio.StreamReader", process.stderr), prefix, logging.WARNING),
+        )
+        returncode = await process.wait()
+        span.attributes.update(exit_code=returncode, stdout_bytes=len(stdout), stderr_bytes=len(stderr))
+        if returncode != 0:
+            raise subprocess.CalledProcessError(returncode=returncode, cmd=cmd, output=stdout, stderr=stderr)
+    return stdout
+
+
+async def _stream_lines(
+    stream: asyncio.StreamReader,
+    prefix: str,
+    level: int | None,
+    *,
+    json_log: bool = False,
+) -> bytes:
+    """Log each line read from the stream at level, unless level is None, and return everything that was read.
+
+    If json_log is True, JSON UI messages are logged as their message text, at WARNING for warnings and errors.
+    """
+    lines: list[bytes] = []
+    async for line in stream:
+        lines.append(line)
+        if level is not None:
+            text = line.decode(errors="replace").rstrip()
+            line_level = level
+            if json_log:
+                text, line_level = _ui_message(text, level)
+            logger.log(line_level, "[%s] %s", prefix, text)
+    return b"".join(lines)
+
+
+def _ui_message(text: str, level: int) -> tuple[str, int]:
+    """Return the message and log level of a JSON UI message, or text and level if it is not one."""
+    try:
+        message = json.loads(text)
+    except ValueError:
+        return text, level
+    if not isinstance(message, dict) or "@message" not in message:
+        return text, level
+    if message.get("@level") in ["warn", "error"]:
+        level = max(level, logging.WARNING)
+    return str(message["@message"]), level
+
+
+async def apply_or_destroy(
+    tf_command: str,
+    fixture: pathlib.Path,
+    workspace: str | None,
+    phase: str,
+    tfvar_file: str,
+    env: Mapping[str, str] | None = None,
+    prefix: str | None = None,
+) -> None:
+    """Execute tofu apply or destroy with JSON UI messages, and record how long each resource took.
+
+    Resource timings are recorded whether or not the command fails, so a slow resource that times out is still reported.
+    """
+    try:
+        output = await run_tofu(
+            tf_command,
+            fixture,
+            phase,
+            "-json",
+            "-no-color",
+            "-auto-approve",
+            f"-var-file={tfvar_file}",
+            env=env,
+            prefix=prefix,
+            json_log=True,
+        )
+    except subprocess.CalledProcessError as exc:
+        record_timings(fixture=fixture.name, workspace=workspace, phase=phase, output=exc.output or b"")
+        raise
+    record_timings(fixture=fixture.name, workspace=workspace, phase=phase, output=output)
+
+
+@asynccontextmanager
+async def hold_file_locks(*paths: pathlib.Path) -> AsyncGenerator[None, None]:
+    """Hold exclusive locks on the files, in order, without blocking the event loop while waiting for them.
+
+    NOTE: Each lock is taken on a separately opened file, so it excludes other threads as well as other processes.
+    """
+    with ExitStack() as stack:
+        with TRACER.span("lock"):
+            for path in paths:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                lock_file = stack.enter_context(path.open(mode="w"))
+                await asyncio.to_thread(fcntl.flock, lock_file, fcntl.LOCK_EX)
+                stack.callback(fcntl.flock, lock_file, fcntl.LOCK_UN)
+        yield
+
+
+def create_workspace(fixture: pathlib.Path, workspace: str | None) -> None:
+    """Create the named workspace in the fixture directory if it does not exist, without selecting it.
+
+    NOTE: A workspace of the local backend is just a directory of terraform.tfstate.d, which is all that tofu workspace
+    new creates before it selects the workspace in the data directory.
+    """
+    if workspace is None or workspace in {"", DEFAULT_WORKSPACE}:
+        return
+    fixture.joinpath("terraform.tfstate.d", workspace).mkdir(parents=True, exist_ok=True)
+
+
+def plugin_cache_dir() -> pathlib.Path:
+    """Return the provider plugin cache directory to share between all tofu commands, creating it if necessary.
+
+    Preference will be given to the environment variables TEST_TF_PLUGIN_CACHE_DIR and TF_PLUGIN_CACHE_DIR, with
+    fallback to a tofu-plugin-cache directory in the system temporary directory.
+    """
+    raw = os.getenv("TEST_TF_PLUGIN_CACHE_DIR") or os.getenv("TF_PLUGIN_CACHE_DIR")
+    if raw and raw.strip():
+        cache_dir = pathlib.Path(raw.strip())
+    else:
+        cache_dir = pathlib.Path(tempfile.gettempdir()).joinpath("tofu-plugin-cache")
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    return cache_dir.resolve()
+
+
+def tofu_env(fixture: pathlib.Path, workspace: str | None = None) -> dict[str, str]:
+    """Return the environment to use for tofu commands in a workspace of the fixture directory.
+
+    The shared provider plugin cache is enabled, and the workspace and this worker's data directory are given in the
+    environment so that no workspace has to be selected.
+    """
+    return os.environ | {
+        "TF_PLUGIN_CACHE_DIR": str(plugin_cache_dir()),
+        "TF_DATA_DIR": str(data_dir(fixture)),
+        "TF_WORKSPACE": workspace or DEFAULT_WORKSPACE,
+    }
+
+
+def lock_file_digest(fixture: pathlib.Path) -> str:
+    """Return a digest of the dependency lock file in the fixture directory, which may not exist yet."""
+    lock_file = fixture.joinpath(".terraform.lock.hcl")
+    return hashlib.sha256(lock_file.read_bytes() if lock_file.exists() else b"").hexdigest()
+
+
+def module_sources_digest(fixture: pathlib.Path) -> str:
+    """Return a digest of the tofu sources and templates of the fixture, and of every local module it calls."""
+    digest = hashlib.sha256()
+    pending = [fixture.resolve()]
+    seen: set[pathlib.Path] = set()
+    while pending:
+        module = pending.pop()
+        if module in seen:
+            continue
+        seen.add(module)
+        for path in sorted([*module.glob("*.tf"), *module.glob("templates/**/*")]):
+            if not path.is_file():
+                continue
+            content = path.read_bytes()
+            digest.update(str(path).encode())
+            digest.update(content)
+            pending.extend(
+                module.joinpath(source).resolve()
+                for source in LOCAL_MODULE_SOURCE.findall(content.decode(errors="replace"))
+            )
+    return digest.hexdigest()
+
+
+def workspace_digest(fixture: pathlib.Path, tfvars: dict[str, Any]) -> str:
+    """Return a digest of everything that determines the planned state of a fixture workspace.
+
+    NOTE: Registry modules and providers are covered by the version constraints in the sources and the lock file.
+    """
+    return hashlib.sha256(
+        json.dumps(
+            {
+                "tfvars": tfvars,
+                "sources": module_sources_digest(fixture),
+                "lock_file": lock_file_digest(fixture),
+            },
+            sort_keys=True,
+        ).encode(),
+    ).hexdigest()
+
+
+def state_digest_file(fixture: pathlib.Path, workspace: str | None) -> pathlib.Path:
+    """Return the file that records the workspace digest of the last successful apply, next to the workspace state."""
+    if workspace is None or workspace in {"", DEFAULT_WORKSPACE}:
+        return fixture.joinpath("terraform.tfstate.digest")
+    return fixture.joinpath("terraform.tfstate.d", workspace, "terraform.tfstate.digest")
+
+
+def recorded_digest(fixture: pathlib.Path, workspace: str | None) -> str | None:
+    """Return the workspace digest recorded by the last successful apply, if any."""
+    digest_file = state_digest_file(fixture, workspace)
+    if not digest_file.exists():
+        return None
+    return digest_file.read_text(encoding="utf-8").strip()
+
+
+def record_digest(fixture: pathlib.Path, workspace: str | None, digest: str | None) -> None:
+    """Record the workspace digest of a successful apply, or forget it if digest is None."""
+    digest_file = state_digest_file(fixture, workspace)
+    if digest is None:
+        digest_file.unlink(missing_ok=True)
+        return
+    digest_file.parent.mkdir(parents=True, exist_ok=True)
+    digest_file.write_text(digest, encoding="utf-8")
+
+
+@dataclass
+class InitCache:
+    """Memoise tofu init by data directory and dependency lock file digest, so init runs once per fixture and worker.
+
+    NOTE: Installing providers into a shared plugin cache, and writing the dependency lock file of a fixture directory,
+    are not safe for concurrent use, so init is serialised between threads and processes through lock files in the
+    fixture directory and the plugin cache directory.
+    """
+
+    initialised: set[tuple[pathlib.Path, str]] = field(default_factory=set)
+    runs: int = 0
+    hits: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    async def init(
+        self,
+        tf_command: str,
+        fixture: pathlib.Path,
+        env: Mapping[str, str],
+        prefix: str | None = None,
+    ) -> bool:
+        """Execute tofu init in the fixture directory unless it was already initialised with the same lock file.
+
+        Return True if tofu init was executed, False if it was skipped.
+        """
+        if self.memoised(fixture):
+            logger.debug("skipping tofu init for %s; already initialised", fixture)
+            return False
+        async with hold_file_locks(
+            fixture.joinpath(".terraform", INIT_LOCK_FILE),
+            pathlib.Path(env["TF_PLUGIN_CACHE_DIR"]).joinpath(INIT_LOCK_FILE),
+        ):
+            # Another thread may have initialised the fixture while this one waited for the locks.
+            if self.memoised(fixture):
+                logger.debug("skipping tofu init for %s; initialised while waiting", fixture)
+                return False
+            await run_tofu(tf_command, fixture, "init", "-no-color", env=env, prefix=prefix)
+            self.record(fixture)
+        return True
+
+    def memoised(self, fixture: pathlib.Path) -> bool:
+        """Return True, and count a hit, if the fixture was initialised with its current dependency lock file."""
+        key = (data_dir(fixture), lock_file_digest(fixture))
+        with self.lock:
+            if key in self.initialised and key[0].is_dir():
+                self.hits += 1
+                return True
+        return False
+
+    def record(self, fixture: pathlib.Path) -> None:
+        """Record that tofu init was executed in the fixture directory with its current dependency lock file."""
+        with self.lock:
+            self.runs += 1
+            self.initialised.add((data_dir(fixture), lock_file_digest(fixture)))
+
+
+INIT_CACHE = InitCache()
+
+
+async def _workspace_unchanged(
+    tf_command: str,
+    fixture: pathlib.Path,
+    workspace: str | None,
+    digest: str,
+    tfvar_file: str,
+    env: Mapping[str, str],
+    prefix: str,
+) -> bool:
+    """Return True if the workspace was applied with the same digest and a cheap plan shows no changes."""
+    if recorded_digest(fixture, workspace) != digest:
+        return False
+    try:
+        await run_tofu(
+            tf_command,
+            fixture,
+            "plan",
+            "-no-color",
+            "-input=false",
+            "-refresh=false",
+            "-detailed-exitcode",
+            f"-var-file={tfvar_file}",
+            env=env,
+            prefix=prefix,
+        )
+    except subprocess.CalledProcessError as exc:
+        if exc.returncode == PLAN_HAS_CHANGES:
+            return False
+        raise
+    return True
+
+
+@asynccontextmanager
+async def tofu_lifecycle(
+    fixture: pathlib.Path,
+    workspace: str | None,
+    tfvars: dict[str, Any] | None,
+) -> AsyncGenerator[dict[str, Any], None]:
+    """Execute tofu init/apply/destroy lifecycle for a fixture in an optional workspace, yielding the output post-apply.
+
+    The workspace is never selected; it is given to each tofu command in TF_WORKSPACE, with a data directory private to
+    this worker in TF_DATA_DIR, so any number of workspaces of the same fixture can be used at the same time by threads
+    and pytest-xdist workers. Output from tofu is logged as it is written, prefixed with the fixture name and workspace,
+    so many lifecycles can be run concurrently from one event loop.
+
+    If TEST_TF_REUSE_WORKSPACES is set, apply is skipped when the digest of sources, tfvars and lock file recorded by
+    the last successful apply is unchanged and a plan without refresh reports no changes. Combine with
+    TEST_SKIP_DESTROY_PHASE to iterate on assertions against existing resources.
+
+    Provisioning and teardown are recorded as spans, with a child span for each tofu command and wait for the init
+    locks.
+
+    NOTE: Resources will not be destroyed if the test case raises an error.
+    """
+    if tfvars is None:
+        tfvars = {}
+    tf_command = os.getenv("TEST_TF_COMMAND", "tofu")
+    env = tofu_env(fixture, workspace)
+    prefix = f"{fixture.name}:{workspace or DEFAULT_WORKSPACE}"
+    with tempfile.NamedTemporaryFile(
+        mode="w",
+        prefix="tfvars",
+        suffix=".json",
+        encoding="utf-8",
+        delete_on_close=False,
+        delete=True,
+    ) as tfvar_file:
+        json.dump(tfvars, tfvar_file, ensure_ascii=False, indent=2)
+        tfvar_file.close()
+        with TRACER.span("provision", fixture=fixture.name, workspace=workspace or DEFAULT_WORKSPACE):
+            create_workspace(fixture, workspace)
+            await INIT_CACHE.init(tf_command=tf_command, fixture=fixture, env=env, prefix=prefix)
+            digest = workspace_digest(fixture, tfvars)
+            if reuse_workspaces() and await _workspace_unchanged(
+                tf_command=tf_command,
+                fixture=fixture,
+                workspace=workspace,
+                digest=digest,
+                tfvar_file=tfvar_file.name,
+                env=env,
+                prefix=prefix,
+            ):
+                logger.info("[%s] reusing workspace; state matches sources and tfvars", prefix)
+            else:
+                record_digest(fixture, workspace, None)
+                await apply_or_destroy(
+                    tf_command,
+                    fixture,
+                    workspace,
+                    "apply",
+                    tfvar_file=tfvar_file.name,
+                    env=env,
+                    prefix=prefix,
+                )
+                record_digest(fixture, workspace, digest)
+            output = await run_tofu(
+                tf_command,
+                fixture,
+                "output",
+                "-no-color",
+                "-json",
+                env=env,
+                prefix=prefix,
+                log_stdout=False,
+            )
+        yield {k: v["value"] for k, v in json.loads(output).items()}
+        if not skip_destroy_phase():
+            with TRACER.span("teardown", fixture=fixture.name, workspace=workspace or DEFAULT_WORKSPACE):
+                record_digest(fixture, workspace, None)
+                await apply_or_destroy(
+                    tf_command,
+                    fixture,
+                    workspace,
+                    "destroy",
+                    tfvar_file=tfvar_file.name,
+                    env=env,
+                    prefix=prefix,
+                )
+
+
+@contextmanager
+def run_tofu_in_workspace(
+    fixture: pathlib.Path,
+    workspace: str | None,
+    tfvars: dict[str, Any] | None,
+) -> Generator[dict[str, Any], None, None]:
+    """Execute tofu init/apply/destroy lifecycle for a fixture in an optional workspace, yielding the output post-apply.
+
+    This is a synchronous wrapper around tofu_lifecycle that runs it in a private event loop, which may be exited from a
+    different thread to the one that entered it.
+
+    NOTE: Resources will not be destroyed if the test case raises an error. When replaying cassettes, the recorded
+    output is yielded and tofu is not executed.
+    """
+    mode = cassette_mode()
+    if mode == REPLAY:
+        yield cassette(TOFU_CASSETTE).play(method=TOFU_OUTPUT_METHOD, key=fixture_key(fixture, tfvars))
+        return
+    with asyncio.Runner(loop_factory=asyncio.new_event_loop) as runner:
+        lifecycle = tofu_lifecycle(fixture=fixture, workspace=workspace, tfvars=tfvars)
+        output = runner.run(lifecycle.__aenter__())
+        if mode == RECORD:
+            cassette(TOFU_CASSETTE).record(method=TOFU_OUTPUT_METHOD, key=fixture_key(fixture, tfvars), response=output)
+        try:
+            yield output
+        except BaseException as exc:
+            if not runner.run(lifecycle.__aexit__(type(exc), exc, exc.__traceback__)):
+                raise
+        else:
+            runner.run(lifecycle.__aexit__(None, None, None))
+
+
+async def tofu_test_plan(
+    fixture: pathlib.Path,
+    tfvars: dict[str, Any] | None,
+    run: str = "plan",
+) -> dict[str, Any]:
+    """Execute tofu test for the fixture and return the JSON plan of the named run block.
+
+    The fixture is expected to contain a test file that mocks the Google providers and has a run block that only plans,
+    so that no cloud resources or credentials are needed.
+    """
+    if tfvars is None:
+        tfvars = {}
+    tf_command = os.getenv("TEST_TF_COMMAND", "tofu")
+    env = tofu_env(fixture)
+    prefix = f"{fixture.name}:test"
+    with tempfile.NamedTemporaryFile(
+        mode="w",
+        prefix="tfvars",
+        suffix=".json",
+        encoding="utf-8",
+        delete_on_close=False,
+        delete=True,
+    ) as tfvar_file:
+        json.dump(tfvars, tfvar_file, ensure_ascii=False, indent=2)
+        tfvar_file.close()
+        with TRACER.span("plan", fixture=fixture.name, workspace="test"):
+            await INIT_CACHE.init(tf_command=tf_command, fixture=fixture, env=env, prefix=prefix)
+            output = await run_tofu(
+                tf_command,
+                fixture,
+                "test",
+                "-json",
+                "-verbose",
+                f"-var-file={tfvar_file.name}",
+                env=env,
+                prefix=prefix,
+                log_stdout=False,
+            )
+    for line in output.splitlines():
+        message = json.loads(line)
+        if message.get("type") == "test_plan" and message.get("@testrun") == run:
+            return cast("dict[str, Any]", message["test_plan"])
+    msg = f"tofu test did not report a plan for run {run} in {fixture}"
+    raise ValueError(msg)
+
+
+TfvarsFactory = Callable[[Mapping[str, dict[str, Any]]], dict[str, Any]]
+
+
+@dataclass(frozen=True)
+class FixtureSpec:
+    """Describe a tofu fixture to provision as a node in a dependency graph.
+
+    If tfvars is a callable it will be invoked with the outputs of the fixtures named in depends_on, once they have all
+    been applied, and must return the tfvars to use for this fixture. If shared is True the fixture will be leased from
+    a FixtureRegistry, which chooses the workspace, and may be shared with other consumers requesting the same tfvars.
+    """
+
+    name: str
+    fixture: pathlib.Path
+    workspace: str | None
+    tfvars: dict[str, Any] | TfvarsFactory | None = None
+    depends_on: tuple[str, ...] = ()
+    shared: bool = False
+
+    def resolve_tfvars(self, outputs: Mapping[str, dict[str, Any]]) -> dict[str, Any] | None:
+        """Return the tfvars for this fixture, building them from dependency outputs if necessary."""
+        if callable(self.tfvars):
+            return self.tfvars({name: outputs[name] for name in self.depends_on})
+        return self.tfvars
+
+
+def _validate_graph(specs: Mapping[str, FixtureSpec], registry: "FixtureRegistry | None") -> None:
+    """Raise a ValueError if the fixture specs do not form a valid dependency graph."""
+    for spec in specs.values():
+        if spec.shared and registry is None:
+            msg = f"fixture {spec.name} is shared but no registry was provided"
+            raise ValueError(msg)
+        for dependency in spec.depends_on:
+            if dependency not in specs:
+                msg = f"fixture {spec.name} depends on unknown fixture {dependency}"
+                raise ValueError(msg)
+            # NOTE: A shared fixture can outlive this graph, so it cannot depend on a fixture that will be destroyed
+            # when this graph is torn down.
+            if spec.shared and not specs[dependency].shared:
+                msg = f"shared fixture {spec.name} cannot depend on unshared fixture {dependency}"
+                raise ValueError(msg)
+    ordered = _topological_order(specs)
+    if len(ordered) != len(specs):
+        msg = f"fixture dependency graph has a cycle between {sorted(set(specs) - set(ordered))}"
+        raise ValueError(msg)
+
+
+def _topological_order(specs: Mapping[str, FixtureSpec]) -> list[str]:
+    """Return the names of fixtures in an order where every fixture follows its dependencies; cycles are omitted."""
+    order: list[str] = []
+    remaining = dict(specs)
+    while remaining:
+        ready = [name for name, spec in remaining.items() if all(dep in order for dep in spec.depends_on)]
+        if not ready:
+            break
+        for name in ready:
+            order.append(name)
+            del remaining[name]
+    return order
+
+
+def _run_graph(
+    executor: ThreadPoolExecutor,
+    names: Iterable[str],
+    blockers: Mapping[str, set[str]],
+    task: Callable[[str], None],
+) -> list[BaseException]:
+    """Execute task for each name once all of its blockers have completed, returning any raised exceptions.
+
+    Names that are blocked by a failed task are not executed.
+    """
+    pending = set(names)
+    completed: set[str] = set()
+    running: dict[Future[None], str] = {}
+    errors: list[BaseException] = []
+    while pending or running:
+        if not errors:
+            for name in sorted(pending):
+                if blockers[name] <= completed:
+                    running[executor.submit(task, name)] = name
+                    pending.discard(name)
+        if not running:
+            break
+        done, _ = wait(running, return_when=FIRST_COMPLETED)
+        for future in done:
+            name = running.pop(future)
+            error = future.exception()
+            if error is not None:
+                logger.error("tofu fixture %s failed: %s", name, error)
+                errors.append(error)
+            else:
+                completed.add(name)
+    return errors
+
+
+class _KeepResources(Exception):  # noqa: N818
+    """Raised into a fixture lifecycle to end it without destroying its resources."""
+
+
+def _end_lifecycle(lifecycle: AbstractContextManager[dict[str, Any]], *, keep: bool) -> None:
+    """End a fixture lifecycle, destroying its resources unless keep is True.
+
+    NOTE: A lifecycle keeps its resources when its consumer raises, so keep is signalled with a private exception that
+    is discarded here. The exception of a consumer is never raised into a lifecycle, so the engine does not log it as a
+    failed fixture or raise it again when the fixture is torn down.
+    """
+    if not keep:
+        lifecycle.__exit__(None, None, None)
+        return
+    with suppress(_KeepResources):
+        lifecycle.__exit__(_KeepResources, _KeepResources(), None)
+
+
+@dataclass
+class _SharedFixture:
+    """Track the lifecycle and consumers of a fixture applied by a FixtureRegistry."""
+
+    key: str
+    requires: frozenset[str]
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    lifecycle: AbstractContextManager[dict[str, Any]] | None = None
+    output: dict[str, Any] | None = None
+    references: int = 0
+    leases: int = 0
+    keep: bool = False
+
+
+class FixtureRegistry:
+    """Share applied tofu fixtures between every consumer requesting the same fixture directory and tfvars.
+
+    Each distinct (fixture, tfvars) pair is applied once, in a workspace named from a digest of the pair, the first time
+    it is leased. The fixture is reference-counted while leased, and destroyed once when the registry is closed after
+    the last consumer has released it.
+    """
+
+    def __init__(self, workers: int | None = None) -> None:
+        """Initialise an empty registry that will destroy fixtures on a pool of at most workers threads."""
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._fixtures: dict[str, _SharedFixture] = {}
+
+    @staticmethod
+    def key(fixture: pathlib.Path, tfvars: dict[str, Any] | None) -> str:
+        """Return the content address of the fixture directory and tfvars pair."""
+        content = json.dumps({"fixture": str(fixture.resolve()), "tfvars": tfvars or {}}, sort_keys=True)
+        return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def workspace(key: str) -> str:
+        """Return the name of the workspace used for the shared fixture with key."""
+        return f"shared-{key[:16]}"
+
+    def references(self, key: str) -> int:
+        """Return the number of consumers currently leasing the shared fixture with key."""
+        with self._lock:
+            shared = self._fixtures.get(key)
+            return shared.references if shared else 0
+
+    @contextmanager
+    def lease(
+        self,
+        fixture: pathlib.Path,
+        tfvars: dict[str, Any] | None,
+        requires: Iterable[str] = (),
+    ) -> Generator[dict[str, Any], None, None]:
+        """Yield the output of the shared fixture, applying it if this is the first lease.
+
+        The optional requires parameter lists the keys of shared fixtures that this fixture depends on; those will not
+        be destroyed until this fixture has been destroyed.
+        """
+        key = self.key(fixture=fixture, tfvars=tfvars)
+        with self._lock:
+            shared = self._fixtures.setdefault(key, _SharedFixture(key=key, requires=frozenset(requires)))
+            shared.references += 1
+        try:
+            with shared.lock:
+                if shared.lifecycle is None:
+                    lifecycle = run_tofu_in_workspace(fixture=fixture, workspace=self.workspace(key), tfvars=tfvars)
+                    shared.output = lifecycle.__enter__()
+                    shared.lifecycle = lifecycle
+                shared.leases += 1
+                output = cast("dict[str, Any]", shared.output)
+            try:
+                yield output
+            except BaseException:
+                # Keep the resources of a shared fixture if any consumer fails, like run_tofu_in_workspace.
+                shared.keep = True
+                raise
+        finally:
+            with self._lock:
+                shared.references -= 1
+
+    def close(self) -> None:
+        """Destroy every applied shared fixture, after the fixtures that depend on it have been destroyed.
+
+        Fixtures that are still leased, and the fixtures they require, are kept in the registry so a later close can
+        destroy them; every other fixture is destroyed before a RuntimeError naming the leased fixtures is raised.
+        """
+        with self._lock:
+            applied = {key: shared for key, shared in self._fixtures.items() if shared.lifecycle is not None}
+            leased = sorted(key for key, shared in applied.items() if shared.references > 0)
+            kept: set[str] = set()
+            pending = list(leased)
+            while pending:
+                key = pending.pop()
+                if key not in kept:
+                    kept.add(key)
+                    pending.extend(applied[key].requires if key in applied else ())
+            fixtures = {key: shared for key, shared in applied.items() if key not in kept}
+            self._fixtures = {key: shared for key, shared in self._fixtures.items() if key in kept}
+        dependents = {key: {other for other, shared in fixtures.items() if key in shared.requires} for key in fixtures}
+
+        def _destroy(key: str) -> None:
+            shared = fixtures[key]
+            logger.info("destroying shared fixture %s after %d leases", self.workspace(key), shared.leases)
+            _end_lifecycle(cast("AbstractContextManager[dict[str, Any]]", shared.lifecycle), keep=shared.keep)
+
+        with ThreadPoolExecutor(max_workers=self.workers or max_workers(), thread_name_prefix="tofu") as executor:
+            errors = _run_graph(executor=executor, names=fixtures, blockers=dependents, task=_destroy)
+        if leased:
+            msg = f"shared fixtures {leased} are still leased"
+            raise RuntimeError(msg) from (errors[0] if errors else None)
+        if errors:
+            raise errors[0]
+
+
+@contextmanager
+def provision_fixtures(
+    specs: Iterable[FixtureSpec],
+    workers: int | None = None,
+    registry: FixtureRegistry | None = None,
+) -> Generator[dict[str, dict[str, Any]], None, None]:
+    """Apply a dependency graph of tofu fixtures on a bounded worker pool, yielding the outputs keyed by fixture name.
+
+    Fixtures are applied as soon as all of their dependencies have been applied, and destroyed as soon as all of their
+    dependents have been destroyed, so independent fixtures are applied and destroyed at the same time. If any fixture
+    fails to apply, the fixtures that were successfully applied are destroyed before the error is raised. Shared
+    fixtures are leased from the registry, and released rather than destroyed.
+
+    NOTE: Resources will not be destroyed if the test case raises an error.
+    """
+    graph = {spec.name: spec for spec in specs}
+    _validate_graph(graph, registry)
+    dependencies = {name: set(spec.depends_on) for name, spec in graph.items()}
+    dependents: dict[str, set[str]] = {name: set() for name in graph}
+    for name, spec in graph.items():
+        for dependency in spec.depends_on:
+            dependents[dependency].add(name)
+    outputs: dict[str, dict[str, Any]] = {}
+    keys: dict[str, str] = {}
+    lifecycles: dict[str, AbstractContextManager[dict[str, Any]]] = {}
+
+    def _apply(name: str) -> None:
+        spec = graph[name]
+        tfvars = spec.resolve_tfvars(outputs)
+        if spec.shared:
+            keys[name] = FixtureRegistry.key(fixture=spec.fixture, tfvars=tfvars)
+            lifecycle = cast("FixtureRegistry", registry).lease(
+                fixture=spec.fixture,
+                tfvars=tfvars,
+                requires=[keys[dependency] for dependency in spec.depends_on],
+            )
+        else:
+            lifecycle = run_tofu_in_workspace(fixture=spec.fixture, workspace=spec.workspace, tfvars=tfvars)
+        outputs[name] = lifecycle.__enter__()
+        lifecycles[name] = lifecycle
+
+    def _destroyer(*, keep: bool) -> Callable[[str], None]:
+        def _destroy(name: str) -> None:
+            _end_lifecycle(lifecycles[name], keep=keep)
+
+        return _destroy
+
+    with ThreadPoolExecutor(max_workers=workers or max_workers(), thread_name_prefix="tofu") as executor:
+        errors = _run_graph(executor=executor, names=graph, blockers=dependencies, task=_apply)
+        if errors:
+            _run_graph(
+                executor=executor,
+                names=lifecycles,
+                blockers={name: dependents[name] & set(lifecycles) for name in lifecycles},
+                task=_destroyer(keep=False),
+            )
+            raise errors[0]
+        try:
+            yield outputs
+        except BaseException:
+            _run_graph(executor=executor, names=lifecycles, blockers=dependents, task=_destroyer(keep=True))
+            raise
+        errors = _run_graph(executor=executor, names=lifecycles, blockers=dependents, task=_destroyer(keep=False))
+        if errors:
+            raise errors[0]
@@ -0,0 +1,170 @@
+"""Break down tofu apply and destroy time by resource, from the machine-readable UI messages written by -json.
+
+NOTE: Each apply_start message is paired with the apply_complete or apply_errored message of the same resource address,
+and the latency is taken from their timestamps, falling back to the whole seconds reported by tofu. A resource that
+never completes, because tofu was interrupted, is reported as incomplete with the time until the last message. The
+table for each fixture is logged, and is also written to the directory named by the environment variable
+TEST_TF_TIMINGS_DIR when it is set, together with a JSON Lines history of every run that the table is compared against.
+"""
+
+import datetime as dt
+import json
+import logging
+import os
+import pathlib
+import statistics
+from collections.abc import Iterable
+from dataclasses import asdict, dataclass
+from typing import Any
+
+COMPLETE = "complete"
+ERRORED = "errored"
+INCOMPLETE = "incomplete"
+HISTORY_FILE = "history.jsonl"
+# Report a resource as slower than usual when it takes this many times its median latency in the history.
+REGRESSION_FACTOR = 1.5
+
+logger = logging.getLogger(__name__)
+
+
+def timings_dir() -> pathlib.Path | None:
+    """Return the directory where latency tables and their history are written, if TEST_TF_TIMINGS_DIR is set."""
+    raw = os.getenv("TEST_TF_TIMINGS_DIR", "").strip()
+    if not raw:
+        return None
+    return pathlib.Path(raw).resolve()
+
+
+@dataclass(frozen=True)
+class ResourceTiming:
+    """The time tofu spent on one action for one resource instance."""
+
+    address: str
+    action: str
+    elapsed_seconds: float
+    status: str = COMPLETE
+
+
+def _timestamp(message: dict[str, Any]) -> dt.datetime | None:
+    """Return the timestamp of a UI message, if it has one."""
+    raw = message.get("@timestamp")
+    if not raw:
+        return None
+    return dt.datetime.fromisoformat(raw)
+
+
+def parse_ui_messages(output: bytes) -> list[ResourceTiming]:
+    """Return the timing of every resource action reported in the JSON UI messages of a tofu apply or destroy.
+
+    Lines that are not JSON objects are ignored. Timings are in the order the actions started.
+    """
+    started: dict[str, tuple[str, dt.datetime | None]] = {}
+    finished: dict[str, ResourceTiming] = {}
+    last: dt.datetime | None = None
+    for line in output.splitlines():
+        try:
+            message = json.loads(line)
+        except ValueError:
+            continue
+        if not isinstance(message, dict):
+            continue
+        timestamp = _timestamp(message)
+        last = timestamp or last
+        hook = message.get("hook") or {}
+        address = (hook.get("resource") or {}).get("addr")
+        match message.get("type"):
+            case "apply_start" if address:
+                started[address] = (hook.get("action", ""), timestamp)
+            case ("apply_complete" | "apply_errored") as kind if address:
+                action, start = started.get(address, (hook.get("action", ""), None))
+                elapsed = float(hook.get("elapsed_seconds", 0))
+                if start is not None and timestamp is not None:
+                    elapsed = (timestamp - start).total_seconds()
+                status = COMPLETE if kind == "apply_complete" else ERRORED
+                finished[address] = ResourceTiming(address, action, elapsed, status)
+            case _:
+                pass
+    timings: list[ResourceTiming] = []
+    for address, (action, start) in started.items():
+        timing = finished.get(address)
+        if timing is None:
+            elapsed = (last - start).total_seconds() if start is not None and last is not None else 0.0
+            timing = ResourceTiming(address, action, elapsed, INCOMPLETE)
+        timings.append(timing)
+    return timings
+
+
+def read_history(path: pathlib.Path) -> list[dict[str, Any]]:
+    """Return the records of a timings history file, or an empty list if it does not exist."""
+    if not path.exists():
+        return []
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines() if line.strip()]
+
+
+def history_medians(history: Iterable[dict[str, Any]], fixture: str, phase: str) -> dict[tuple[str, str], float]:
+    """Return the median latency of each completed (address, action) of fixture and phase in the history."""
+    samples: dict[tuple[str, str], list[float]] = {}
+    for record in history:
+        if record["fixture"] == fixture and record["phase"] == phase and record["status"] == COMPLETE:
+            samples.setdefault((record["address"], record["action"]), []).append(record["elapsed_seconds"])
+    return {key: statistics.median(values) for key, values in samples.items()}
+
+
+def format_table(
+    fixture: str,
+    phase: str,
+    timings: Iterable[ResourceTiming],
+    medians: dict[tuple[str, str], float] | None = None,
+) -> str:
+    """Return a plain-text table of the timings, slowest first, compared with the medians of earlier runs if given."""
+    medians = medians or {}
+    rows = [("seconds", "median", "action", "status", "address")]
+    for timing in sorted(timings, key=lambda t: (-t.elapsed_seconds, t.address)):
+        median = medians.get((timing.address, timing.action))
+        flag = " !" if median and timing.elapsed_seconds > median * REGRESSION_FACTOR else ""
+        rows.append(
+            (
+                f"{timing.elapsed_seconds:.1f}{flag}",
+                "-" if median is None else f"{median:.1f}",
+                timing.action,
+                timing.status,
+                timing.address,
+            ),
+        )
+    widths = [max(len(row[column]) for row in rows) for column in range(len(rows[0]) - 1)]
+    lines = [f"{fixture} {phase}"]
+    lines.extend("  ".join([*(cell.rjust(w) for cell, w in zip(row, widths, strict=False)), row[-1]]) for row in rows)
+    return "\n".join(lines) + "\n"
+
+
+def record_timings(
+    fixture: str,
+    workspace: str | None,
+    phase: str,
+    output: bytes,
+    directory: pathlib.Path | None = None,
+) -> list[ResourceTiming]:
+    """Parse the resource timings of a tofu apply or destroy, then log them as a table and return them.
+
+    If directory is given, or TEST_TF_TIMINGS_DIR is set, the table is written there, compared against the history of
+    earlier runs of the same fixture, and the timings are appended to the history.
+    """
+    timings = parse_ui_messages(output)
+    if not timings:
+        return timings
+    name = f"{fixture}:{workspace or 'default'}"
+    directory = directory or timings_dir()
+    if directory is None:
+        logger.info("resource timings\n%s", format_table(name, phase, timings))
+        return timings
+    directory.mkdir(parents=True, exist_ok=True)
+    history_file = directory / HISTORY_FILE
+    table = format_table(name, phase, timings, history_medians(read_history(history_file), fixture, phase))
+    logger.info("resource timings\n%s", table)
+    directory.joinpath(f"{fixture}-{workspace or 'default'}-{phase}.txt").write_text(table, encoding="utf-8")
+    recorded_at = dt.datetime.now(tz=dt.UTC).isoformat()
+    with history_file.open(mode="a", encoding="utf-8") as history:
+        for timing in timings:
+            record = {"recorded_at": recorded_at, "fixture": fixture, "workspace": workspace, "phase": phase}
+            history.write(json.dumps(record | asdict(timing)) + "\n")
+    return timings
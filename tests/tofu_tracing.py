@@ -0,0 +1,224 @@
+"""Record the lifecycle phases of tofu fixtures as spans, and export them as OpenTelemetry JSON or a Chrome trace.
+
+NOTE: Spans are always recorded in memory; set the environment variable TEST_TF_TRACE to a file path to write them at
+the end of the session, and TEST_TF_TRACE_FORMAT to otel or chrome to choose the format. The OpenTelemetry export uses
+the OTLP/JSON encoding of an ExportTraceServiceRequest, and the Chrome export can be opened with Perfetto or
+chrome://tracing. Each root span, such as the provisioning of one fixture, and its descendants are drawn on their own
+track so that fixtures driven concurrently from one thread do not overlap in the flame chart.
+"""
+
+import contextvars
+import itertools
+import json
+import os
+import pathlib
+import secrets
+import threading
+import time
+from collections.abc import Generator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any
+
+OTEL = "otel"
+CHROME = "chrome"
+DEFAULT_TRACE_FORMAT = CHROME
+SERVICE_NAME = "terraform-google-private-gke-cluster-tests"
+SCOPE_NAME = "tests.tofu_tracing"
+# Attributes that a span copies from its parent unless it sets them itself.
+INHERITED_ATTRIBUTES = ("fixture", "workspace")
+
+
+def trace_file(worker: str | None = None) -> pathlib.Path | None:
+    """Return the file where spans are written at the end of the session, if TEST_TF_TRACE is set.
+
+    If the name of a pytest-xdist worker is given, it is added to the file name so each worker writes its own trace.
+    """
+    raw = os.getenv("TEST_TF_TRACE", "").strip()
+    if not raw:
+        return None
+    path = pathlib.Path(raw).resolve()
+    if worker:
+        path = path.with_name(f"{path.stem}-{worker}{path.suffix}")
+    return path
+
+
+def trace_format() -> str:
+    """Return the format of the trace file.
+
+    Preference will be given to the environment variable TEST_TF_TRACE_FORMAT with fallback to chrome.
+    """
+    trace_format = os.getenv("TEST_TF_TRACE_FORMAT", "").strip().lower() or DEFAULT_TRACE_FORMAT
+    assert trace_format in [OTEL, CHROME], "TEST_TF_TRACE_FORMAT must be one of otel or chrome"
+    return trace_format
+
+
+@dataclass
+class Span:
+    """A timed operation, with attributes that may be added until it ends."""
+
+    name: str
+    span_id: str
+    parent_id: str | None
+    track: int
+    start_ns: int
+    end_ns: int | None = None
+    attributes: dict[str, Any] = field(default_factory=dict)
+    error: str | None = None
+
+    @property
+    def duration_ns(self) -> int:
+        """Return the duration of the span, or the time since it started if it has not ended."""
+        return (self.end_ns or time.time_ns()) - self.start_ns
+
+
+@dataclass
+class Tracer:
+    """Record spans for a session, tracking the current span of each thread and asyncio task."""
+
+    trace_id: str = field(default_factory=lambda: secrets.token_hex(16))
+    spans: list[Span] = field(default_factory=list)
+    lock: threading.Lock = field(default_factory=threading.Lock)
+    tracks: itertools.count = field(default_factory=lambda: itertools.count(1))
+    current: contextvars.ContextVar[Span | None] = field(
+        default_factory=lambda: contextvars.ContextVar("current_span", default=None),
+    )
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Generator[Span, None, None]:  # noqa: ANN401
+        """Record the enclosed block as a span that is a child of the current span, yielding it for more attributes.
+
+        An exception raised by the block is recorded as the error of the span and re-raised.
+        """
+        parent = self.current.get()
+        if parent is None:
+            inherited = {}
+            track = next(self.tracks)
+        else:
+            inherited = {k: parent.attributes[k] for k in INHERITED_ATTRIBUTES if k in parent.attributes}
+            track = parent.track
+        span = Span(
+            name=name,
+            span_id=secrets.token_hex(8),
+            parent_id=parent.span_id if parent else None,
+            track=track,
+            start_ns=time.time_ns(),
+            attributes=inherited | attributes,
+        )
+        token = self.current.set(span)
+        try:
+            yield span
+        except BaseException as exc:
+            span.error = f"{type(exc).__name__}: {exc}"
+            raise
+        finally:
+            span.end_ns = time.time_ns()
+            self.current.reset(token)
+            with self.lock:
+                self.spans.append(span)
+
+    def finished(self) -> list[Span]:
+        """Return the spans that have ended, in order of their start time."""
+        with self.lock:
+            return sorted(self.spans, key=lambda span: span.start_ns)
+
+    def otel_json(self) -> dict[str, Any]:
+        """Return the finished spans as an OTLP/JSON ExportTraceServiceRequest."""
+        return {
+            "resourceSpans": [
+                {
+                    "resource": {"attributes": _otel_attributes({"service.name": SERVICE_NAME})},
+                    "scopeSpans": [
+                        {
+                            "scope": {"name": SCOPE_NAME},
+                            "spans": [self._otel_span(span) for span in self.finished()],
+                        },
+                    ],
+                },
+            ],
+        }
+
+    def _otel_span(self, span: Span) -> dict[str, Any]:
+        """Return the OTLP/JSON encoding of span."""
+        encoded: dict[str, Any] = {
+            "traceId": self.trace_id,
+            "spanId": span.span_id,
+            "name": span.name,
+            # SPAN_KIND_INTERNAL
+            "kind": 1,
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.end_ns),
+            "attributes": _otel_attributes(span.attributes),
+            # STATUS_CODE_ERROR or STATUS_CODE_OK
+            "status": {"code": 2, "message": span.error} if span.error else {"code": 1},
+        }
+        if span.parent_id:
+            encoded["parentSpanId"] = span.parent_id
+        return encoded
+
+    def chrome_trace(self) -> dict[str, Any]:
+        """Return the finished spans as complete events of a Chrome trace, with one thread per track."""
+        pid = os.getpid()
+        events: list[dict[str, Any]] = [
+            {"name": "process_name", "ph": "M", "pid": pid, "tid": 0, "args": {"name": SERVICE_NAME}},
+        ]
+        for span in self.finished():
+            args = dict(span.attributes)
+            if span.error:
+                args["error"] = span.error
+            if span.parent_id is None:
+                label = " ".join(str(span.attributes[k]) for k in INHERITED_ATTRIBUTES if k in span.attributes)
+                events.append(
+                    {
+                        "name": "thread_name",
+                        "ph": "M",
+                        "pid": pid,
+                        "tid": span.track,
+                        "args": {"name": label or span.name},
+                    },
+                )
+            events.append(
+                {
+                    "name": span.name,
+                    "cat": "tofu",
+                    "ph": "X",
+                    "ts": span.start_ns / 1000,
+                    "dur": span.duration_ns / 1000,
+                    "pid": pid,
+                    "tid": span.track,
+                    "args": args,
+                },
+            )
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def export(self, path: pathlib.Path, trace_format: str = DEFAULT_TRACE_FORMAT) -> None:
+        """Write the finished spans to path in the chosen format."""
+        match trace_format:
+            case "otel":
+                document = self.otel_json()
+            case "chrome":
+                document = self.chrome_trace()
+            case _:
+                msg = f"unsupported trace format: {trace_format}"
+                raise ValueError(msg)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(document, default=str), encoding="utf-8")
+
+
+def _otel_attributes(attributes: dict[str, Any]) -> list[dict[str, Any]]:
+    """Return attributes as OTLP/JSON key-value pairs; integers are encoded as strings, as OTLP/JSON requires."""
+    encoded: list[dict[str, Any]] = []
+    for key, value in attributes.items():
+        if isinstance(value, bool):
+            typed = {"boolValue": value}
+        elif isinstance(value, int):
+            typed = {"intValue": str(value)}
+        elif isinstance(value, float):
+            typed = {"doubleValue": value}
+        else:
+            typed = {"stringValue": str(value)}
+        encoded.append({"key": key, "value": typed})
+    return encoded
+
+
+TRACER = Tracer()
@@ -0,0 +1,621 @@
+"""Translate tofu JSON plans and state of the cluster fixtures to GKE Cluster and NodePool messages.
+
+The translated messages can be verified with the same GKE assertions as a Cluster returned by the API, without making an
+API request.
+
+NOTE: Only attributes that are known to tofu are translated; anything computed by the provider or API that is not in the
+plan or state is left at the protobuf default, so a planned cluster can only be verified with the assertions that depend
+on module configuration.
+"""
+
+import datetime as dt
+from collections.abc import Callable, Generator, Iterable, Mapping
+from dataclasses import dataclass, field
+from typing import Any
+
+from google.cloud import container_v1
+
+Converter = Callable[[Any], Any]
+Attributes = Mapping[str, str | tuple[str, Converter]]
+
+
+@dataclass(frozen=True)
+class Block:
+    """Describe how to translate the values of a tofu resource or nested block to a protobuf message.
+
+    Attributes map a tofu attribute name to the message field to set, optionally with a converter for the value. Blocks
+    and repeated_blocks map the name of a nested block to the message field to set and the Block to translate it with.
+    """
+
+    message_type: type
+    attributes: Attributes = field(default_factory=dict)
+    blocks: Mapping[str, tuple[str, "Block"]] = field(default_factory=dict)
+    repeated_blocks: Mapping[str, tuple[str, "Block"]] = field(default_factory=dict)
+
+    def kwargs(self, values: Mapping[str, Any]) -> dict[str, Any]:
+        """Return the message fields translated from values, skipping attributes and blocks that are null or unknown."""
+        kwargs: dict[str, Any] = {}
+        for attribute, rule in self.attributes.items():
+            value = values.get(attribute)
+            if value is None:
+                continue
+            if isinstance(rule, str):
+                kwargs[rule] = value
+            else:
+                name, convert = rule
+                kwargs[name] = convert(value)
+        for block, (name, spec) in self.blocks.items():
+            if instances := values.get(block):
+                kwargs[name] = spec.translate(instances[0])
+        for block, (name, spec) in self.repeated_blocks.items():
+            if instances := values.get(block):
+                kwargs[name] = [spec.translate(instance) for instance in instances]
+        return kwargs
+
+    def translate(self, values: Mapping[str, Any]) -> Any:  # noqa: ANN401
+        """Return a message translated from values."""
+        return self.message_type(**self.kwargs(values))
+
+
+def _enum(enum_type: type) -> Converter:
+    """Return a converter from the name of an enum value, as used by the provider, to the enum value."""
+    return lambda value: enum_type[value.upper()] if value else enum_type(0)  # pyright: ignore[reportIndexIssue, reportCallIssue]
+
+
+def _timestamp(value: str) -> dt.datetime | None:
+    """Return an RFC3339 timestamp string as a datetime, or None if empty."""
+    return dt.datetime.fromisoformat(value) if value else None
+
+
+def _enabled(message_type: type) -> Converter:
+    """Return a converter from a boolean attribute to a message with a matching enabled field."""
+    return lambda value: message_type(enabled=value)
+
+
+def _last_segments(count: int) -> Converter:
+    """Return a converter that keeps the last count segments of a resource self-link."""
+    return lambda value: "/".join(value.split("/")[-count:])
+
+
+_ENABLED: Attributes = {"enabled": "enabled"}
+_DISABLED: Attributes = {"disabled": "disabled"}
+
+SHIELDED_INSTANCE_CONFIG = Block(
+    container_v1.ShieldedInstanceConfig,
+    attributes={
+        "enable_secure_boot": "enable_secure_boot",
+        "enable_integrity_monitoring": "enable_integrity_monitoring",
+    },
+)
+
+NODE_MANAGEMENT = Block(
+    container_v1.NodeManagement,
+    attributes={
+        "auto_repair": "auto_repair",
+        "auto_upgrade": "auto_upgrade",
+    },
+)
+
+NODE_CONFIG = Block(
+    container_v1.NodeConfig,
+    attributes={
+        "machine_type": "machine_type",
+        "disk_size_gb": "disk_size_gb",
+        "disk_type": "disk_type",
+        "image_type": "image_type",
+        "labels": "labels",
+        "local_ssd_count": "local_ssd_count",
+        "metadata": "metadata",
+        "min_cpu_platform": "min_cpu_platform",
+        "oauth_scopes": "oauth_scopes",
+        "preemptible": "preemptible",
+        "spot": "spot",
+        "boot_disk_kms_key": "boot_disk_kms_key",
+        "service_account": "service_account",
+        "tags": "tags",
+    },
+    blocks={
+        "ephemeral_storage_config": (
+            "ephemeral_storage_local_ssd_config",
+            Block(container_v1.EphemeralStorageLocalSsdConfig, attributes={"local_ssd_count": "local_ssd_count"}),
+        ),
+        "gcfs_config": ("gcfs_config", Block(container_v1.GcfsConfig, attributes=_ENABLED)),
+        "gvnic": ("gvnic", Block(container_v1.VirtualNIC, attributes=_ENABLED)),
+        "sandbox_config": (
+            "sandbox_config",
+            Block(
+                container_v1.SandboxConfig,
+                attributes={"sandbox_type": ("type_", _enum(container_v1.SandboxConfig.Type))},
+            ),
+        ),
+        "shielded_instance_config": ("shielded_instance_config", SHIELDED_INSTANCE_CONFIG),
+        "workload_metadata_config": (
+            "workload_metadata_config",
+            Block(
+                container_v1.WorkloadMetadataConfig,
+                attributes={"mode": ("mode", _enum(container_v1.WorkloadMetadataConfig.Mode))},
+            ),
+        ),
+        "linux_node_config": (
+            "linux_node_config",
+            Block(container_v1.LinuxNodeConfig, attributes={"sysctls": "sysctls"}),
+        ),
+    },
+    repeated_blocks={
+        "taint": (
+            "taints",
+            Block(
+                container_v1.NodeTaint,
+                attributes={
+                    "key": "key",
+                    "value": "value",
+                    "effect": ("effect", _enum(container_v1.NodeTaint.Effect)),
+                },
+            ),
+        ),
+        "guest_accelerator": (
+            "accelerators",
+            Block(
+                container_v1.AcceleratorConfig,
+                attributes={
+                    "type": "accelerator_type",
+                    "count": "accelerator_count",
+                },
+            ),
+        ),
+    },
+)
+
+NODE_POOL = Block(
+    container_v1.NodePool,
+    attributes={
+        "initial_node_count": "initial_node_count",
+        "node_locations": "locations",
+        "version": "version",
+        "max_pods_per_node": (
+            "max_pods_constraint",
+            lambda value: container_v1.MaxPodsConstraint(max_pods_per_node=value),
+        ),
+    },
+    blocks={
+        "node_config": ("config", NODE_CONFIG),
+        "autoscaling": (
+            "autoscaling",
+            Block(
+                container_v1.NodePoolAutoscaling,
+                attributes={
+                    "min_node_count": "min_node_count",
+                    "max_node_count": "max_node_count",
+                    "total_min_node_count": "total_min_node_count",
+                    "total_max_node_count": "total_max_node_count",
+                    "location_policy": ("location_policy", _enum(container_v1.NodePoolAutoscaling.LocationPolicy)),
+                },
+            ),
+        ),
+        "management": ("management", NODE_MANAGEMENT),
+        "upgrade_settings": (
+            "upgrade_settings",
+            Block(
+                container_v1.NodePool.UpgradeSettings,
+                attributes={
+                    "max_surge": "max_surge",
+                    "max_unavailable": "max_unavailable",
+                    "strategy": ("strategy", _enum(container_v1.NodePoolUpdateStrategy)),
+                },
+            ),
+        ),
+        "placement_policy": (
+            "placement_policy",
+            Block(
+                container_v1.NodePool.PlacementPolicy,
+                attributes={"type": ("type_", _enum(container_v1.NodePool.PlacementPolicy.Type))},
+            ),
+        ),
+    },
+)
+
+TIME_WINDOW = Block(
+    container_v1.TimeWindow,
+    attributes={
+        "start_time": ("start_time", _timestamp),
+        "end_time": ("end_time", _timestamp),
+    },
+    blocks={
+        "exclusion_options": (
+            "maintenance_exclusion_options",
+            Block(
+                container_v1.MaintenanceExclusionOptions,
+                attributes={"scope": ("scope", _enum(container_v1.MaintenanceExclusionOptions.Scope))},
+            ),
+        ),
+    },
+)
+
+ADDONS_CONFIG = Block(
+    container_v1.AddonsConfig,
+    blocks={
+        "horizontal_pod_autoscaling": (
+            "horizontal_pod_autoscaling",
+            Block(container_v1.HorizontalPodAutoscaling, attributes=_DISABLED),
+        ),
+        "http_load_balancing": ("http_load_balancing", Block(container_v1.HttpLoadBalancing, attributes=_DISABLED)),
+        "network_policy_config": (
+            "network_policy_config",
+            Block(container_v1.NetworkPolicyConfig, attributes=_DISABLED),
+        ),
+        "cloudrun_config": (
+            "cloud_run_config",
+            Block(
+                container_v1.CloudRunConfig,
+                attributes={
+                    "disabled": "disabled",
+                    "load_balancer_type": ("load_balancer_type", _enum(container_v1.CloudRunConfig.LoadBalancerType)),
+                },
+            ),
+        ),
+        "dns_cache_config": ("dns_cache_config", Block(container_v1.DnsCacheConfig, attributes=_ENABLED)),
+        "config_connector_config": (
+            "config_connector_config",
+            Block(container_v1.ConfigConnectorConfig, attributes=_ENABLED),
+        ),
+        "gce_persistent_disk_csi_driver_config": (
+            "gce_persistent_disk_csi_driver_config",
+            Block(container_v1.GcePersistentDiskCsiDriverConfig, attributes=_ENABLED),
+        ),
+        "gcp_filestore_csi_driver_config": (
+            "gcp_filestore_csi_driver_config",
+            Block(container_v1.GcpFilestoreCsiDriverConfig, attributes=_ENABLED),
+        ),
+        "gke_backup_agent_config": (
+            "gke_backup_agent_config",
+            Block(container_v1.GkeBackupAgentConfig, attributes=_ENABLED),
+        ),
+        "gcs_fuse_csi_driver_config": (
+            "gcs_fuse_csi_driver_config",
+            Block(container_v1.GcsFuseCsiDriverConfig, attributes=_ENABLED),
+        ),
+    },
+)
+
+CLUSTER_AUTOSCALING = Block(
+    container_v1.ClusterAutoscaling,
+    attributes={
+        "enabled": "enable_node_autoprovisioning",
+        "autoscaling_profile": ("autoscaling_profile", _enum(container_v1.ClusterAutoscaling.AutoscalingProfile)),
+    },
+    blocks={
+        "auto_provisioning_defaults": (
+            "autoprovisioning_node_pool_defaults",
+            Block(
+                container_v1.AutoprovisioningNodePoolDefaults,
+                attributes={
+                    "service_account": "service_account",
+                    "oauth_scopes": "oauth_scopes",
+                    "min_cpu_platform": "min_cpu_platform",
+                    "boot_disk_kms_key": "boot_disk_kms_key",
+                    "disk_size": "disk_size_gb",
+                    "disk_type": "disk_type",
+                    "image_type": "image_type",
+                },
+                blocks={
+                    "shielded_instance_config": ("shielded_instance_config", SHIELDED_INSTANCE_CONFIG),
+                    "management": ("management", NODE_MANAGEMENT),
+                },
+            ),
+        ),
+    },
+    repeated_blocks={
+        "resource_limits": (
+            "resource_limits",
+            Block(
+                container_v1.ResourceLimit,
+                attributes={
+                    "resource_type": "resource_type",
+                    "minimum": "minimum",
+                    "maximum": "maximum",
+                },
+            ),
+        ),
+    },
+)
+
+NETWORK_CONFIG = Block(
+    container_v1.NetworkConfig,
+    attributes={
+        "network": ("network", _last_segments(5)),
+        "subnetwork": ("subnetwork", _last_segments(6)),
+        "enable_intranode_visibility": "enable_intra_node_visibility",
+        "enable_l4_ilb_subsetting": "enable_l4ilb_subsetting",
+        "datapath_provider": ("datapath_provider", _enum(container_v1.DatapathProvider)),
+        "private_ipv6_google_access": ("private_ipv6_google_access", _enum(container_v1.PrivateIPv6GoogleAccess)),
+    },
+    blocks={
+        "default_snat_status": (
+            "default_snat_status",
+            Block(container_v1.DefaultSnatStatus, attributes=_DISABLED),
+        ),
+        "service_external_ips_config": (
+            "service_external_ips_config",
+            Block(container_v1.ServiceExternalIPsConfig, attributes=_ENABLED),
+        ),
+        "dns_config": (
+            "dns_config",
+            Block(
+                container_v1.DNSConfig,
+                attributes={
+                    "cluster_dns": ("cluster_dns", _enum(container_v1.DNSConfig.Provider)),
+                    "cluster_dns_scope": ("cluster_dns_scope", _enum(container_v1.DNSConfig.DNSScope)),
+                    "cluster_dns_domain": "cluster_dns_domain",
+                },
+            ),
+        ),
+    },
+)
+
+CLUSTER = Block(
+    container_v1.Cluster,
+    attributes={
+        "name": "name",
+        "description": "description",
+        "location": "location",
+        "initial_node_count": "initial_node_count",
+        "logging_service": "logging_service",
+        "monitoring_service": "monitoring_service",
+        "network": ("network", _last_segments(1)),
+        "subnetwork": ("subnetwork", _last_segments(1)),
+        "resource_labels": "resource_labels",
+        "enable_kubernetes_alpha": "enable_kubernetes_alpha",
+        "enable_tpu": "enable_tpu",
+        "min_master_version": "initial_cluster_version",
+        "master_version": "current_master_version",
+        "endpoint": "endpoint",
+        "enable_legacy_abac": ("legacy_abac", _enabled(container_v1.LegacyAbac)),
+        "enable_shielded_nodes": ("shielded_nodes", _enabled(container_v1.ShieldedNodes)),
+        "enable_autopilot": ("autopilot", _enabled(container_v1.Autopilot)),
+        "default_max_pods_per_node": (
+            "default_max_pods_constraint",
+            lambda value: container_v1.MaxPodsConstraint(max_pods_per_node=value),
+        ),
+    },
+    blocks={
+        "addons_config": ("addons_config", ADDONS_CONFIG),
+        "cluster_autoscaling": ("autoscaling", CLUSTER_AUTOSCALING),
+        "node_pool_auto_config": (
+            "node_pool_auto_config",
+            Block(
+                container_v1.NodePoolAutoConfig,
+                blocks={"network_tags": ("network_tags", Block(container_v1.NetworkTags, attributes={"tags": "tags"}))},
+            ),
+        ),
+        "binary_authorization": (
+            "binary_authorization",
+            Block(
+                container_v1.BinaryAuthorization,
+                attributes={
+                    "enabled": "enabled",
+                    "evaluation_mode": ("evaluation_mode", _enum(container_v1.BinaryAuthorization.EvaluationMode)),
+                },
+            ),
+        ),
+        "identity_service_config": (
+            "identity_service_config",
+            Block(container_v1.IdentityServiceConfig, attributes=_ENABLED),
+        ),
+        "mesh_certificates": (
+            "mesh_certificates",
+            Block(container_v1.MeshCertificates, attributes={"enable_certificates": "enable_certificates"}),
+        ),
+        "database_encryption": (
+            "database_encryption",
+            Block(
+                container_v1.DatabaseEncryption,
+                attributes={
+                    "state": ("state", _enum(container_v1.DatabaseEncryption.State)),
+                    "key_name": "key_name",
+                },
+            ),
+        ),
+        "ip_allocation_policy": (
+            "ip_allocation_policy",
+            Block(
+                container_v1.IPAllocationPolicy,
+                attributes={
+                    "cluster_secondary_range_name": "cluster_secondary_range_name",
+                    "services_secondary_range_name": "services_secondary_range_name",
+                    "cluster_ipv4_cidr_block": "cluster_ipv4_cidr_block",
+                    "services_ipv4_cidr_block": "services_ipv4_cidr_block",
+                    "stack_type": ("stack_type", _enum(container_v1.StackType)),
+                },
+            ),
+        ),
+        "master_auth": (
+            "master_auth",
+            Block(
+                container_v1.MasterAuth,
+                attributes={
+                    "cluster_ca_certificate": "cluster_ca_certificate",
+                    "client_certificate": "client_certificate",
+                    "client_key": "client_key",
+                },
+                blocks={
+                    "client_certificate_config": (
+                        "client_certificate_config",
+                        Block(
+                            container_v1.ClientCertificateConfig,
+                            attributes={"issue_client_certificate": "issue_client_certificate"},
+                        ),
+                    ),
+                },
+            ),
+        ),
+        "master_authorized_networks_config": (
+            "master_authorized_networks_config",
+            Block(
+                container_v1.MasterAuthorizedNetworksConfig,
+                attributes={"gcp_public_cidrs_access_enabled": "gcp_public_cidrs_access_enabled"},
+                repeated_blocks={
+                    "cidr_blocks": (
+                        "cidr_blocks",
+                        Block(
+                            container_v1.MasterAuthorizedNetworksConfig.CidrBlock,
+                            attributes={
+                                "cidr_block": "cidr_block",
+                                "display_name": "display_name",
+                            },
+                        ),
+                    ),
+                },
+            ),
+        ),
+        "network_policy": (
+            "network_policy",
+            Block(
+                container_v1.NetworkPolicy,
+                attributes={
+                    "enabled": "enabled",
+                    "provider": ("provider", _enum(container_v1.NetworkPolicy.Provider)),
+                },
+            ),
+        ),
+        "confidential_nodes": ("confidential_nodes", Block(container_v1.ConfidentialNodes, attributes=_ENABLED)),
+        "private_cluster_config": (
+            "private_cluster_config",
+            Block(
+                container_v1.PrivateClusterConfig,
+                attributes={
+                    "enable_private_nodes": "enable_private_nodes",
+                    "enable_private_endpoint": "enable_private_endpoint",
+                    "master_ipv4_cidr_block": "master_ipv4_cidr_block",
+                    "private_endpoint": "private_endpoint",
+                    "public_endpoint": "public_endpoint",
+                    "peering_name": "peering_name",
+                },
+                blocks={
+                    "master_global_access_config": (
+                        "master_global_access_config",
+                        Block(container_v1.PrivateClusterMasterGlobalAccessConfig, attributes=_ENABLED),
+                    ),
+                },
+            ),
+        ),
+        "release_channel": (
+            "release_channel",
+            Block(
+                container_v1.ReleaseChannel,
+                attributes={"channel": ("channel", _enum(container_v1.ReleaseChannel.Channel))},
+            ),
+        ),
+        "cost_management_config": (
+            "cost_management_config",
+            Block(container_v1.CostManagementConfig, attributes=_ENABLED),
+        ),
+        "vertical_pod_autoscaling": (
+            "vertical_pod_autoscaling",
+            Block(container_v1.VerticalPodAutoscaling, attributes=_ENABLED),
+        ),
+        "workload_identity_config": (
+            "workload_identity_config",
+            Block(container_v1.WorkloadIdentityConfig, attributes={"workload_pool": "workload_pool"}),
+        ),
+    },
+)
+
+
+def _maintenance_policy(values: Mapping[str, Any]) -> container_v1.MaintenancePolicy:
+    """Return a MaintenancePolicy translated from the values of a maintenance_policy block.
+
+    NOTE: Maintenance exclusions are a list of blocks in tofu, but a map of exclusion name to TimeWindow in the API.
+    """
+    window = container_v1.MaintenanceWindow()
+    if daily := values.get("daily_maintenance_window"):
+        window.daily_maintenance_window = container_v1.DailyMaintenanceWindow(start_time=daily[0].get("start_time", ""))
+    if recurring := values.get("recurring_window"):
+        window.recurring_window = container_v1.RecurringTimeWindow(
+            window=TIME_WINDOW.translate(recurring[0]),
+            recurrence=recurring[0].get("recurrence", ""),
+        )
+    for exclusion in values.get("maintenance_exclusion") or []:
+        window.maintenance_exclusions[exclusion["exclusion_name"]] = TIME_WINDOW.translate(exclusion)
+    return container_v1.MaintenancePolicy(window=window)
+
+
+def node_pool_from_values(values: Mapping[str, Any]) -> container_v1.NodePool:
+    """Return a NodePool translated from the planned or state values of a google_container_node_pool resource.
+
+    NOTE: The name of a node pool created with a name_prefix is not known until it is applied, so the prefix is used
+    for the name of a planned node pool.
+    """
+    kwargs = NODE_POOL.kwargs(values)
+    kwargs["name"] = values.get("name") or values.get("name_prefix") or ""
+    if "autoscaling" in kwargs:
+        kwargs["autoscaling"].enabled = True
+    return container_v1.NodePool(**kwargs)
+
+
+def cluster_from_values(
+    values: Mapping[str, Any],
+    node_pools: Iterable[Mapping[str, Any]] = (),
+) -> container_v1.Cluster:
+    """Return a Cluster translated from the planned or state values of a google_container_cluster resource.
+
+    If node_pools is empty, the node pools will be translated from any node_pool blocks of the cluster.
+    """
+    kwargs = CLUSTER.kwargs(values)
+    kwargs["network_config"] = NETWORK_CONFIG.translate(values)
+    if "ip_allocation_policy" in kwargs:
+        kwargs["ip_allocation_policy"].use_ip_aliases = values.get("networking_mode") == "VPC_NATIVE"
+        kwargs["ip_allocation_policy"].use_routes = values.get("networking_mode") == "ROUTES"
+    if maintenance_policy := values.get("maintenance_policy"):
+        kwargs["maintenance_policy"] = _maintenance_policy(maintenance_policy[0])
+    kwargs["node_pools"] = [node_pool_from_values(pool) for pool in node_pools or values.get("node_pool") or []]
+    return container_v1.Cluster(**kwargs)
+
+
+def _walk_modules(module: Mapping[str, Any]) -> Generator[Mapping[str, Any], None, None]:
+    """Yield the module and all of its descendant modules from a JSON values representation."""
+    yield module
+    for child in module.get("child_modules", []):
+        yield from _walk_modules(child)
+
+
+def _root_module(document: Mapping[str, Any]) -> Mapping[str, Any]:
+    """Return the root module values from the JSON representation of a plan or of state."""
+    if "planned_values" in document:
+        return document["planned_values"].get("root_module", {})
+    return document.get("values", {}).get("root_module", {})
+
+
+def clusters_from_json(document: Mapping[str, Any]) -> list[container_v1.Cluster]:
+    """Return a Cluster for every google_container_cluster resource in the JSON representation of a plan or of state.
+
+    Node pools are associated with a cluster in the same module, matched by cluster name when it is known.
+    """
+    clusters: list[tuple[str, Mapping[str, Any]]] = []
+    node_pools: dict[str, list[Mapping[str, Any]]] = {}
+    for module in _walk_modules(_root_module(document)):
+        address = module.get("address", "")
+        for resource in module.get("resources", []):
+            if resource.get("mode") != "managed":
+                continue
+            if resource.get("type") == "google_container_cluster":
+                clusters.append((address, resource["values"]))
+            elif resource.get("type") == "google_container_node_pool":
+                node_pools.setdefault(address, []).append(resource["values"])
+    return [
+        cluster_from_values(
+            values,
+            node_pools=[
+                pool
+                for pool in node_pools.get(address, [])
+                if pool.get("cluster") is None or pool["cluster"] in {values.get("name"), values.get("id")}
+            ],
+        )
+        for address, values in clusters
+    ]
+
+
+def cluster_from_json(document: Mapping[str, Any]) -> container_v1.Cluster:
+    """Return the Cluster for the single google_container_cluster resource in a JSON plan or state."""
+    clusters = clusters_from_json(document)
+    assert len(clusters) == 1
+    return clusters[0]